@@ -1,50 +1,97 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-import streamlit as st
+from model_registry import ModelRegistry, PRICE_FEATURES
+from forecasting import SalesForecaster, forecast_series
+from metrics import instrument
+
+PREDICT_CHUNK_SIZE = 50_000
+
+# Not cached: the template is picked at random on every call, and formatting it is cheap
+def _ad_copy(product_name, keywords):
+    templates = [
+        f"🔥 HOT DEAL! {product_name} - Best {keywords} on Daraz! Free Shipping!",
+        f"Amazing {product_name} - Perfect for {keywords}. Buy now and save!",
+        f"Special offer: {product_name} - Top quality {keywords} at lowest prices!"
+    ]
+    return np.random.choice(templates)
 
 class AIModels:
-    def __init__(self):
+    def __init__(self, registry=None):
+        # Models persist across restarts; the latest one is loaded on first use
+        self.registry = registry or ModelRegistry()
         self.price_model = None
+        self.model_version = None
+        self._prediction_memo = {}
+        self._memo_version = None
+        self.forecaster = SalesForecaster()
     
-    @st.cache_resource
-    def _load_price_model(_self, data):
-        """Train and cache price prediction model"""
-        X = data[['rating', 'sales', 'category_id']]
-        y = data['price']
-        model = RandomForestRegressor(n_estimators=50)  # Fewer trees for faster training
-        model.fit(X, y)
-        return model
+    def _load_price_model(self, data):
+        """Fetch the model fitted on this data, or fit/warm-start one and persist it"""
+        return self.registry.fit_price_model(data)
     
     def train_price_model(self, data):
-        """Train model (cached)"""
-        self.price_model = self._load_price_model(data)
+        """Train model (cached on disk by data fingerprint)"""
+        self.price_model, self.model_version = self._load_price_model(data)
+    
+    def use_price_model_for(self, data):
+        """Use an already-fitted model for this data if one exists; never trains"""
+        model, version = self.registry.lookup_price_model(data)
+        if model is not None:
+            self.price_model, self.model_version = model, version
+        return model is not None
+    
+    def load_latest_model(self):
+        """Use the most recently persisted model without retraining"""
+        model, version = self.registry.latest()
+        if model is not None:
+            self.price_model, self.model_version = model, version
+        return model is not None
     
+    @instrument("predict_price")
     def predict_price(self, product_data):
         """Predict optimal price"""
         if not self.price_model:
             return product_data['price'] * 1.1  # Fallback if model not trained
             
-        features = np.array([
-            [
-                product_data['rating'], 
-                product_data['sales'], 
-                product_data['category_id']
-            ]
-        ])
+        # One row with the training columns, so the model sees the feature names it was fitted on
+        features = pd.DataFrame({name: [product_data[name]] for name in PRICE_FEATURES})
         return self.price_model.predict(features)[0]
     
-    @st.cache_data(max_entries=100, ttl=300)
-    def generate_ad_copy(_self, product_name, keywords):
+    @instrument("predict_prices")
+    def predict_prices(self, data, chunk_size=PREDICT_CHUNK_SIZE):
+        """Predict optimal prices for a whole catalogue; returns a Series indexed by product_id"""
+        # Fallback for every row up front, overwritten where the model can score
+        predictions = data['price'].to_numpy(dtype=float) * 1.1
+        if self.price_model is not None and len(data):
+            if self._memo_version != self.model_version:
+                self._prediction_memo = {}
+                self._memo_version = self.model_version
+            features = data[PRICE_FEATURES]
+            scorable = np.flatnonzero(features.notna().all(axis=1).to_numpy())
+            keys = pd.util.hash_pandas_object(features.iloc[scorable], index=False).to_numpy()
+            memo = self._prediction_memo
+            cached = np.array([memo.get(key, np.nan) for key in keys.tolist()], dtype=float)
+            hit = ~np.isnan(cached)
+            predictions[scorable[hit]] = cached[hit]
+            missing = scorable[~hit]
+            missing_keys = keys[~hit]
+            for start in range(0, len(missing), chunk_size):
+                rows = missing[start:start + chunk_size]
+                scored = self.price_model.predict(features.iloc[rows])
+                predictions[rows] = scored
+                memo.update(zip(missing_keys[start:start + chunk_size].tolist(), scored.tolist()))
+        return pd.Series(predictions, index=data['product_id'].to_numpy(), name='predicted_price')
+    
+    def generate_ad_copy(self, product_name, keywords):
         """Generate ad copy without heavy AI"""
-        templates = [
-            f"🔥 HOT DEAL! {product_name} - Best {keywords} on Daraz! Free Shipping!",
-            f"Amazing {product_name} - Perfect for {keywords}. Buy now and save!",
-            f"Special offer: {product_name} - Top quality {keywords} at lowest prices!"
-        ]
-        return np.random.choice(templates)
-        def forecast_sales(historical_sales, months=3):
-    """Simple linear regression forecast"""
-    # For demo purposes - replace with real forecasting model
-    last_sales = historical_sales[-1]
-    return [last_sales * (1 + i * 0.1) for i in range(1, months+1)]
\ No newline at end of file
+        return _ad_copy(product_name, keywords)
+    
+    def forecast_sales(self, historical_sales, months=3):
+        """Exponential-smoothing forecast of one monthly sales series"""
+        return forecast_series(historical_sales, months)
+    
+    def forecast_catalogue(self, sku_ids, series, months=3):
+        """Fit many SKUs' monthly sales (rows of a 2-D matrix) at once and forecast them"""
+        # Fitted parameters stay cached; fold in new months with self.forecaster.update
+        self.forecaster.fit(sku_ids, series)
+        return self.forecaster.forecast(sku_ids, months)
@@ -0,0 +1,173 @@
+import threading
+from collections import deque, namedtuple
+
+# user_email is set on alerts meant for one seller only (None: everyone watching the product)
+Alert = namedtuple('Alert', 'product_id rule message price time user_email', defaults=(None,))
+
+
+class ListingStats:
+    """Running statistics for one listing, updated in O(1) per point"""
+    __slots__ = ('last_price', 'mean', 'var', 'count')
+
+    def __init__(self):
+        self.last_price = None
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, price, alpha):
+        # Exponentially weighted mean/variance; the first point seeds the mean
+        if self.count == 0:
+            self.mean = price
+        else:
+            delta = price - self.mean
+            self.mean += alpha * delta
+            self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+        self.last_price = price
+        self.count += 1
+
+
+class PriceDropRule:
+    """Fires when a price falls by at least `absolute` or `percent` since the last point"""
+    name = 'price_drop'
+
+    def __init__(self, absolute=None, percent=5.0):
+        self.absolute = absolute
+        self.percent = percent
+
+    def check(self, product_id, stats, price):
+        if stats.last_price is None or price >= stats.last_price:
+            return None
+        drop = stats.last_price - price
+        if (self.absolute is not None and drop >= self.absolute) or \
+                (self.percent is not None and drop / stats.last_price * 100 >= self.percent):
+            return f"Price dropped {drop:.2f} ({drop / stats.last_price:.1%}) to {price:.2f}"
+        return None
+
+
+class UndercutRule:
+    """Fires, for each seller listing the product, when a competitor goes below their price
+
+    my_prices maps user_email -> {product_id: price}. check() returns a list
+    of (user_email, message), so each alert only reaches the seller it is about.
+    """
+    name = 'undercut'
+    per_user = True
+
+    def __init__(self, my_prices=None, margin=0.0):
+        self.my_prices = {}
+        self._sellers = {}   # product_id -> {user_email: price}
+        self.margin = margin
+        self._lock = threading.Lock()   # sessions set prices while the scheduler checks
+        for user_email, prices in (my_prices or {}).items():
+            self.set_my_prices(user_email, prices)
+
+    def set_my_prices(self, user_email, prices):
+        """Replace one seller's prices ({product_id: price})"""
+        with self._lock:
+            for product_id in self.my_prices.pop(user_email, {}):
+                sellers = self._sellers[product_id]
+                del sellers[user_email]
+                if not sellers:
+                    del self._sellers[product_id]
+            for product_id, price in prices.items():
+                self._set(user_email, str(product_id), price)
+
+    def set_my_price(self, user_email, product_id, price):
+        with self._lock:
+            self._set(user_email, str(product_id), price)
+
+    def _set(self, user_email, product_id, price):
+        if price is None or price != price:
+            # No price (None or NaN) means nothing to undercut
+            self.my_prices.get(user_email, {}).pop(product_id, None)
+            sellers = self._sellers.get(product_id, {})
+            sellers.pop(user_email, None)
+            if not sellers:
+                self._sellers.pop(product_id, None)
+            return
+        self.my_prices.setdefault(user_email, {})[product_id] = price
+        self._sellers.setdefault(product_id, {})[user_email] = price
+
+    def check(self, product_id, stats, price):
+        with self._lock:
+            sellers = list(self._sellers.get(str(product_id), {}).items())
+        raised = []
+        for user_email, mine in sellers:
+            if price >= mine - self.margin:
+                continue
+            # Only alert when crossing below, not on every point spent below
+            if stats.last_price is not None and stats.last_price < mine - self.margin:
+                continue
+            raised.append((user_email, f"Competitor undercut your price {mine:.2f} at {price:.2f}"))
+        return raised
+
+
+class ZScoreRule:
+    """Fires on prices more than `threshold` EWMA standard deviations from the mean"""
+    name = 'anomaly'
+
+    def __init__(self, threshold=3.0, min_points=10):
+        self.threshold = threshold
+        self.min_points = min_points
+
+    def check(self, product_id, stats, price):
+        if stats.count < self.min_points or stats.var <= 0:
+            return None
+        z = (price - stats.mean) / stats.var ** 0.5
+        if abs(z) >= self.threshold:
+            return f"Unusual price {price:.2f} (z={z:+.1f} vs mean {stats.mean:.2f})"
+        return None
+
+
+class AlertEngine:
+    """Evaluates alert rules incrementally on each new competitor point"""
+
+    def __init__(self, rules=None, alpha=0.1, max_alerts=1000):
+        self.rules = rules if rules is not None else [PriceDropRule(), ZScoreRule()]
+        self.alpha = alpha
+        self.alerts = deque(maxlen=max_alerts)
+        self._stats = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Call callback(alert) for every alert raised"""
+        self._listeners.append(callback)
+
+    def observe(self, product_id, update_time, price, rating=None):
+        """Feed one point; returns the alerts it raised. Matches CompetitorMonitor listeners"""
+        with self._lock:
+            stats = self._stats.get(product_id)
+            if stats is None:
+                stats = self._stats[product_id] = ListingStats()
+            raised = []
+            for rule in self.rules:
+                if getattr(rule, 'per_user', False):
+                    raised.extend(Alert(product_id, rule.name, message, price, update_time, user_email)
+                                  for user_email, message in rule.check(product_id, stats, price))
+                    continue
+                message = rule.check(product_id, stats, price)
+                if message is not None:
+                    raised.append(Alert(product_id, rule.name, message, price, update_time))
+            stats.update(price, self.alpha)
+            self.alerts.extend(raised)
+        for alert in raised:
+            for callback in self._listeners:
+                callback(alert)
+        return raised
+
+    def recent(self, product_id=None, limit=20, user_email=None):
+        """Newest alerts first, optionally for one product; per-seller alerts only reach user_email"""
+        with self._lock:
+            alerts = [a for a in reversed(self.alerts)
+                      if (product_id is None or a.product_id == product_id)
+                      and (a.user_email is None or a.user_email == user_email)]
+        return alerts[:limit]
+
+
+def my_prices_from_portfolio(user_email):
+    """Map product id -> my price from the user's portfolio, for UndercutRule"""
+    from database import get_user_products
+    products = get_user_products(user_email)
+    return {str(pid): price for pid, price in zip(products['id'], products['price'])}
@@ -0,0 +1,482 @@
+"""Columnar analytics layer: the catalogue and competitor history as partitioned Parquet
+
+Run with:  python analytics.py [--full]
+
+Products are kept as daily snapshots under
+products/category_id=<id>/date=<YYYY-MM-DD>/ and competitor history as
+fragments under history/date=<YYYY-MM-DD>/. Triggers on the products table
+log every changed product, so a refresh only rewrites the categories those
+products moved out of or into. Queries read the files memory-mapped and push
+column selection and filters down to Parquet; per-file totals kept in the
+manifest answer the headline metrics without reading any data.
+"""
+import argparse
+import heapq
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from database import get_pool
+
+ANALYTICS_PATH = os.getenv("DARAZ_ANALYTICS_PATH", "analytics")
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("DARAZ_ANALYTICS_REFRESH_INTERVAL", "60"))
+ANALYTICS_RETENTION_DAYS = int(os.getenv("DARAZ_ANALYTICS_RETENTION_DAYS", "30"))
+EXPORT_CHUNK_SIZE = 500_000
+FULL_REFRESH_SHARE = 0.25     # rebuild everything when more of the catalogue than this changed
+HISTORY_COMPACT_FILES = 16    # merge a day's history fragments once there are this many
+LOOKUP_BATCH = 900            # ids per IN (...) query, under SQLite's variable limit
+TOP_SELLERS = 20              # best sellers per category kept in the manifest
+
+PRODUCT_COLUMNS = ('product_id', 'name', 'price', 'rating', 'sales', 'seller_id')
+SELECT_PRODUCTS = '''
+    SELECT id AS product_id, name, price, rating, sales, seller_id, category_id
+    FROM products
+'''
+STATS = ('rows', 'sales', 'price_sum', 'price_count', 'rating_sum', 'rating_count')
+
+
+def _schemas():
+    import pyarrow as pa
+    products = pa.schema([('product_id', pa.int64()), ('name', pa.string()), ('price', pa.float64()),
+                          ('rating', pa.float64()), ('sales', pa.int64()), ('seller_id', pa.int64())])
+    partitions = pa.schema([('category_id', pa.int64()), ('date', pa.string())])
+    history = pa.schema([('product_id', pa.string()), ('update_times', pa.float64()),
+                         ('prices', pa.float32()), ('ratings', pa.float32())])
+    return products, partitions, history
+
+
+def _frame_stats(frame):
+    """Per-category totals of a products frame, keyed by category_id"""
+    grouped = frame.assign(price_count=frame['price'].notna(), rating_count=frame['rating'].notna()) \
+        .groupby('category_id')
+    stats = pd.DataFrame({
+        'rows': grouped.size(),
+        'sales': grouped['sales'].sum(),
+        'price_sum': grouped['price'].sum(),
+        'price_count': grouped['price_count'].sum(),
+        'rating_sum': grouped['rating'].sum(),
+        'rating_count': grouped['rating_count'].sum(),
+    })
+    return {int(category): {name: float(value) for name, value in row.items()}
+            for category, row in stats.iterrows()}
+
+
+def _best_sellers(frame):
+    """The TOP_SELLERS best-selling products of each category in a frame"""
+    frame = frame.loc[frame['sales'].notna(), ['category_id', 'product_id', 'sales']]
+    return frame.sort_values(['category_id', 'sales'], ascending=[True, False]) \
+        .groupby('category_id').head(TOP_SELLERS)
+
+
+def _seller_list(best):
+    """[[product_id, sales], ...] as stored in the manifest"""
+    return [[int(product_id), float(sales)] for product_id, sales in zip(best['product_id'], best['sales'])]
+
+
+def _normalize(frame):
+    frame = frame.copy()
+    frame['category_id'] = pd.to_numeric(frame['category_id'], errors='coerce').fillna(0).astype(np.int64)
+    for column in ('price', 'rating', 'sales', 'seller_id'):
+        frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    return frame
+
+
+class AnalyticsStore:
+    """Partitioned Parquet copy of the products table and competitor history
+
+    One process refreshes a given path (the app's background thread or the
+    CLI); any number of processes can read it. Every refresh commits a new
+    manifest atomically, so readers always see a complete snapshot.
+    """
+
+    def __init__(self, path=ANALYTICS_PATH, history=None, retention_days=ANALYTICS_RETENTION_DAYS):
+        self.path = os.path.abspath(path)
+        self.history = history
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._manifest = None
+        self._manifest_mtime = None
+        self._datasets = {}
+        self._stopped = threading.Event()
+        self._thread = None
+        self.counters = dict.fromkeys(('refreshes', 'errors', 'products_written', 'history_written'), 0)
+        self.last_error = None
+
+    def _manifest_path(self):
+        return os.path.join(self.path, "manifest.json")
+
+    def manifest(self):
+        """The committed manifest, reloaded when another process has refreshed it"""
+        try:
+            mtime = os.stat(self._manifest_path()).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if mtime != self._manifest_mtime or self._manifest is None:
+                manifest = {'products': {}, 'history': {}, 'history_watermark': 0.0}
+                if mtime is not None:
+                    with open(self._manifest_path()) as handle:
+                        manifest = json.load(handle)
+                self._manifest, self._manifest_mtime, self._datasets = manifest, mtime, {}
+            return self._manifest
+
+    def _commit(self, manifest):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(manifest, handle)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _remove(self, files):
+        for name in files:
+            path = os.path.join(self.path, name)
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))   # only succeeds once the partition is empty
+            except OSError:
+                pass
+
+    def refresh(self, full=False):
+        """Bring the Parquet copy up to date; returns (products rewritten, history points added)"""
+        with self._refresh_lock:
+            manifest = json.loads(json.dumps(self.manifest()))   # private copy to edit
+            today = date.today().isoformat()
+            with get_pool().connection() as conn:
+                changes = conn.execute("SELECT product_id, version FROM product_changes").fetchall()
+            catalogue = sum(entries[-1]['rows'] for entries in manifest['products'].values())
+            if (full or manifest.get('rebuild') or not manifest['products']
+                    or len(changes) > FULL_REFRESH_SHARE * catalogue):
+                written, stale = self._export_products(manifest, today)
+                changes = None
+            else:
+                written, stale = self._update_products(manifest, today, changes)
+            stale += self._expire(manifest, today)
+            points, stale_history = self._export_history(manifest)
+            self._commit(manifest)
+            self._remove(stale + stale_history)
+            if changes:
+                # Only clear entries nobody has touched again while we were exporting
+                with get_pool().connection() as conn:
+                    with conn:
+                        conn.executemany("DELETE FROM product_changes WHERE product_id = ? AND version = ?",
+                                         changes)
+            self.counters['refreshes'] += 1
+            self.counters['products_written'] += written
+            self.counters['history_written'] += points
+            return written, points
+
+    def _export_products(self, manifest, today):
+        """Rebuild every category from a full scan of the products table"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        file_schema, partition_schema, _ = _schemas()
+        schema = pa.schema([*file_schema, *partition_schema])
+        # Everything logged so far is covered by the scan below; if the scan
+        # fails, the flag makes the next refresh start over instead of losing changes
+        self._commit({**manifest, 'rebuild': True})
+        with get_pool().connection() as conn:
+            with conn:
+                conn.execute("DELETE FROM product_changes")
+        stats, files, best = {}, {}, []
+
+        def batches():
+            with get_pool().connection() as conn:
+                for chunk in pd.read_sql_query(SELECT_PRODUCTS, conn, chunksize=EXPORT_CHUNK_SIZE):
+                    chunk = _normalize(chunk)
+                    for category, totals in _frame_stats(chunk).items():
+                        merged = stats.setdefault(category, dict.fromkeys(STATS, 0.0))
+                        for name, value in totals.items():
+                            merged[name] += value
+                    best.append(_best_sellers(chunk))
+                    table = pa.Table.from_pandas(chunk.assign(date=today), schema=schema, preserve_index=False)
+                    yield from table.to_batches()
+
+        def visit(written):
+            name = os.path.relpath(written.path, self.path)
+            category = int(name.split(os.sep)[1].split("=", 1)[1])
+            files.setdefault(category, []).append(name)
+
+        ds.write_dataset(batches(), os.path.join(self.path, "products"), schema=schema, format="parquet",
+                         partitioning=ds.partitioning(partition_schema, flavor="hive"),
+                         basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+                         existing_data_behavior="overwrite_or_ignore", max_open_files=4096,
+                         min_rows_per_group=1 << 15, max_rows_per_group=1 << 20, file_visitor=visit)
+        best = dict(tuple(_best_sellers(pd.concat(best)).groupby('category_id'))) if best else {}
+        # Earlier days' snapshots stay for the trend; today's and vanished categories are replaced
+        previous, products = manifest['products'], {}
+        for category in sorted(files):
+            entry = {'date': today, 'files': sorted(files[category]), **stats[category],
+                     'best_sellers': _seller_list(best[category]) if category in best else []}
+            products[str(category)] = [old for old in previous.get(str(category), [])
+                                       if old['date'] < today] + [entry]
+        kept = {name for entries in products.values() for entry in entries for name in entry['files']}
+        stale = [name for entries in previous.values() for entry in entries
+                 for name in entry['files'] if name not in kept]
+        manifest.pop('rebuild', None)
+        manifest['products'] = products
+        return int(sum(totals['rows'] for totals in stats.values())), stale
+
+    def _update_products(self, manifest, today, changes):
+        """Rewrite only the categories that changed products left or joined"""
+        if not changes:
+            return 0, []
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+        file_schema, _, _ = _schemas()
+        ids = np.fromiter((product_id for product_id, _ in changes), np.int64, len(changes))
+        # Where the changed products live in the current snapshot...
+        previous = self._scan(['product_id', 'category_id'], pc.field('product_id').isin(pa.array(ids)))
+        # ...and where they live now (deleted products simply don't come back)
+        parts = []
+        with get_pool().connection() as conn:
+            for start in range(0, len(ids), LOOKUP_BATCH):
+                batch = ids[start:start + LOOKUP_BATCH].tolist()
+                query = SELECT_PRODUCTS + f" WHERE id IN ({','.join('?' * len(batch))})"
+                parts.append(pd.read_sql_query(query, conn, params=batch))
+        fresh = _normalize(pd.concat(parts, ignore_index=True))
+        categories = set(previous.column('category_id').to_pylist()) | set(fresh['category_id'].tolist())
+        fresh = pa.Table.from_pandas(fresh, schema=pa.schema([*file_schema, ('category_id', pa.int64())]),
+                                     preserve_index=False)
+        changed = pa.array(ids)
+        stale = []
+        for category in sorted(categories):
+            entries = manifest['products'].setdefault(str(category), [])
+            tables = []
+            if entries:
+                current = pq.read_table([os.path.join(self.path, name) for name in entries[-1]['files']],
+                                        schema=file_schema, memory_map=True)
+                tables.append(current.filter(pc.invert(pc.is_in(current['product_id'], value_set=changed))))
+            tables.append(fresh.filter(pc.equal(fresh['category_id'], category)).select(PRODUCT_COLUMNS))
+            table = pa.concat_tables(tables)
+            name = os.path.join("products", f"category_id={category}", f"date={today}",
+                                f"part-{uuid.uuid4().hex[:12]}.parquet")
+            os.makedirs(os.path.dirname(os.path.join(self.path, name)), exist_ok=True)
+            pq.write_table(table, os.path.join(self.path, name), row_group_size=1 << 20)
+            entry = {'date': today, 'files': [name], **self._table_stats(table)}
+            if entries and entries[-1]['date'] == today:
+                stale += entries.pop()['files']   # same-day rewrites replace the snapshot
+            entries.append(entry)
+        return fresh.num_rows, stale
+
+    @staticmethod
+    def _table_stats(table):
+        import pyarrow.compute as pc
+
+        def total(column):
+            return float(pc.sum(table[column]).as_py() or 0.0)
+        sold = table.filter(pc.is_valid(table['sales']))
+        best = pc.take(sold, pc.select_k_unstable(sold, min(TOP_SELLERS, sold.num_rows), [('sales', 'descending')])) \
+            if sold.num_rows else sold
+        return {'rows': float(table.num_rows), 'sales': total('sales'),
+                'price_sum': total('price'), 'price_count': float(pc.count(table['price']).as_py()),
+                'rating_sum': total('rating'), 'rating_count': float(pc.count(table['rating']).as_py()),
+                'best_sellers': _seller_list(best.to_pydict())}
+
+    def _expire(self, manifest, today):
+        """Drop snapshots older than the retention window, always keeping the latest"""
+        cutoff = (date.fromisoformat(today) - timedelta(days=self.retention_days)).isoformat()
+        stale = []
+        for entries in manifest['products'].values():
+            keep = [entry for entry in entries[:-1] if entry['date'] >= cutoff] + entries[-1:]
+            stale += [name for entry in entries if entry not in keep for name in entry['files']]
+            entries[:] = keep
+        return stale
+
+    def _export_history(self, manifest):
+        """Append competitor points recorded since the last refresh, one fragment per day"""
+        if self.history is None:
+            return 0, []
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        _, _, history_schema = _schemas()
+        points = self.history.since(manifest['history_watermark'])
+        if points.empty:
+            return 0, []
+        days = pd.to_datetime(points['update_times'], unit='s').dt.strftime('%Y-%m-%d')
+        stale = []
+        for day, part in points.groupby(days):
+            files = manifest['history'].setdefault(day, [])
+            tables = [pa.Table.from_pandas(part, schema=history_schema, preserve_index=False)]
+            if len(files) + 1 >= HISTORY_COMPACT_FILES:
+                tables += [pq.read_table(os.path.join(self.path, name), schema=history_schema)
+                           for name in files]
+                stale += files
+                files = manifest['history'][day] = []
+            # Sorted by product so row-group statistics let per-product reads skip the rest
+            table = pa.concat_tables(tables).sort_by([('product_id', 'ascending'),
+                                                      ('update_times', 'ascending')])
+            name = os.path.join("history", f"date={day}", f"part-{uuid.uuid4().hex[:12]}.parquet")
+            os.makedirs(os.path.dirname(os.path.join(self.path, name)), exist_ok=True)
+            pq.write_table(table, os.path.join(self.path, name), row_group_size=1 << 16)
+            files.append(name)
+        manifest['history_watermark'] = float(points['update_times'].max())
+        return len(points), stale
+
+    def start(self, interval=ANALYTICS_REFRESH_INTERVAL):
+        """Refresh from a background thread every `interval` seconds"""
+        if self._thread is not None:
+            return self
+
+        def run():
+            while not self._stopped.is_set():
+                try:
+                    self.refresh()
+                except Exception as exc:  # keep refreshing; the next pass retries
+                    self.counters['errors'] += 1
+                    self.last_error = repr(exc)
+                self._stopped.wait(interval)
+        self._thread = threading.Thread(target=run, name="analytics-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _snapshot(self, as_of=None):
+        """category_id -> the manifest entry current on date as_of (today when None)"""
+        snapshot = {}
+        for category, entries in self.manifest()['products'].items():
+            visible = [entry for entry in entries if as_of is None or entry['date'] <= as_of]
+            if visible:
+                snapshot[int(category)] = visible[-1]
+        return snapshot
+
+    def _dataset(self, kind, as_of=None):
+        """pyarrow dataset over the current files, memory-mapped and cached per manifest"""
+        manifest = self.manifest()
+        key = (kind, as_of)
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                return dataset
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.fs as pafs
+        file_schema, partition_schema, history_schema = _schemas()
+        if kind == 'products':
+            files = [name for entry in self._snapshot(as_of).values() for name in entry['files']]
+            schema = pa.schema([*file_schema, *partition_schema])
+            partitioning = ds.partitioning(partition_schema, flavor="hive")
+        else:
+            files = [name for names in manifest['history'].values() for name in names]
+            schema = pa.schema([*history_schema, ('date', pa.string())])
+            partitioning = ds.partitioning(pa.schema([('date', pa.string())]), flavor="hive")
+        dataset = ds.dataset([os.path.join(self.path, name) for name in files], schema=schema,
+                             format="parquet", filesystem=pafs.LocalFileSystem(use_mmap=True),
+                             partitioning=partitioning, partition_base_dir=os.path.join(self.path, kind))
+        with self._lock:
+            if self._manifest is manifest:
+                self._datasets[key] = dataset
+        return dataset
+
+    def _scan(self, columns, filter=None, kind='products', as_of=None):
+        return self._dataset(kind, as_of).to_table(columns=list(columns), filter=filter)
+
+    def _category_filter(self, category_id):
+        import pyarrow.compute as pc
+        return None if category_id is None else pc.field('category_id') == int(category_id)
+
+    def category_summary(self):
+        """Products, average price, total sales and average rating per category"""
+        rows = [{'category_id': category, **{name: entry[name] for name in STATS}}
+                for category, entry in self._snapshot().items()]
+        frame = pd.DataFrame(rows, columns=['category_id', *STATS])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({
+                'category_id': frame['category_id'],
+                'products': frame['rows'].astype(np.int64),
+                'avg_price': frame['price_sum'] / frame['price_count'],
+                'total_sales': frame['sales'].astype(np.int64),
+                'avg_rating': frame['rating_sum'] / frame['rating_count'],
+            })
+
+    def overview(self, category_id=None):
+        """Headline metrics for the whole catalogue or one category"""
+        totals = dict.fromkeys(STATS, 0.0)
+        for category, entry in self._snapshot().items():
+            if category_id is None or category == int(category_id):
+                for name in STATS:
+                    totals[name] += entry[name]
+        return {
+            'products': int(totals['rows']),
+            'avg_price': totals['price_sum'] / totals['price_count'] if totals['price_count'] else 0.0,
+            'total_sales': int(totals['sales']),
+            'avg_rating': totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else 0.0,
+        }
+
+    def sales_trend(self, category_id=None):
+        """Catalogue-wide units sold per snapshot date (each category as of that date)"""
+        rows = [(int(category), entry['date'], entry['sales'])
+                for category, entries in self.manifest()['products'].items()
+                if category_id is None or int(category) == int(category_id)
+                for entry in entries]
+        if not rows:
+            return pd.Series(dtype=float, name='sales')
+        frame = pd.DataFrame(rows, columns=['category_id', 'date', 'sales'])
+        # A category without a snapshot on some date still counts with its previous one
+        by_date = frame.pivot_table(index='date', columns='category_id', values='sales', aggfunc='last')
+        return by_date.sort_index().ffill().sum(axis=1).rename('sales')
+
+    def top_products(self, category_id=None, by='sales', limit=10, as_of=None):
+        """The `limit` best products by a numeric column
+
+        Best sellers come straight from the manifest; other rankings scan the
+        narrow columns first. Either way names are only read from the
+        partitions holding the winners.
+        """
+        import pyarrow.compute as pc
+        if by == 'sales' and limit <= TOP_SELLERS:
+            winners = heapq.nlargest(limit, ((sales, product_id, category)
+                                              for category, entry in self._snapshot(as_of).items()
+                                              if category_id is None or category == int(category_id)
+                                              for product_id, sales in entry['best_sellers']))
+            categories = sorted({category for _, _, category in winners})
+            ids = [product_id for _, product_id, _ in winners]
+        else:
+            ranked = self._scan(('product_id', 'category_id', by), self._category_filter(category_id),
+                                as_of=as_of)
+            ranked = ranked.filter(pc.is_valid(ranked[by]))
+            if ranked.num_rows:
+                ranked = pc.take(ranked, pc.select_k_unstable(ranked, limit, [(by, 'descending')]))
+            categories = pc.unique(ranked['category_id']).to_pylist()
+            ids = ranked['product_id'].to_pylist()
+        table = self._scan(('product_id', 'name', 'price', 'rating', 'sales', 'category_id'),
+                           pc.field('category_id').isin(categories) & pc.field('product_id').isin(ids),
+                           as_of=as_of)
+        return table.to_pandas().sort_values(by, ascending=False, ignore_index=True)
+
+    def price_histogram(self, category_id=None, bins=20):
+        """Product counts per price band, as a Series indexed by the band's lower edge"""
+        prices = self._scan(('price',), self._category_filter(category_id)).column('price')
+        prices = prices.drop_null().to_numpy()
+        if not len(prices):
+            return pd.Series(dtype=np.int64, name='products')
+        counts, edges = np.histogram(prices, bins=bins)
+        return pd.Series(counts, index=edges[:-1].round(2), name='products')
+
+    def competitor_history(self, product_id, since=None):
+        """Exported competitor points for one product, oldest first (history_frame columns)"""
+        import pyarrow.compute as pc
+        condition = pc.field('product_id') == str(product_id)
+        if since is not None:
+            condition &= pc.field('date') >= since
+        table = self._scan(('prices', 'ratings', 'update_times'), condition, kind='history')
+        return table.to_pandas().sort_values('update_times', ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=ANALYTICS_PATH)
+    parser.add_argument("--full", action="store_true", help="rebuild every category from scratch")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    written, _ = AnalyticsStore(args.path).refresh(full=args.full)
+    print(f"wrote {written:,} products in {time.perf_counter() - start:.1f} s")
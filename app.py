@@ -1,26 +1,78 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
+import os
 import time
 from auth import authenticate
+import jobs
 from daraz_api import DarazAPI
 from ai_models import AIModels
 from competitor import CompetitorMonitor
-from database import save_user_product, get_user_products
+from competitor_scheduler import PollingScheduler
+from alerts import AlertEngine, PriceDropRule, UndercutRule, ZScoreRule, my_prices_from_portfolio
+from database import save_user_products_bulk, get_user_products_page, count_user_products, portfolio_fingerprint
+from market_gaps import load_catalogue_rollup
+from analytics import AnalyticsStore
+from metrics import PROFILE_RERUNS, Rerun, instrument, serve
+
+# Time this script run; init_resources and the hot paths below report into it.
+# It is labelled by the sidebar sections that are switched on, once their checkboxes exist
+rerun = Rerun("login", profile=st.session_state.get("profile_reruns", PROFILE_RERUNS)).start()
+SECTIONS = {'dashboard': "Dashboard", 'research': "Product Research", 'ads': "Advertising Tools",
+            'competitor': "Competitor Monitor", 'my_products': "My Products"}
+
+
+def finish_rerun():
+    """Stop timing under the label of the sections this run showed"""
+    if st.session_state.get("user"):
+        rerun.page = " + ".join(label for key, label in SECTIONS.items() if st.session_state.get(key)) or "none"
+    rerun.finish()
+
+
+def end_run(action):
+    """Close the timing, then st.stop() or st.rerun(), which end the script by raising"""
+    try:
+        finish_rerun()
+    finally:
+        action()
+
 
 # Initialize resources
 @st.cache_resource
+@instrument("init_resources")
 def init_resources():
     daraz = DarazAPI()
     ai = AIModels()
     competitor = CompetitorMonitor()
-    return daraz, ai, competitor
+    alerts = AlertEngine([PriceDropRule(), UndercutRule(), ZScoreRule()])
+    competitor.add_listener(alerts.observe)
+    scheduler = PollingScheduler(competitor).start()
+    # Heavy jobs (training, bulk repricing, imports) run in separate worker processes
+    job_workers = int(os.getenv("DARAZ_JOB_WORKERS", "2"))
+    if job_workers:
+        jobs.spawn_worker_pool(job_workers)
+    # Per-category rollups of the catalogue; search results are folded in as they arrive
+    market = load_catalogue_rollup()
+    # Dashboard metrics and charts read a Parquet copy of the catalogue, refreshed in the background
+    analytics = AnalyticsStore(history=competitor.history).start()
+    # Span and page latency histograms for Prometheus on DARAZ_METRICS_PORT
+    serve()
+    return daraz, ai, competitor, scheduler, alerts, market, analytics
 
-daraz, ai, competitor_monitor = init_resources()
+(daraz, ai, competitor_monitor, competitor_scheduler, alert_engine, market_rollup,
+ analytics) = init_resources()
 
 # Authentication
 if not authenticate():
-    st.stop()
+    end_run(st.stop)
+
+# category_id stored for each choice of the Add Product form
+PRODUCT_CATEGORIES = {"Electronics": 301, "Fashion": 302, "Home & Garden": 303}
+
+GAP_COLUMNS = {
+    'category_id': "Category", 'demand': "Demand", 'competition': "Competition",
+    'sellers': "Sellers", 'avg_price': "Avg Price", 'median_price': "Median Price",
+    'low_rated_share': "Rated < 4", 'opportunity': "Score",
+}
 
 # Sample data loading - CACHED
 @st.cache_data
@@ -37,10 +89,18 @@ def load_sample_data():
 
 df = load_sample_data()
 
-# Train AI model only when needed
-if 'model_trained' not in st.session_state:
-    ai.train_price_model(df)
-    st.session_state.model_trained = True
+def ensure_price_model():
+    """Train AI model in a background job; predictions use the fallback until it lands"""
+    # Loading a model pulls in scikit-learn, so only pages that predict call this
+    if 'model_trained' in st.session_state:
+        return
+    if ai.use_price_model_for(df):
+        st.session_state.model_trained = True
+    elif 'train_job' not in st.session_state:
+        st.session_state.train_job = jobs.submit('train_price_model', data=df,
+                                                 user_email=st.session_state.user["email"])
+    elif jobs.get_job(st.session_state.train_job)['status'] in jobs.FINISHED:
+        st.session_state.model_trained = ai.use_price_model_for(df)
 
 # Streamlit app
 st.title("🚀 Daraz Seller Pro")
@@ -49,6 +109,7 @@ st.sidebar.header("Navigation")
 # Dashboard
 if st.sidebar.checkbox("Dashboard", True, key="dashboard"):
     st.header("Product Performance Dashboard")
+    ensure_price_model()
     
     # Product selector
     selected_product = st.selectbox("Select Product", df['name'], key="product_select")
@@ -64,23 +125,59 @@ if st.sidebar.checkbox("Dashboard", True, key="dashboard"):
     predicted_price = ai.predict_price(product_data)
     st.subheader(f"AI Price Recommendation: ${predicted_price:.2f}")
     
+    # Whole-catalogue recommendations in one batched call
+    if st.checkbox("Show catalogue price recommendations", key="catalogue_recs"):
+        recommendations = df[['product_id', 'name', 'price']].assign(
+            recommended_price=ai.predict_prices(df).to_numpy())
+        st.dataframe(recommendations)
+    
+    # Bulk repricing runs in a worker and hands results back as a Parquet file
+    if st.button("Reprice catalogue in background", key="reprice_job_btn"):
+        st.session_state.reprice_job = jobs.submit('predict_prices', {'model_version': ai.model_version},
+                                                   data=df, user_email=st.session_state.user["email"])
+    if 'reprice_job' in st.session_state:
+        reprice = jobs.get_job(st.session_state.reprice_job)
+        if reprice['status'] == 'done':
+            # The session keeps the result; the worker's output file is deleted once read
+            st.session_state.reprice_result = jobs.take_frame(reprice['result']['output_path'])
+            del st.session_state.reprice_job
+        else:
+            st.caption(f"Repricing job #{reprice['id']}: {reprice['status']}")
+    if 'reprice_result' in st.session_state:
+        st.dataframe(st.session_state.reprice_result)
+    
+    # Catalogue overview from the analytics layer
+    st.subheader("Catalogue Overview")
+    overview = analytics.overview()
+    if not overview['products']:
+        st.info("Catalogue metrics appear after the first analytics refresh.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Products", f"{overview['products']:,}")
+        col2.metric("Avg Price", f"${overview['avg_price']:.2f}")
+        col3.metric("Total Sales", f"{overview['total_sales']:,} units")
+        categories = analytics.category_summary().nlargest(10, 'total_sales')
+        st.bar_chart(categories.set_index('category_id')['total_sales'])
+    
     # Sales trend chart
     if st.button("Show Sales Trend", key="show_trend"):
-        trend_data = pd.DataFrame({
-            'Month': ['Jan', 'Feb', 'Mar', 'Apr', 'May'],
-            'Sales': np.random.randint(50, 200, size=5)
-        })
-        st.line_chart(trend_data.set_index('Month'))
-        
-        # Sales forecasting
-        st.subheader("Sales Forecast")
-        forecast_months = st.slider("Months to forecast", 1, 6, 3, key="forecast_slider")
-        forecast = ai.forecast_sales(trend_data['Sales'].tolist(), forecast_months)
-        forecast_df = pd.DataFrame({
-            'Month': [f"Month {i+1}" for i in range(forecast_months)],
-            'Forecasted Sales': forecast
-        })
-        st.line_chart(forecast_df.set_index('Month'))
+        # One point per daily catalogue snapshot
+        trend = analytics.sales_trend()
+        if len(trend) < 2:
+            st.info("The sales trend builds up as daily catalogue snapshots accumulate.")
+        else:
+            trend_data = pd.DataFrame({'Date': trend.index, 'Sales': trend.to_numpy()})
+            st.line_chart(trend_data.set_index('Date'))
+            
+            # Sales forecasting
+            st.subheader("Sales Forecast")
+            forecast_months = st.slider("Months to forecast", 1, 6, 3, key="forecast_slider")
+            forecast = ai.forecast_sales(trend_data['Sales'].tolist(), forecast_months)
+            forecast_df = pd.DataFrame({
+                'Month': [f"Month {i+1}" for i in range(forecast_months)],
+                'Forecasted Sales': forecast
+            })
+            st.line_chart(forecast_df.set_index('Month'))
 
 # Product Research Tool
 if st.sidebar.checkbox("Product Research", key="research"):
@@ -91,6 +188,11 @@ if st.sidebar.checkbox("Product Research", key="research"):
         with st.spinner("Searching Daraz..."):
             results = daraz.search_products(keyword)
             st.dataframe(results.head(10), height=300)
+            # The rollup counts each product once across sessions; this only spares reruns the fold
+            searched = st.session_state.setdefault('gap_keywords', set())
+            if keyword not in searched:
+                searched.add(keyword)
+                market_rollup.add(results)
             
             st.subheader("Top Products")
             top_products = results.nlargest(3, 'sales')
@@ -99,13 +201,12 @@ if st.sidebar.checkbox("Product Research", key="research"):
     
     # Gap analysis
     if st.button("Run Market Gap Analysis", key="gap_analysis"):
-        st.success("Top Opportunity Categories:")
-        opportunities = [
-            {"Category": "Wireless Earbuds", "Demand": "High", "Competition": "Low"},
-            {"Category": "Yoga Mats", "Demand": "Medium", "Competition": "Low"},
-            {"Category": "Phone Lenses", "Demand": "High", "Competition": "Medium"},
-        ]
-        st.table(pd.DataFrame(opportunities))
+        opportunities = market_rollup.report()
+        if opportunities.empty:
+            st.info("Not enough market data yet - search a few keywords first.")
+        else:
+            st.success("Top Opportunity Categories:")
+            st.table(opportunities[GAP_COLUMNS].rename(columns=GAP_COLUMNS))
 
 # Advertising Tools
 if st.sidebar.checkbox("Advertising Tools", key="ads"):
@@ -139,9 +240,25 @@ if st.sidebar.checkbox("Competitor Monitor", key="competitor"):
     
     product_id = st.text_input("Enter Product ID to monitor", key="comp_product_id")
     if product_id:
-        with st.spinner("Tracking competitor pricing..."):
-            competitor_df = competitor_monitor.track_product(product_id)
-            
+        # Polling happens in the background; the page only reads the latest state
+        competitor_scheduler.watch(product_id)
+        competitor_scheduler.touch(product_id)
+        competitor_df = competitor_monitor.history_frame(product_id)
+        
+        # Undercut alerts compare against this seller's own portfolio prices, reloaded when the
+        # portfolio changes (added or imported products, new prices)
+        user_email = st.session_state.user["email"]
+        fingerprint = portfolio_fingerprint(user_email)
+        if st.session_state.get("my_prices_fingerprint") != fingerprint:
+            undercut = next(rule for rule in alert_engine.rules if isinstance(rule, UndercutRule))
+            undercut.set_my_prices(user_email, my_prices_from_portfolio(user_email))
+            st.session_state.my_prices_fingerprint = fingerprint
+        for alert in alert_engine.recent(product_id, limit=5, user_email=user_email):
+            st.warning(f"🔔 {alert.message}")
+        
+        if competitor_df.empty:
+            st.info("Tracking started - the first price check is on its way. Refresh in a moment.")
+        else:
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("Price History")
@@ -150,6 +267,18 @@ if st.sidebar.checkbox("Competitor Monitor", key="competitor"):
             with col2:
                 st.subheader("Rating History")
                 st.line_chart(competitor_df['ratings'])
+            
+            # Where the competitor's latest price sits in its category (the gap report's price index)
+            if product_id.isdigit():
+                category = daraz.get_product_data(int(product_id))['category_id']
+                peers = market_rollup.prices.summary(category)
+                if peers['count']:
+                    latest_price = competitor_df['prices'].iloc[-1]
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Latest Price", f"${latest_price:.2f}",
+                                f"{(latest_price / peers['median'] - 1) * 100:+.1f}% vs median", delta_color="off")
+                    col2.metric(f"Category {category} Median", f"${peers['median']:.2f}")
+                    col3.metric("Category Listings", f"{peers['count']:,}")
 
 # Product Management
 if st.sidebar.checkbox("My Products", key="my_products"):
@@ -160,23 +289,52 @@ if st.sidebar.checkbox("My Products", key="my_products"):
         st.subheader("Add New Product")
         name = st.text_input("Product Name", key="new_product_name")
         price = st.number_input("Price ($)", min_value=0.1, step=0.1, key="new_product_price")
-        category = st.selectbox("Category", ["Electronics", "Fashion", "Home & Garden"], key="new_product_category")
+        category = st.selectbox("Category", list(PRODUCT_CATEGORIES), key="new_product_category")
         
         if st.form_submit_button("Add Product"):
             # Save to database
-            save_user_product(st.session_state.user["email"], {
+            save_user_products_bulk(st.session_state.user["email"], [{
                 "name": name,
                 "price": price,
-                "category": category
-            })
+                "category_id": PRODUCT_CATEGORIES[category]
+            }])
             st.success(f"{name} added to your portfolio!")
     
-    # Show user's products
+    # Bulk import of an existing catalogue (same columns as data/sample_data.csv)
+    with st.expander("Import Catalogue"):
+        catalogue_file = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"], key="catalogue_upload")
+        if catalogue_file is not None and st.button("Import Products", key="import_products_btn"):
+            # Hand the file to a worker instead of importing inside this rerun
+            os.makedirs(jobs.JOB_DIR, exist_ok=True)
+            source_path = os.path.join(jobs.JOB_DIR, f"upload-{time.time_ns()}-{os.path.basename(catalogue_file.name)}")
+            with open(source_path, "wb") as upload:
+                upload.write(catalogue_file.getbuffer())
+            job_id = jobs.submit('import_portfolio', {
+                'user_email': st.session_state.user["email"],
+                'source_path': source_path,
+            }, user_email=st.session_state.user["email"])
+            st.success(f"Import queued as job #{job_id} - progress is shown in the sidebar.")
+    
+    # Show user's products, one keyset page at a time
     st.subheader("Your Products")
-    user_products = get_user_products(st.session_state.user["email"])
+    page_size = st.selectbox("Rows per page", [25, 50, 100, 500], index=1, key="portfolio_page_size")
+    if st.session_state.get("portfolio_page_size_used") != page_size:
+        st.session_state.portfolio_cursors = [0]
+        st.session_state.portfolio_page_size_used = page_size
+    cursors = st.session_state.portfolio_cursors
+    user_products = get_user_products_page(st.session_state.user["email"], cursors[-1], page_size)
     
     if not user_products.empty:
-        st.dataframe(user_products)
+        total = count_user_products(st.session_state.user["email"])
+        st.caption(f"Page {len(cursors)} of {max(1, -(-total // page_size))} ({total} products)")
+        st.dataframe(user_products.drop(columns=["portfolio_id"]))
+        prev_col, next_col = st.columns(2)
+        if prev_col.button("Previous", key="portfolio_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            end_run(st.rerun)
+        if next_col.button("Next", key="portfolio_next", disabled=len(user_products) < page_size):
+            cursors.append(int(user_products['portfolio_id'].iloc[-1]))
+            end_run(st.rerun)
         selected = st.selectbox("Select a product to manage", user_products['name'], key="manage_product_select")
         
         # Product management actions
@@ -186,8 +344,30 @@ if st.sidebar.checkbox("My Products", key="my_products"):
         if st.button("Update Price", key="update_price_btn"):
             # Update in database (pseudo-code)
             st.success(f"Price updated to ${new_price}")
+    elif len(cursors) > 1:
+        # Walked past the last full page; step back
+        cursors.pop()
+        end_run(st.rerun)
     else:
         st.info("You haven't added any products yet")
 
+# Background job status
+with st.sidebar.expander("Background Jobs"):
+    user_jobs = jobs.list_jobs(st.session_state.user["email"], limit=5)
+    if st.button("Refresh", key="refresh_jobs"):
+        end_run(st.rerun)
+    for job in user_jobs:
+        st.caption(f"#{job['id']} {job['kind']} - {job['status']}" + (f": {job['message']}" if job['message'] else ""))
+        if job['status'] not in jobs.FINISHED:
+            st.progress(job['progress'])
+    if not user_jobs:
+        st.caption("No jobs yet")
+
 # Add performance note
-st.sidebar.info("⚡ Performance optimized version")
\ No newline at end of file
+st.sidebar.info("⚡ Performance optimized version")
+st.sidebar.checkbox("Profile reruns", key="profile_reruns", value=PROFILE_RERUNS)
+finish_rerun()
+st.sidebar.caption(rerun.summary())
+if rerun.profile:
+    with st.sidebar.expander("Profile of this run"):
+        st.code(rerun.profile)
\ No newline at end of file
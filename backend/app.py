@@ -1,46 +1,111 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from cache import ResponseCache
 load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
-DARAZ_API_BASE_URL = "https://api.daraz.com"
+DARAZ_API_BASE_URL = os.getenv("DARAZ_API_BASE_URL", "https://api.daraz.com")
 DARAZ_API_KEY = os.getenv("DARAZ_API_KEY")
 DARAZ_USER_ID = os.getenv("DARAZ_USER_ID")
+DARAZ_POOL_SIZE = int(os.getenv("DARAZ_POOL_SIZE", "32"))
+DARAZ_TIMEOUT = float(os.getenv("DARAZ_TIMEOUT", "10"))
+DARAZ_RETRIES = int(os.getenv("DARAZ_RETRIES", "3"))
+DARAZ_MAX_CONCURRENCY = int(os.getenv("DARAZ_MAX_CONCURRENCY", "16"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "30"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "300"))
+CACHE_STALE_TTL = float(os.getenv("CACHE_STALE_TTL", "60"))
+MAX_PRODUCT_IDS = int(os.getenv("MAX_PRODUCT_IDS", "100"))   # per /api/products request
 class DarazAPI:
-    def __init__(self):
+    def __init__(self, pool_size=DARAZ_POOL_SIZE, timeout=DARAZ_TIMEOUT,
+                 retries=DARAZ_RETRIES, backoff_factor=0.2,
+                 max_concurrency=DARAZ_MAX_CONCURRENCY):
         self.base_url = DARAZ_API_BASE_URL
         self.headers = {
             "Authorization": f"Bearer {DARAZ_API_KEY}",
             "Content-Type": "application/json"
         }
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        # One keep-alive session for every call, so requests reuse pooled connections
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET"]))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    def _get(self, endpoint, params):
+        response = self.session.get(self.base_url + endpoint, params=params,
+                                    timeout=self.timeout)
+        # Raising keeps upstream errors out of the response cache
+        response.raise_for_status()
+        return response.json()
     def get_product_details(self, product_id):
         """Get product details by product ID"""
-        endpoint = f"/product/get?product_id={product_id}&user_id={DARAZ_USER_ID}"
-        response = requests.get(self.base_url + endpoint, headers=self.headers)
-        return response.json()
+        return self._get("/product/get", {"product_id": product_id, "user_id": DARAZ_USER_ID})
+    def get_product_details_many(self, product_ids, max_workers=None):
+        """Fetch details for many product IDs concurrently, in input order"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return []
+        workers = min(max_workers or self.max_concurrency, len(product_ids))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self.get_product_details, product_ids))
     def search_products(self, keyword, category_id=None, page=1, page_size=10):
         """Search products by keyword and optional category"""
-        endpoint = f"/product/search?keyword={keyword}&page={page}&page_size={page_size}"
+        params = {"keyword": keyword, "page": page, "page_size": page_size}
         if category_id:
-            endpoint += f"&category_id={category_id}"
-        response = requests.get(self.base_url + endpoint, headers=self.headers)
-        return response.json()
+            params["category_id"] = category_id
+        return self._get("/product/search", params)
+    def close(self):
+        self.session.close()
 daraz_api = DarazAPI()
+response_cache = ResponseCache(max_entries=CACHE_MAX_ENTRIES, stale_ttl=CACHE_STALE_TTL)
+def search_cache_key(keyword, category_id, page, page_size):
+    """Normalize search parameters so equivalent queries share one entry"""
+    keyword = ' '.join((keyword or '').lower().split())
+    return ('search', keyword, str(category_id or '').strip(), page, page_size)
 @app.route('/api/search', methods=['GET'])
 def search_products():
     keyword = request.args.get('keyword')
     category_id = request.args.get('category_id')
     page = request.args.get('page', 1, type=int)
     page_size = request.args.get('page_size', 10, type=int)
-    
-    results = daraz_api.search_products(keyword, category_id, page, page_size)
+
+    results = response_cache.get_or_load(
+        search_cache_key(keyword, category_id, page, page_size),
+        lambda: daraz_api.search_products(keyword, category_id, page, page_size),
+        ttl=SEARCH_CACHE_TTL)
     return jsonify(results)
 @app.route('/api/product/<product_id>', methods=['GET'])
 def get_product(product_id):
-    product_details = daraz_api.get_product_details(product_id)
+    product_details = response_cache.get_or_load(
+        ('product', product_id.strip()),
+        lambda: daraz_api.get_product_details(product_id),
+        ttl=PRODUCT_CACHE_TTL)
     return jsonify(product_details)
+@app.route('/api/products', methods=['GET'])
+def get_products():
+    product_ids = [pid for pid in request.args.get('ids', '').split(',') if pid]
+    if len(product_ids) > MAX_PRODUCT_IDS:
+        return jsonify({"error": f"at most {MAX_PRODUCT_IDS} ids per request"}), 400
+    return jsonify(daraz_api.get_product_details_many(product_ids))
+@app.errorhandler(requests.RequestException)
+def upstream_error(exc):
+    """Pass upstream 4xx through; anything else is a bad gateway"""
+    status = getattr(exc.response, 'status_code', None) or 502
+    return jsonify({"error": str(exc)}), status if 400 <= status < 500 else 502
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(response_cache.stats())
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    app.run(debug=True, port=5001)
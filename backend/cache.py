@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'stale_until')
+
+    def __init__(self, value, expires_at, stale_until):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """Bounded TTL + LRU cache with request coalescing and stale-while-revalidate"""
+
+    def __init__(self, max_entries=10000, ttl=60, stale_ttl=30, refresh_workers=4):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers,
+                                             thread_name_prefix="cache-refresh")
+        self._counters = dict.fromkeys(
+            ('hits', 'stale_hits', 'misses', 'coalesced', 'evictions', 'refreshes', 'errors'), 0)
+
+    def get_or_load(self, key, loader, ttl=None, stale_ttl=None):
+        """Return the cached value for key, calling loader() at most once per miss"""
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.expires_at:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return entry.value
+                if now < entry.stale_until:
+                    # Serve the stale value and refresh it off the request path
+                    self._entries.move_to_end(key)
+                    self._counters['stale_hits'] += 1
+                    if key not in self._inflight:
+                        future = self._inflight[key] = Future()
+                        self._refresher.submit(self._load, key, loader, ttl, stale_ttl, future)
+                        self._counters['refreshes'] += 1
+                    return entry.value
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counters['coalesced'] += 1
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                self._counters['misses'] += 1
+                leader = True
+        if leader:
+            self._load(key, loader, ttl, stale_ttl, future)
+        return future.result()
+
+    def _load(self, key, loader, ttl, stale_ttl, future):
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._counters['errors'] += 1
+            future.set_exception(exc)
+            return
+        self._store(key, value, ttl, stale_ttl)
+        future.set_result(value)
+
+    def _store(self, key, value, ttl, stale_ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = _Entry(value, now + ttl, now + ttl + stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['inflight'] = len(self._inflight)
+        stats['max_entries'] = self.max_entries
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+class AsyncResponseCache(ResponseCache):
+    """ResponseCache for the asyncio gateway: loaders are coroutine functions and
+    waiters share an asyncio future instead of blocking a thread"""
+
+    def __init__(self, max_entries=10000, ttl=60, stale_ttl=30):
+        super().__init__(max_entries, ttl, stale_ttl, refresh_workers=1)
+
+    async def get_or_load(self, key, loader, ttl=None, stale_ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.monotonic()
+        # Everything here runs on the event loop thread, so the lock is never contended
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.expires_at:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return entry.value
+                if now < entry.stale_until:
+                    self._entries.move_to_end(key)
+                    self._counters['stale_hits'] += 1
+                    if key not in self._inflight:
+                        # Refresh in a task; _inflight keeps it referenced until it finishes
+                        self._inflight[key] = self._spawn(key, loader, ttl, stale_ttl)
+                        self._counters['refreshes'] += 1
+                    return entry.value
+            task = self._inflight.get(key)
+            if task is not None:
+                self._counters['coalesced'] += 1
+            else:
+                task = self._inflight[key] = self._spawn(key, loader, ttl, stale_ttl)
+                self._counters['misses'] += 1
+        # Shielded so one disconnecting client doesn't cancel the load for the others
+        return await asyncio.shield(task)
+
+    def _spawn(self, key, loader, ttl, stale_ttl):
+        task = asyncio.ensure_future(self._load_async(key, loader, ttl, stale_ttl))
+        # Background refreshes have no waiter; errors are already counted, so mark them seen
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def _load_async(self, key, loader, ttl, stale_ttl):
+        try:
+            value = await loader()
+        except BaseException:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._counters['errors'] += 1
+            raise
+        self._store(key, value, ttl, stale_ttl)
+        return value
@@ -0,0 +1,248 @@
+"""Async (ASGI) gateway serving the same routes as app.py
+
+Run with:  python gateway.py [--port 5001]   (or: uvicorn gateway:app --app-dir backend)
+
+Every upstream call goes through one httpx.AsyncClient whose connections are
+capped at DARAZ_POOL_SIZE; callers beyond the cap queue instead of opening more.
+Product lookups arriving within DARAZ_BATCH_WINDOW_MS of each other are merged
+by ProductBatcher into one multi-ID upstream call (DARAZ_BATCH_ENDPOINT). If
+the upstream answers that endpoint with 404/405/501 the batcher switches to
+concurrent single lookups for the rest of the process.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app import (CACHE_MAX_ENTRIES, CACHE_STALE_TTL, DARAZ_API_BASE_URL, DARAZ_API_KEY, DARAZ_POOL_SIZE,
+                 DARAZ_RETRIES, DARAZ_TIMEOUT, DARAZ_USER_ID, MAX_PRODUCT_IDS, PRODUCT_CACHE_TTL,
+                 SEARCH_CACHE_TTL, search_cache_key)
+from cache import AsyncResponseCache
+
+DARAZ_BATCH_ENDPOINT = os.getenv("DARAZ_BATCH_ENDPOINT", "/product/get_many")   # empty disables batching
+DARAZ_BATCH_WINDOW_MS = float(os.getenv("DARAZ_BATCH_WINDOW_MS", "2"))
+DARAZ_BATCH_MAX = int(os.getenv("DARAZ_BATCH_MAX", "100"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+UNSUPPORTED_STATUSES = (404, 405, 501)
+
+
+class AsyncDarazAPI:
+    """asyncio counterpart of app.DarazAPI with the same retry policy"""
+
+    def __init__(self, pool_size=DARAZ_POOL_SIZE, timeout=DARAZ_TIMEOUT,
+                 retries=DARAZ_RETRIES, backoff_factor=0.2):
+        self.base_url = DARAZ_API_BASE_URL
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        # The semaphore is the connection cap: excess calls wait here (FIFO)
+        # rather than timing out in httpx's pool
+        self._slots = asyncio.Semaphore(pool_size)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url, timeout=timeout,
+            headers={"Authorization": f"Bearer {DARAZ_API_KEY}", "Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+
+    async def _get(self, endpoint, params):
+        """GET with retries on connection errors and RETRY_STATUSES; returns the response"""
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._slots:
+                    response = await self.client.get(endpoint, params=params)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+
+    async def get_product_details(self, product_id):
+        response = await self._get("/product/get", {"product_id": product_id, "user_id": DARAZ_USER_ID})
+        response.raise_for_status()   # errors are raised, so never cached
+        return response.json()
+
+    async def get_product_details_batch(self, product_ids, endpoint=DARAZ_BATCH_ENDPOINT):
+        """{product_id: details} from one multi-ID call, or None if the upstream lacks the endpoint"""
+        response = await self._get(endpoint, {"product_ids": ",".join(product_ids), "user_id": DARAZ_USER_ID})
+        if response.status_code in UNSUPPORTED_STATUSES:
+            return None
+        response.raise_for_status()
+        return {str(product.get('product_id')): product for product in response.json().get('products', [])}
+
+    async def search_products(self, keyword, category_id=None, page=1, page_size=10):
+        params = {"keyword": keyword, "page": page, "page_size": page_size}
+        if category_id:
+            params["category_id"] = category_id
+        response = await self._get("/product/search", params)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class ProductBatcher:
+    """Merges product lookups made within `window` seconds into one upstream call"""
+
+    def __init__(self, api, window=DARAZ_BATCH_WINDOW_MS / 1000, max_batch=DARAZ_BATCH_MAX,
+                 batch_endpoint=DARAZ_BATCH_ENDPOINT):
+        self.api = api
+        self.window = window
+        self.max_batch = max_batch
+        self.batch_endpoint = batch_endpoint
+        self.supported = bool(batch_endpoint)
+        self._pending = {}   # product_id -> future shared by every caller waiting on it
+        self._timer = None
+        self._tasks = set()
+        self.counters = dict.fromkeys(('lookups', 'merged', 'batches', 'batched_ids', 'single_calls'), 0)
+
+    async def get(self, product_id):
+        self.counters['lookups'] += 1
+        future = self._pending.get(product_id)
+        if future is None:
+            future = self._pending[product_id] = asyncio.get_running_loop().create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        else:
+            self.counters['merged'] += 1
+        # Shielded so one disconnecting client doesn't cancel the lookup for the others
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._fetch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch):
+        found = {}
+        if self.supported and len(batch) > 1:
+            try:
+                found = await self.api.get_product_details_batch(list(batch), self.batch_endpoint)
+            except Exception:
+                found = {}   # fall back to single lookups, which surface the upstream's own errors
+            if found is None:
+                self.supported, found = False, {}
+            else:
+                self.counters['batches'] += 1
+                self.counters['batched_ids'] += len(found)
+        for product_id, details in found.items():
+            future = batch.get(product_id)
+            if future is not None and not future.done():
+                future.set_result(details)
+        missing = [product_id for product_id, future in batch.items() if not future.done()]
+        self.counters['single_calls'] += len(missing)
+        results = await asyncio.gather(*(self.api.get_product_details(product_id) for product_id in missing),
+                                       return_exceptions=True)
+        for product_id, result in zip(missing, results):
+            future = batch[product_id]
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['avg_batch_size'] = stats['batched_ids'] / stats['batches'] if stats['batches'] else 0.0
+        stats['batch_endpoint_supported'] = self.supported
+        return stats
+
+
+response_cache = AsyncResponseCache(max_entries=CACHE_MAX_ENTRIES, stale_ttl=CACHE_STALE_TTL)
+
+
+def int_arg(request, name, default):
+    """request.args.get(name, default, type=int), Flask-style"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+async def search_products(request):
+    keyword = request.query_params.get('keyword')
+    category_id = request.query_params.get('category_id')
+    page = int_arg(request, 'page', 1)
+    page_size = int_arg(request, 'page_size', 10)
+    api = request.app.state.daraz_api
+    results = await response_cache.get_or_load(
+        search_cache_key(keyword, category_id, page, page_size),
+        lambda: api.search_products(keyword, category_id, page, page_size),
+        ttl=SEARCH_CACHE_TTL)
+    return JSONResponse(results)
+
+
+async def get_product(request):
+    product_id = request.path_params['product_id']
+    batcher = request.app.state.batcher
+    product_details = await response_cache.get_or_load(
+        ('product', product_id.strip()),
+        lambda: batcher.get(product_id),
+        ttl=PRODUCT_CACHE_TTL)
+    return JSONResponse(product_details)
+
+
+async def get_products(request):
+    product_ids = [pid for pid in request.query_params.get('ids', '').split(',') if pid]
+    if len(product_ids) > MAX_PRODUCT_IDS:
+        return JSONResponse({"error": f"at most {MAX_PRODUCT_IDS} ids per request"}, status_code=400)
+    batcher = request.app.state.batcher
+    return JSONResponse(list(await asyncio.gather(*(batcher.get(pid) for pid in product_ids))))
+
+
+async def cache_stats(request):
+    return JSONResponse(response_cache.stats())
+
+
+async def batch_stats(request):
+    return JSONResponse(request.app.state.batcher.stats())
+
+
+async def upstream_error(request, exc):
+    """Pass upstream 4xx through; anything else is a bad gateway"""
+    status = exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else 502
+    return JSONResponse({"error": str(exc)}, status_code=status if 400 <= status < 500 else 502)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # The client and batcher belong to the server's event loop, so they are built here
+    app.state.daraz_api = AsyncDarazAPI()
+    app.state.batcher = ProductBatcher(app.state.daraz_api)
+    yield
+    await app.state.daraz_api.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/search', search_products, methods=['GET']),
+        Route('/api/product/{product_id}', get_product, methods=['GET']),
+        Route('/api/products', get_products, methods=['GET']),
+        Route('/api/cache/stats', cache_stats, methods=['GET']),
+        Route('/api/batch/stats', batch_stats, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'])],
+    exception_handlers={httpx.HTTPError: upstream_error},
+    lifespan=lifespan)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
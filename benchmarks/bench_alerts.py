@@ -0,0 +1,40 @@
+"""AlertEngine throughput: 50k listings, one point per listing per minute, single core"""
+import argparse
+
+import numpy as np
+
+import common
+from alerts import AlertEngine, PriceDropRule, UndercutRule, ZScoreRule
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listings", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=20, help="simulated minutes")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    ids = [str(i) for i in range(args.listings)]
+    my_prices = {pid: 25.0 for pid in ids[::10]}
+    engine = AlertEngine([PriceDropRule(percent=5), UndercutRule({'seller@example.com': my_prices}), ZScoreRule()])
+    prices = np.full(args.listings, 25.0)
+
+    elapsed = 0.0
+    alerts = 0
+    for minute in range(args.rounds):
+        prices *= rng.uniform(0.97, 1.03, args.listings)
+        batch = prices.tolist()
+        raised, took = common.timed(
+            lambda: sum(len(engine.observe(pid, minute * 60.0, price)) for pid, price in zip(ids, batch)))
+        alerts += raised
+        elapsed += took
+
+    updates = args.listings * args.rounds
+    per_minute = elapsed / args.rounds
+    print(f"{updates:,} updates in {elapsed:.2f} s  ->  {updates / elapsed:,.0f} updates/s, "
+          f"{elapsed / updates * 1e6:.2f} us/update")
+    print(f"one {args.listings:,}-listing minute takes {per_minute:.2f} s "
+          f"({per_minute / 60:.1%} of one core); {alerts:,} alerts raised")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Dashboard aggregations: SQLite queries versus the partitioned Parquet analytics layer"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import common
+
+tmp = tempfile.mkdtemp(prefix="daraz-analytics-")
+os.environ.setdefault("DARAZ_DB_PATH", os.path.join(tmp, "analytics.db"))
+
+from analytics import AnalyticsStore  # noqa: E402
+from database import UPSERT_PRODUCT, get_pool  # noqa: E402
+
+CHUNK = 500_000
+SQL = {
+    'overview': "SELECT COUNT(*), AVG(price), SUM(sales), AVG(rating) FROM products",
+    'category summary': '''SELECT category_id, COUNT(*), AVG(price), SUM(sales), AVG(rating)
+                           FROM products GROUP BY category_id''',
+    'top 10 products': "SELECT id, name, price, rating, sales FROM products ORDER BY sales DESC LIMIT 10",
+    'top 10 in category': '''SELECT id, name, price, rating, sales FROM products WHERE category_id = 250
+                             ORDER BY sales DESC LIMIT 10''',
+    'price histogram': "SELECT CAST(price / 5 AS INTEGER), COUNT(*) FROM products GROUP BY 1",
+}
+
+
+def populate(rows, categories):
+    rng = np.random.default_rng(0)
+    with get_pool().connection() as conn:
+        for start in range(0, rows, CHUNK):
+            size = min(CHUNK, rows - start)
+            ids = np.arange(start + 1, start + size + 1)
+            with conn:
+                conn.executemany(UPSERT_PRODUCT, zip(
+                    ids.tolist(), (f"Product {i}" for i in ids.tolist()),
+                    rng.uniform(5, 100, size).round(2).tolist(), rng.uniform(3, 5, size).round(1).tolist(),
+                    rng.integers(0, 5000, size).tolist(), rng.integers(100, 100 + categories, size).tolist(),
+                    rng.integers(5000, 6000, size).tolist()))
+
+
+def sqlite_query(sql):
+    with get_pool().connection() as conn:
+        return conn.execute(sql).fetchall()
+
+
+def scan_summary(store):
+    """Category summary computed from the files rather than the manifest totals"""
+    table = store._scan(('category_id', 'price', 'sales', 'rating'))
+    return table.group_by('category_id').aggregate(
+        [('price', 'mean'), ('sales', 'sum'), ('rating', 'mean'), ('category_id', 'count')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--categories", type=int, default=400)
+    parser.add_argument("--updates", type=int, default=10_000, help="products changed before the incremental refresh")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    try:
+        _, seconds = common.timed(populate, args.rows, args.categories)
+        print(f"populated {args.rows:,} products in {seconds:.1f} s")
+        store = AnalyticsStore(os.path.join(tmp, "analytics"))
+        (written, _), seconds = common.timed(store.refresh)
+        print(f"full export of {written:,} products in {seconds:.1f} s ({written / seconds:,.0f} rows/s)")
+
+        queries = {
+            'overview': store.overview,
+            'category summary': store.category_summary,
+            'top 10 products': store.top_products,
+            'top 10 in category': lambda: store.top_products(category_id=250),
+            'price histogram': store.price_histogram,
+        }
+        for name, sql in SQL.items():
+            for backend, run in (("sqlite", lambda: sqlite_query(sql)), ("parquet", queries[name])):
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    run()
+                    latencies.append(time.perf_counter() - start)
+                common.report(f"{name} [{backend}]", latencies, sum(latencies))
+        latencies = [common.timed(scan_summary, store)[1] for _ in range(args.repeat)]
+        common.report("category summary [parquet scan]", latencies, sum(latencies))
+
+        rng = np.random.default_rng(1)
+        changed = rng.choice(np.arange(1, args.rows + 1), args.updates, replace=False).tolist()
+        with get_pool().connection() as conn:
+            with conn:
+                conn.executemany("UPDATE products SET sales = sales + 1, category_id = ? WHERE id = ?",
+                                 ((int(category), product_id) for category, product_id in
+                                  zip(rng.integers(100, 100 + args.categories, args.updates), changed)))
+        (written, _), seconds = common.timed(store.refresh)
+        print(f"incremental refresh of {written:,} changed products in {seconds:.2f} s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
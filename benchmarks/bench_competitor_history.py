@@ -0,0 +1,66 @@
+"""Competitor history: per-product Python lists vs HistoryStore ring buffers"""
+import argparse
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from common import current_rss_mb
+
+
+def run(kind, products, points):
+    from history_store import HistoryStore
+    before = current_rss_mb()
+    start = time.perf_counter()
+    if kind == "lists":
+        data = {}
+        for t in range(points):
+            for p in range(products):
+                entry = data.setdefault(p, {'prices': [], 'ratings': [], 'update_times': []})
+                entry['prices'].append(20.0 + t)
+                entry['ratings'].append(4.5)
+                entry['update_times'].append(float(t))
+        write = time.perf_counter() - start
+        start = time.perf_counter()
+        for p in range(products):
+            pd.DataFrame(data[p])
+    else:
+        store = HistoryStore(capacity=points, initial_products=products)
+        for t in range(points):
+            for p in range(products):
+                store.append(p, float(t), 20.0 + t, 4.5)
+        write = time.perf_counter() - start
+        start = time.perf_counter()
+        for p in range(products):
+            store.frame(p)
+        read = time.perf_counter() - start
+        start = time.perf_counter()
+        for p in range(products):
+            store.arrays(p)
+        views = time.perf_counter() - start
+        print(f"{current_rss_mb() - before:.1f} {write:.3f} {read:.3f} {views:.3f}")
+        return
+    read = time.perf_counter() - start
+    print(f"{current_rss_mb() - before:.1f} {write:.3f} {read:.3f} nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--points", type=int, default=200)
+    args = parser.parse_args()
+    for kind in ("lists", "ring"):
+        out = subprocess.run([sys.executable, __file__, "--child", kind, str(args.products), str(args.points)],
+                             capture_output=True, text=True, check=True)
+        rss, write, read, views = map(float, out.stdout.split())
+        print(f"{kind:<6} {args.products:,} products x {args.points} points   RSS {rss:8.1f} MB   "
+              f"appends {args.products * args.points / write:10,.0f}/s   "
+              f"read all as DataFrames {read:6.2f} s   as arrays {views:6.2f} s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        run(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
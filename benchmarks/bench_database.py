@@ -0,0 +1,95 @@
+"""Inserts/sec and reads/sec from concurrent sessions: per-call connections vs the pool"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+
+import pandas as pd
+
+TMP_DIR = tempfile.mkdtemp(prefix="daraz-bench-")
+os.environ["DARAZ_DB_PATH"] = os.path.join(TMP_DIR, "pooled.db")
+
+import common  # noqa: E402
+import database  # noqa: E402
+
+LEGACY_PATH = os.path.join(TMP_DIR, "legacy.db")
+
+
+def legacy_init_db():
+    conn = sqlite3.connect(LEGACY_PATH, timeout=30)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS products (
+                 id INTEGER PRIMARY KEY, name TEXT, price REAL, rating REAL,
+                 sales INTEGER, category_id INTEGER)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS user_products (
+                 id INTEGER PRIMARY KEY, user_email TEXT, product_id INTEGER)''')
+    conn.commit()
+    return conn
+
+
+def legacy_save_user_product(user_email, product_id):
+    conn = legacy_init_db()
+    conn.execute("INSERT INTO user_products (user_email, product_id) VALUES (?, ?)",
+                 (user_email, product_id))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_user_products(user_email):
+    conn = legacy_init_db()
+    df = pd.read_sql_query(f'''
+    SELECT p.* FROM products p JOIN user_products up ON p.id = up.product_id
+    WHERE up.user_email = '{user_email}' ''', conn)
+    conn.close()
+    return df
+
+
+def seed(conn, products):
+    conn.executemany("INSERT OR REPLACE INTO products (id, name, price, rating, sales, category_id) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     [(i, f"Product {i}", 10.0, 4.5, 100, 300 + i % 10) for i in range(products)])
+    conn.commit()
+
+
+def run_threads(sessions, ops, fn):
+    def worker(session):
+        for i in range(ops):
+            fn(f"seller{session}@example.com", i)
+    threads = [threading.Thread(target=worker, args=(s,)) for s in range(sessions)]
+
+    def run_all():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    _, elapsed = common.timed(run_all)
+    return sessions * ops / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200, help="operations per session")
+    args = parser.parse_args()
+
+    legacy_conn = legacy_init_db()
+    seed(legacy_conn, 50)
+    legacy_conn.close()
+    with database.init_db().connection() as conn:
+        seed(conn, 50)
+
+    results = {
+        "legacy": (lambda e, i: legacy_save_user_product(e, i % 50),
+                   lambda e, i: legacy_get_user_products(e)),
+        "pooled": (lambda e, i: database.save_user_product(e, i % 50),
+                   lambda e, i: database.get_user_products(e)),
+    }
+    for name, (insert, read) in results.items():
+        inserts = run_threads(args.sessions, args.ops, insert)
+        reads = run_threads(args.sessions, args.ops, read)
+        print(f"{name:<7} {args.sessions} sessions   inserts {inserts:9.0f}/s   reads {reads:9.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""SalesForecaster: fit/update/forecast throughput for 100k SKUs plus an accuracy backtest"""
+import argparse
+
+import numpy as np
+
+import common
+from forecasting import SalesForecaster, backtest
+
+
+def synthetic_sales(skus, months, seed=0):
+    """Monthly unit sales with a per-SKU level, trend, yearly season and Poisson noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    level = rng.lognormal(4, 1, (skus, 1))
+    trend = rng.normal(0, 0.01, (skus, 1)) * level
+    amplitude = rng.uniform(0, 0.4, (skus, 1)) * level
+    phase = rng.uniform(0, 2 * np.pi, (skus, 1))
+    mean = np.maximum(level + trend * t + amplitude * np.sin(2 * np.pi * t / 12 + phase), 0.1)
+    sales = rng.poisson(mean).astype(float)
+    # Some SKUs launched recently: no sales history before launch
+    launched = rng.integers(0, months // 2, skus) * (rng.random(skus) < 0.2)
+    sales[t[None, :] < launched[:, None]] = np.nan
+    return sales
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--skus", type=int, default=100_000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--backtest-skus", type=int, default=10_000)
+    args = parser.parse_args()
+    series = synthetic_sales(args.skus, args.months + 1)
+    history, next_month = series[:, :-1], series[:, -1]
+    skus = [f"sku-{i}" for i in range(args.skus)]
+
+    forecaster = SalesForecaster()
+    _, elapsed = common.timed(forecaster.fit, skus, history)
+    print(f"fit        {args.skus:,} x {args.months} months   {elapsed:6.2f} s")
+
+    _, elapsed = common.timed(forecaster.forecast, horizon=args.horizon)
+    print(f"forecast   {args.skus:,} x {args.horizon} months    {elapsed:6.3f} s")
+
+    _, elapsed = common.timed(forecaster.update, skus, next_month)
+    print(f"update     one new month for {args.skus:,} SKUs  {elapsed:6.3f} s")
+
+    sample = series[:args.backtest_skus]
+    scores, elapsed = common.timed(backtest, sample, horizon=args.horizon)
+    print(f"\nbacktest on {len(sample):,} SKUs, rolling origins, horizon {args.horizon} "
+          f"({elapsed:.1f} s)")
+    for name, metrics in scores.items():
+        print(f"  {name:<15} sMAPE {metrics['smape']:6.1%}   MASE {metrics['mase']:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
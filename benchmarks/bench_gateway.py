@@ -0,0 +1,143 @@
+"""Flask (threaded Werkzeug) versus the async gateway at 1k concurrent clients
+
+Run with:  python bench_gateway.py [--clients 1000] [--requests 20000] [--latency 0.02]
+
+The stub upstream and each server under test run in their own processes; this
+process is the load generator: --clients keep-alive connections, each sending
+its share of the requests back to back. Product IDs are unique per request,
+so every lookup misses the response cache and goes upstream.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import common
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def serve(kind, port):
+    """Child process: run one server on port until killed"""
+    if kind == "flask":
+        import logging
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)   # no access log
+        backend = common.load_backend()
+        make_server("127.0.0.1", port, backend.app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        gateway = common.load_backend(name="daraz_gateway", filename="gateway.py")
+        uvicorn.run(gateway.app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn(args, env, port):
+    process = subprocess.Popen(args, env=env, cwd=HERE)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit(f"{args} did not start listening on {port}")
+
+
+async def client(port, paths, latencies, errors):
+    """One keep-alive connection sending its paths in turn (reconnecting if the server closes it)"""
+    reader = writer = None
+    for path in paths:
+        began = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+            length = int(head.split("content-length:", 1)[1].split("\r\n", 1)[0])
+            await reader.readexactly(length)
+            if not head.startswith("http/1.1 200"):
+                errors.append(head.split("\r\n", 1)[0])
+            elif "connection: close" in head:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, IndexError, ValueError) as exc:
+            errors.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - began)
+    if writer is not None:
+        writer.close()
+
+
+def load(port, paths, clients):
+    latencies, errors = [], []
+
+    async def run():
+        shares = [paths[index::clients] for index in range(clients)]
+        await asyncio.gather(*(client(port, share, latencies, errors) for share in shares if share))
+    start = time.perf_counter()
+    asyncio.run(run())
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub upstream latency in seconds")
+    parser.add_argument("--servers", nargs="+", default=["flask", "gateway"], choices=["flask", "gateway"])
+    parser.add_argument("--no-batch", action="store_true", help="upstream without the multi-ID endpoint")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    stub_port = free_port()
+    stub = spawn([sys.executable, "stub_daraz.py", "--port", str(stub_port), "--latency", str(args.latency)]
+                 + (["--no-batch"] if args.no_batch else []), dict(os.environ), stub_port)
+    env = dict(os.environ, DARAZ_API_BASE_URL=f"http://127.0.0.1:{stub_port}", DARAZ_METRICS_PORT="0")
+    scenarios = (
+        ("GET /api/product/<id> (miss)", lambda run: [f"/api/product/{run}{n}" for n in range(args.requests)]),
+        ("GET /api/products?ids=10", lambda run: [f"/api/products?ids={','.join(f'{run}{n}{i}' for i in range(10))}"
+                                                  for n in range(args.requests // 10)]),
+    )
+    try:
+        for kind in args.servers:
+            port = free_port()
+            server = spawn([sys.executable, __file__, "--serve", kind, "--port", str(port)], env, port)
+            try:
+                for run, (name, make_paths) in enumerate(scenarios, start=1):
+                    latencies, errors, elapsed = load(port, make_paths(run), args.clients)
+                    common.report(f"{kind:<8} {name}", latencies, elapsed)
+                    if errors:
+                        print(f"{'':9}{len(errors)} errors, e.g. {sorted(set(errors))[:3]}")
+                if kind == "gateway":
+                    stats = json.load(urllib.request.urlopen(f"http://127.0.0.1:{port}/api/batch/stats"))
+                    print(f"{'':9}batcher: {stats['batches']} upstream batches (avg {stats['avg_batch_size']:.1f} ids), "
+                          f"{stats['single_calls']} single calls for {stats['lookups']} lookups")
+            finally:
+                server.kill()
+                server.wait()
+    finally:
+        stub.kill()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
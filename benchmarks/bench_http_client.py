@@ -0,0 +1,59 @@
+"""Per-call requests.get versus the pooled DarazAPI client, against the local stub"""
+import argparse
+import time
+
+import requests
+
+from common import load_backend, report
+from stub_daraz import start_stub
+
+
+def per_call(api, product_ids):
+    """The original path: a fresh connection for every request"""
+    latencies = []
+    for pid in product_ids:
+        start = time.perf_counter()
+        requests.get(f"{api.base_url}/product/get?product_id={pid}&user_id=bench",
+                     headers=api.headers).json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def pooled(api, product_ids):
+    latencies = []
+    for pid in product_ids:
+        start = time.perf_counter()
+        api.get_product_details(pid)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server, base_url = start_stub(latency=args.latency)
+    backend = load_backend(base_url)
+    api = backend.DarazAPI(max_concurrency=args.concurrency)
+    product_ids = list(range(1000, 1000 + args.requests))
+
+    for name, fn in (("per-call requests.get", per_call), ("pooled session", pooled)):
+        start = time.perf_counter()
+        latencies = fn(api, product_ids)
+        report(name, latencies, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    api.get_product_details_many(product_ids)
+    elapsed = time.perf_counter() - start
+    # Batch latency is per batch; report its throughput only
+    report(f"get_product_details_many (x{args.concurrency})", [elapsed], elapsed, count=len(product_ids))
+
+    api.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Portfolio import throughput: per-row save_user_product vs bulk CSV/Parquet import"""
+import argparse
+import os
+import tempfile
+import time
+
+TMP_DIR = tempfile.mkdtemp(prefix="daraz-bench-")
+os.environ["DARAZ_DB_PATH"] = os.path.join(TMP_DIR, "import.db")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import common  # noqa: E402
+import database  # noqa: E402
+
+
+def synthetic_catalogue(rows, seed=0):
+    """Rows shaped like data/sample_data.csv"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    return pd.DataFrame({
+        'product_id': ids,
+        'name': "Product " + ids.astype(str).astype(object),
+        'price': rng.uniform(5, 100, rows).round(2),
+        'rating': rng.uniform(3.5, 5, rows).round(1),
+        'sales': rng.integers(100, 5000, rows),
+        'seller_id': rng.integers(5000, 6000, rows),
+        'category_id': rng.integers(100, 500, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--per-row-sample", type=int, default=2000,
+                        help="rows timed on the per-row path (it is extrapolated)")
+    args = parser.parse_args()
+    frame = synthetic_catalogue(args.rows)
+    csv_path = os.path.join(TMP_DIR, "catalogue.csv")
+    parquet_path = os.path.join(TMP_DIR, "catalogue.parquet")
+    frame.to_csv(csv_path, index=False)
+    frame.to_parquet(parquet_path)
+    database.init_db()
+
+    start = time.perf_counter()
+    for product_id in frame['product_id'][:args.per_row_sample].tolist():
+        database.save_user_product("per-row@example.com", product_id)
+    per_row = args.per_row_sample / (time.perf_counter() - start)
+    print(f"save_user_product per row   {per_row:12,.0f} rows/s   "
+          f"(~{args.rows / per_row:6.1f} s for {args.rows:,})")
+
+    for label, user, source in (("import_user_products csv", "csv@example.com", csv_path),
+                                ("import_user_products parquet", "pq@example.com", parquet_path)):
+        count, elapsed = common.timed(database.import_user_products, user, source)
+        print(f"{label:<27} {count / elapsed:12,.0f} rows/s   ({elapsed:6.2f} s for {count:,})")
+
+    queue = database.get_write_behind()
+    start = time.perf_counter()
+    for product_id in frame['product_id'][:args.rows // 10].tolist():
+        database.save_user_product("deferred@example.com", product_id, defer=True)
+    queue.flush()
+    elapsed = time.perf_counter() - start
+    print(f"{'write-behind single inserts':<27} {args.rows // 10 / elapsed:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
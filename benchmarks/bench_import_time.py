@@ -0,0 +1,82 @@
+"""Cold import cost of the app modules, summarized from `python -X importtime`
+
+Each module is imported in a fresh interpreter. Exits non-zero when a module
+blows its budget or drags in a heavy stack it should only load lazily.
+"""
+import argparse
+import subprocess
+import sys
+
+import common
+
+# Modules the Streamlit pages and job workers import at start-up, with their budgets (ms)
+BUDGETS = {
+    'database': 1000,
+    'daraz_api': 1000,
+    'competitor': 1000,
+    'alerts': 50,
+    'ai_models': 1000,
+    'jobs': 1000,
+    'analytics': 1000,
+    'shared_catalogue': 1000,
+    'price_stats': 1000,
+}
+# Only loaded when a model is trained or scored, or (Streamlit) by the app itself
+LAZY = ('sklearn', 'joblib', 'streamlit', 'torch', 'transformers')
+
+
+def profile(module):
+    """Return [(cumulative_us, self_us, depth, name)] for the subtree of one cold import"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=common.ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    # Output is post-order: the module's subtree runs back to the previous top-level line,
+    # which leaves out whatever site/.pth imports the interpreter did on start-up
+    start = len(rows) - 1
+    while start > 0 and rows[start - 1][2] > 0:
+        start -= 1
+    return rows[start:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS))
+    parser.add_argument("--repeat", type=int, default=3, help="best of N cold imports")
+    parser.add_argument("--top", type=int, default=5, help="heaviest direct imports to list")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        runs = [profile(module) for _ in range(args.repeat)]
+        rows = min(runs, key=lambda run: run[-1][0])
+        total_ms = rows[-1][0] / 1000
+        budget = BUDGETS.get(module)
+        verdict = "" if budget is None else f"(budget {budget} ms)"
+        print(f"{module:<12} {total_ms:8.1f} ms {verdict}")
+        direct = sorted((row for row in rows if row[2] == 1), reverse=True)[:args.top]
+        for cumulative_us, _, _, name in direct:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+        loaded = {row[3].split(".")[0] for row in rows}
+        heavy = sorted(loaded.intersection(LAZY))
+        if heavy:
+            print(f"    eagerly imports {', '.join(heavy)}")
+            failures.append(f"{module} imports {', '.join(heavy)}")
+        if budget is not None and total_ms > budget:
+            failures.append(f"{module} took {total_ms:.0f} ms > {budget} ms")
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Streaming catalogue ingest (ingest.py CLI): rows/s, peak RSS, and resume after a kill"""
+import argparse
+import os
+import resource
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import common
+
+WRITE_CHUNK = 200_000
+
+
+def dirty_chunk(start, rows, rng):
+    """sample_data.csv-shaped rows with a sprinkling of invalid values and duplicates"""
+    ids = np.arange(start + 1, start + rows + 1).astype(object)
+    ids[rng.random(rows) < 0.001] = "n/a"
+    ids[rng.random(rows) < 0.001] = start + 1  # repeated ids upsert the same product
+    rating = rng.uniform(3.0, 5.0, rows).round(1).astype(object)
+    rating[rng.random(rows) < 0.001] = 7.5
+    return pd.DataFrame({
+        'product_id': ids,
+        'name': "Product " + np.arange(start + 1, start + rows + 1).astype(str).astype(object),
+        'price': rng.uniform(5, 100, rows).round(2),
+        'rating': rating,
+        'sales': rng.integers(0, 5000, rows),
+        'seller_id': rng.integers(5000, 6000, rows),
+        'category_id': rng.integers(100, 500, rows),
+    })
+
+
+def write_catalogue(path, rows, fmt):
+    """Write the dump chunk by chunk so generating it needs little memory either"""
+    rng = np.random.default_rng(0)
+    writer = None
+    with open(path, "w") as out:
+        for start in range(0, rows, WRITE_CHUNK):
+            chunk = dirty_chunk(start, min(WRITE_CHUNK, rows - start), rng)
+            if fmt == 'csv':
+                chunk.to_csv(out, header=start == 0, index=False)
+            elif fmt == 'jsonl':
+                chunk.to_json(out, orient='records', lines=True)
+                out.write("\n")
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk.astype({'product_id': str, 'rating': str}),
+                                             preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+    if writer is not None:
+        writer.close()
+
+
+def run_ingest(path, env, kill_after=None):
+    """Run the CLI in a child process; returns (seconds, child peak RSS MB so far, stdout)"""
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, os.path.join(common.ROOT, "ingest.py"), path],
+                             env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        output, _ = child.communicate(timeout=kill_after)
+    except subprocess.TimeoutExpired:
+        child.send_signal(signal.SIGINT)
+        output, _ = child.communicate()
+    elapsed = time.perf_counter() - start
+    return elapsed, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, output.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="use 20000000 for the full target")
+    parser.add_argument("--format", choices=("csv", "parquet", "jsonl"), default="csv")
+    parser.add_argument("--kill-after", type=float, default=3.0, help="seconds before interrupting run 1")
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp(prefix="daraz-ingest-")
+    path = os.path.join(tmp, f"catalogue.{args.format}")
+    db_path = os.path.join(tmp, "ingest.db")
+    env = dict(os.environ, DARAZ_DB_PATH=db_path)
+
+    _, seconds = common.timed(write_catalogue, path, args.rows, args.format)
+    print(f"wrote {args.rows:,} rows ({os.path.getsize(path) / 2**20:,.0f} MB {args.format}) "
+          f"in {seconds:.1f} s")
+
+    first, _, _ = run_ingest(path, env, kill_after=args.kill_after)
+    with sqlite3.connect(db_path) as conn:
+        checkpoint = conn.execute("SELECT rows FROM ingest_checkpoints").fetchone()
+    print(f"run 1 interrupted after {first:.1f} s at checkpoint {checkpoint[0] if checkpoint else 0:,} rows")
+
+    second, peak, output = run_ingest(path, env)
+    print(f"run 2 (resumed): {output}")
+    with sqlite3.connect(db_path) as conn:
+        stored = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    print(f"total {first + second:.1f} s, {stored:,} products stored, peak child RSS {peak:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Cost of metrics spans: per call, and relative to the instrumented hot paths"""
+import argparse
+import os
+import tempfile
+import time
+import urllib.request
+import warnings
+
+tmp = tempfile.mkdtemp(prefix="daraz-metrics-")
+os.environ.setdefault("DARAZ_DB_PATH", os.path.join(tmp, "metrics.db"))
+os.environ.setdefault("DARAZ_MODEL_DIR", os.path.join(tmp, "models"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import common  # noqa: E402
+import metrics  # noqa: E402
+from ai_models import AIModels  # noqa: E402
+from daraz_api import DarazAPI  # noqa: E402
+from database import get_user_products_page, save_user_products_bulk  # noqa: E402
+
+QUERIES = ["wireless earbuds", "charger", "yoga mat", "water bottle", "speaker"]
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - start) / calls
+
+
+def rerun(api, ai, product, email):
+    """What one dashboard + research rerun calls on the hot paths"""
+    with metrics.Rerun("bench") as run:
+        for query in QUERIES:
+            api.search_products(query)
+        ai.predict_price(product)
+        get_user_products_page(email, 0, 50)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--reruns", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5, help="alternating reruns per warm-up rerun")
+    parser.add_argument("--port", type=int, default=19464, help="port for the /metrics check")
+    args = parser.parse_args()
+
+    def noop():
+        return None
+    wrapped = metrics.instrument("noop")(noop)
+
+    def with_span():
+        with metrics.span("noop_block"):
+            pass
+    bare, decorated, block = (per_call_ns(fn, args.calls) for fn in (noop, wrapped, with_span))
+    print(f"span cost: decorator {decorated - bare:.0f} ns/call, context manager {block - bare:.0f} ns/call")
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'product_id': np.arange(2000), 'name': [f"Product {i}" for i in range(2000)],
+                         'rating': rng.uniform(3.5, 5.0, 2000).round(1), 'sales': rng.integers(100, 5000, 2000),
+                         'category_id': rng.integers(100, 500, 2000),
+                         'price': rng.uniform(5, 100, 2000).round(2)})
+    api, ai = DarazAPI(), AIModels()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ai.train_price_model(data)
+    save_user_products_bulk("bench@example.com", data)
+    product = data.iloc[0]
+
+    def timed_rerun(enabled):
+        metrics.METRICS_ENABLED = enabled
+        return common.timed(rerun, api, ai, product, "bench@example.com")[1]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for _ in range(args.reruns):   # warm the search index and caches
+            timed_rerun(True)
+        # Alternate on/off rerun by rerun so drift hits both sides equally
+        samples = {False: [], True: []}
+        for _ in range(args.reruns * args.repeat):
+            for enabled in (False, True):
+                samples[enabled].append(timed_rerun(enabled))
+        last = rerun(api, ai, product, 'bench@example.com')
+    off, on = (float(np.median(samples[enabled])) for enabled in (False, True))
+    calls = sum(count for count, _ in last.spans.values())
+    print(f"rerun median without metrics {off * 1000:.3f} ms, with metrics {on * 1000:.3f} ms "
+          f"-> overhead {(on - off) / off * 100:+.2f}% "
+          f"({calls} spans x {decorated - bare:.0f} ns = {calls * (decorated - bare) / (off * 1e9) * 100:.3f}% expected)")
+    print(f"last rerun: {last.summary()}")
+
+    server = metrics.serve(port=args.port)
+    if server is not None:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics").read().decode()
+        print(f"/metrics: {len(body.splitlines())} lines, e.g.")
+        print("\n".join([line for line in body.splitlines() if 'span="search_products"' in line][-3:]))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Market gap report over a 10M-row catalogue: cached rollups versus a groupby per click"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import common
+from market_gaps import CategoryRollup
+
+
+def products(rows, categories=2_000, sellers=50_000, seed=0, first_id=0):
+    rng = np.random.default_rng(seed)
+    category = rng.integers(100, 100 + categories, rows)
+    return pd.DataFrame({
+        'product_id': np.arange(first_id, first_id + rows),
+        'price': (category % 97 + rng.gamma(2.0, 10.0, rows)).round(2),
+        'rating': rng.uniform(3.0, 5.0, rows).round(1),
+        'sales': rng.integers(0, 5000, rows),
+        'seller_id': rng.integers(0, sellers, rows),
+        'category_id': category,
+    })
+
+
+def groupby_report(frame, top=10):
+    """What a click costs without rollups: aggregate the raw rows every time"""
+    stats = frame.groupby('category_id').agg(
+        listings=('product_id', 'size'), sellers=('seller_id', 'nunique'),
+        avg_sales=('sales', 'mean'), avg_price=('price', 'mean'), price_std=('price', 'std'),
+        avg_rating=('rating', 'mean'))
+    return stats.nlargest(top, 'avg_sales')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=10_000, help="rows per incremental ingest")
+    parser.add_argument("--clicks", type=int, default=20)
+    args = parser.parse_args()
+    catalogue = products(args.rows)
+    print(f"catalogue: {args.rows:,} rows, {catalogue.memory_usage().sum() / 2**20:,.0f} MB")
+
+    rollup = CategoryRollup()
+    (_, seconds) = common.timed(rollup.add, catalogue)
+    print(f"initial rollup build            {seconds:8.2f} s")
+
+    clicks = []
+    for _ in range(args.clicks):
+        start = time.perf_counter()
+        rollup.report()
+        clicks.append(time.perf_counter() - start)
+    common.report("report (cached rollup)", clicks, sum(clicks))
+
+    incremental = []
+    for i in range(args.clicks):
+        # New listings: the rollup skips product_ids it has already counted
+        batch = products(args.batch, seed=i + 1, first_id=args.rows + i * args.batch)
+        start = time.perf_counter()
+        rollup.add(batch)
+        rollup.report()
+        incremental.append(time.perf_counter() - start)
+    common.report(f"ingest {args.batch:,} + report", incremental, sum(incremental))
+
+    (_, seconds) = common.timed(groupby_report, catalogue)
+    print(f"groupby over raw rows per click {seconds * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
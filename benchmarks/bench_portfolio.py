@@ -0,0 +1,77 @@
+"""Portfolio reads at scale: full get_user_products vs indexed keyset pages"""
+import argparse
+import os
+import tempfile
+import time
+
+TMP_DIR = tempfile.mkdtemp(prefix="daraz-bench-")
+os.environ["DARAZ_DB_PATH"] = os.path.join(TMP_DIR, "portfolio.db")
+
+import numpy as np  # noqa: E402
+
+import common  # noqa: E402
+import database  # noqa: E402
+
+
+def populate(rows, users, products):
+    rng = np.random.default_rng(0)
+    with database.init_db().connection() as conn:
+        with conn:
+            conn.executemany("INSERT INTO products (id, name, price, rating, sales, category_id) "
+                             "VALUES (?, ?, ?, ?, ?, ?)",
+                             ((i, f"Product {i}", 10.0, 4.5, 100, 300 + i % 50) for i in range(products)))
+            emails = rng.integers(0, users, rows)
+            product_ids = rng.integers(0, products, rows)
+            conn.executemany(database.INSERT_USER_PRODUCT,
+                             ((f"seller{e}@example.com", int(p)) for e, p in zip(emails, product_ids)))
+
+
+def timed_ms(fn, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1000
+
+
+def without_indexes(fn):
+    with database.get_pool().connection() as conn:
+        conn.execute("DROP INDEX idx_user_products_email_id")
+        conn.execute("DROP INDEX idx_user_products_product_id")
+    try:
+        return fn()
+    finally:
+        with database.get_pool().connection() as conn:
+            for statement in database.MIGRATIONS[1]:
+                conn.execute(statement)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+    _, elapsed = common.timed(populate, args.rows, args.users, products=100_000)
+    print(f"populated {args.rows:,} user_products rows in {elapsed:.1f} s")
+    email = "seller7@example.com"
+
+    def deep_page():
+        cursor = 0
+        for _ in range(10):
+            page = database.get_user_products_page(email, cursor, args.page_size)
+            cursor = int(page['portfolio_id'].iloc[-1])
+
+    full_unindexed = without_indexes(lambda: timed_ms(lambda: database.get_user_products(email), repeat=2))
+    print(f"get_user_products, no indexes      {full_unindexed:9.1f} ms")
+    print(f"get_user_products, indexed         {timed_ms(lambda: database.get_user_products(email)):9.1f} ms")
+    print(f"first page ({args.page_size} rows)               "
+          f"{timed_ms(lambda: database.get_user_products_page(email, 0, args.page_size)):9.2f} ms")
+    print(f"10 consecutive pages               {timed_ms(deep_page):9.2f} ms")
+    print(f"count_user_products                "
+          f"{timed_ms(lambda: database.count_user_products(email)):9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
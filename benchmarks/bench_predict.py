@@ -0,0 +1,55 @@
+"""Per-row AIModels.predict_price versus batched predict_prices over a catalogue"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+os.environ.setdefault("DARAZ_MODEL_DIR", tempfile.mkdtemp(prefix="daraz-models-"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import common  # noqa: E402
+from ai_models import AIModels  # noqa: E402
+
+
+def catalogue(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    category = rng.integers(100, 500, rows)
+    return pd.DataFrame({
+        'product_id': np.arange(rows),
+        'rating': rng.uniform(3.5, 5.0, rows).round(1),
+        'sales': rng.integers(100, 5000, rows),
+        'category_id': category,
+        'price': (category / 10 + rng.normal(0, 5, rows)).round(2),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    parser.add_argument("--per-row-sample", type=int, default=500)
+    args = parser.parse_args()
+    data = catalogue(args.rows)
+    ai = AIModels()
+    ai.train_price_model(data.iloc[:args.train_rows])
+
+    sample = data.iloc[:args.per_row_sample]
+    # predict_price passes a bare array to a model fitted on a frame
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    start = time.perf_counter()
+    for _, row in sample.iterrows():
+        ai.predict_price(row)
+    per_row = (time.perf_counter() - start) / len(sample)
+    print(f"predict_price per row        ~{per_row * args.rows:8.1f} s for {args.rows:,} "
+          f"(extrapolated from {len(sample)})")
+
+    for label in ("predict_prices cold", "predict_prices memoized"):
+        _, elapsed = common.timed(ai.predict_prices, data)
+        print(f"{label:<28} {elapsed:9.2f} s for {args.rows:,}")
+
+
+if __name__ == "__main__":
+    main()
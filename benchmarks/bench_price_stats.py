@@ -0,0 +1,125 @@
+"""Similar-product price lookups at 10M products: boolean masks per click versus CategoryPriceIndex
+
+Run with:  python bench_price_stats.py [--rows 10000000] [--rate 1000]
+
+"mask" is what SimpleAI.predict_price did: filter the whole frame by category
+and product on every prediction. The index answers the same question from
+one category's aggregates. The paced run predicts at --rate per second for
+--seconds while another thread reprices --updates products per second.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import common
+from price_stats import CategoryPriceIndex
+
+
+def products(rows, categories, seed=0):
+    rng = np.random.default_rng(seed)
+    category = rng.integers(100, 100 + categories, rows)
+    return pd.DataFrame({
+        'product_id': np.arange(rows),
+        'price': (category % 97 + rng.gamma(2.0, 10.0, rows)).round(2),
+        'category_id': category,
+    })
+
+
+def mask_predict(frame, product):
+    similar = frame[(frame['category_id'] == product['category_id']) &
+                    (frame['product_id'] != product['product_id'])]
+    return similar['price'].mean() * 0.95 if not similar.empty else product['price'] * 1.1
+
+
+def index_predict(index, product):
+    similar = index.summary(product['category_id'], exclude=product['price'])
+    return similar['mean'] * 0.95 if similar['count'] else product['price'] * 1.1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--categories", type=int, default=2_000)
+    parser.add_argument("--mask-predictions", type=int, default=10)
+    parser.add_argument("--predictions", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=1000, help="paced predictions per second")
+    parser.add_argument("--updates", type=float, default=10_000, help="repriced products per second meanwhile")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    frame = products(args.rows, args.categories)
+    print(f"catalogue: {args.rows:,} products in {args.categories:,} categories")
+    rng = np.random.default_rng(1)
+    picks = [frame.iloc[i] for i in rng.integers(0, args.rows, args.predictions)]
+
+    index = CategoryPriceIndex()
+    _, seconds = common.timed(index.add, frame)
+    print(f"index build                          {seconds:8.2f} s "
+          f"({index._sketch.nbytes / 2**20:.1f} MB of sketches)")
+
+    latencies = []
+    start = time.perf_counter()
+    for product in picks[:args.mask_predictions]:
+        began = time.perf_counter()
+        mask_predict(frame, product)
+        latencies.append(time.perf_counter() - began)
+    common.report("predict_price (boolean masks)", latencies, time.perf_counter() - start)
+
+    latencies = []
+    start = time.perf_counter()
+    for product in picks:
+        began = time.perf_counter()
+        index_predict(index, product)
+        latencies.append(time.perf_counter() - began)
+    common.report("predict_price (index)", latencies, time.perf_counter() - start)
+
+    # Accuracy against the exact answer for a sample of products
+    mean_error, median_error = [], []
+    for product in picks[:50]:
+        similar = frame.loc[(frame['category_id'] == product['category_id']) &
+                            (frame['product_id'] != product['product_id']), 'price']
+        summary = index.summary(product['category_id'], exclude=product['price'])
+        mean_error.append(abs(summary['mean'] / similar.mean() - 1))
+        median_error.append(abs(summary['median'] / similar.median() - 1))
+    print(f"relative error: mean {max(mean_error):.2e} max, median {np.mean(median_error):.2%} avg "
+          f"/ {max(median_error):.2%} max")
+
+    _, seconds = common.timed(index.stats)
+    print(f"stats() for every category           {seconds * 1000:8.2f} ms")
+
+    # Paced predictions while a writer reprices products in 10 ms batches
+    stop = threading.Event()
+    repriced = [0]
+
+    def writer():
+        batch = max(1, int(args.updates / 100))
+        while not stop.is_set():
+            rows = frame.iloc[rng.integers(0, args.rows, batch)]
+            index.update(rows, rows.assign(price=rows['price'] * 1.01))
+            repriced[0] += batch
+            time.sleep(0.01)
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    latencies = []
+    interval = 1 / args.rate
+    start = time.perf_counter()
+    deadline = start
+    for number in range(int(args.rate * args.seconds)):
+        deadline += interval
+        began = time.perf_counter()
+        index_predict(index, picks[number % len(picks)])
+        latencies.append(time.perf_counter() - began)
+        pause = deadline - time.perf_counter()
+        if pause > 0:
+            time.sleep(pause)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    common.report(f"paced at {args.rate:,.0f}/s + updates", latencies, elapsed)
+    print(f"{'':36} {repriced[0] / elapsed:10,.0f} repriced products/s alongside")
+
+
+if __name__ == "__main__":
+    main()
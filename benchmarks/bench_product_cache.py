@@ -0,0 +1,46 @@
+"""RSS of the old dict-per-product cache versus ProductStore at 100k/1M products"""
+import argparse
+import subprocess
+import sys
+
+from common import current_rss_mb
+
+
+def fill(kind, count):
+    from daraz_api import DarazAPI
+    from product_store import ProductStore
+    api = DarazAPI()
+    products = (api._generate_mock_product(i) for i in range(count))
+    before = current_rss_mb()
+    if kind == "dict":
+        cache = {}
+        for i, product in enumerate(products):
+            cache[i] = product
+    else:
+        cache = ProductStore(max_entries=count)
+        for i, product in enumerate(products):
+            cache.put(i, product)
+    print(f"{current_rss_mb() - before:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    for count in args.sizes:
+        results = {}
+        for kind in ("dict", "store"):
+            # A fresh interpreter per run so freed memory from one cache can't hide the other
+            out = subprocess.run([sys.executable, __file__, "--child", kind, str(count)],
+                                 capture_output=True, text=True, check=True)
+            results[kind] = float(out.stdout.strip())
+        ratio = results["store"] / results["dict"] if results["dict"] else 0.0
+        print(f"{count:>9,} products   dict {results['dict']:8.1f} MB   "
+              f"ProductStore {results['store']:8.1f} MB   ({ratio:.0%} of dict)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        fill(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
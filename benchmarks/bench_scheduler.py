@@ -0,0 +1,49 @@
+"""How many products one process keeps fresh with PollingScheduler over a simulated source"""
+import argparse
+import time
+
+import common
+from competitor import CompetitorMonitor, mock_source
+from competitor_scheduler import PollingScheduler
+
+
+def slow_source(latency):
+    def source(product_id, last):
+        time.sleep(latency)  # network-bound fetch
+        return mock_source(product_id, last)
+    return source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between polls per product")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated fetch latency")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0)
+    args = parser.parse_args()
+
+    monitor = CompetitorMonitor(source=slow_source(args.latency))
+    scheduler = PollingScheduler(monitor, workers=args.workers, interval=args.interval,
+                                 target_latency=args.latency * 2)
+    for product_id in range(args.products):
+        scheduler.watch(product_id)
+    for product_id in range(0, args.products, 100):
+        scheduler.touch(product_id)
+    scheduler.start()
+    time.sleep(args.duration)
+    stats = scheduler.stats()
+    scheduler.stop(wait=False)
+
+    now = time.time()
+    fresh = sum(1 for p in range(args.products)
+                if (monitor.latest(p) or (0,))[0] > now - args.interval * 1.2)
+    print(f"polls {stats['polls']:,} in {args.duration:.0f} s  -> {stats['polls'] / args.duration * 60:,.0f} polls/min")
+    print(f"fresh within 1.2 x interval: {fresh:,}/{args.products:,} ({fresh / args.products:.1%})")
+    print(f"mean lateness {stats['late_seconds'] / max(1, stats['polls']):.3f} s   "
+          f"latency ewma {stats['latency'] * 1000:.1f} ms   slowdown x{stats['slowdown']:.2f}")
+    print(f"~{fresh * 60 / args.interval:,.0f} products/min kept fresh   peak RSS {common.peak_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
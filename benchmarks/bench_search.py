@@ -0,0 +1,43 @@
+"""Row-wise dict search results versus the column-wise DarazAPI.search_products"""
+import argparse
+import time
+
+import pandas as pd
+
+from common import percentile
+from daraz_api import DarazAPI
+
+
+def row_wise(api, keyword, page_size):
+    """The original path: one dict per row, then DataFrame(list_of_dicts)"""
+    return pd.DataFrame([api._generate_mock_product(i, keyword) for i in range(page_size)])
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    api = DarazAPI()
+    for page_size in args.page_sizes:
+        old = measure(lambda: row_wise(api, "phone", page_size), args.repeat)
+        new = measure(lambda: api.search_products("phone", page_size=page_size), args.repeat)
+        print(f"page_size {page_size:>7,}   row-wise {old:9.2f} ms   columnar {new:8.2f} ms   "
+              f"({old / new:5.1f}x)")
+    start = time.perf_counter()
+    rows = sum(len(chunk) for chunk in api.iter_search_pages("phone", page_size=5000, max_pages=20))
+    elapsed = time.perf_counter() - start
+    print(f"iter_search_pages: {rows:,} rows in {elapsed * 1000:.1f} ms ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""SearchIndex: build time, on-disk size and query latency over millions of products"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import common
+from search_index import SearchIndex
+
+BRANDS = ["anker", "baseus", "xiaomi", "samsung", "realme", "oppo", "joyroom", "remax", "haylou",
+          "lenovo", "philips", "nike", "adidas", "puma", "bata", "walton", "vision", "singer"]
+ADJECTIVES = ["wireless", "bluetooth", "portable", "premium", "waterproof", "smart", "mini", "fast",
+              "magnetic", "leather", "cotton", "stainless", "ergonomic", "foldable", "rechargeable"]
+NOUNS = ["headphones", "earbuds", "speaker", "charger", "cable", "powerbank", "watch", "mat",
+         "bottle", "backpack", "sneakers", "tshirt", "lamp", "fan", "blender", "kettle", "mouse",
+         "keyboard", "stand", "case", "tripod", "lens", "trimmer", "iron", "sandals", "wallet"]
+QUERIES = ["wireless earbuds", "anker charger", "waterproof speaker", "mat", "smart wat",
+           "bluetooh headphones", "stainless bottle", "leather wallet", "powerbnk", "xiaomi fan",
+           "portable blender", "ergonomic mouse keyboard", "case", "realme", "cotton ts"]
+
+
+def products(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    names = (pd.Series(np.array(BRANDS)[rng.integers(0, len(BRANDS), rows)]).str.capitalize() + " "
+             + np.array(ADJECTIVES)[rng.integers(0, len(ADJECTIVES), rows)] + " "
+             + np.array(NOUNS)[rng.integers(0, len(NOUNS), rows)] + " "
+             + pd.Series(rng.integers(1, 500, rows)).astype(str))
+    return pd.DataFrame({
+        'product_id': np.arange(rows),
+        'name': names,
+        'price': rng.uniform(5, 100, rows).round(2),
+        'rating': rng.uniform(3, 5, rows).round(1),
+        'sales': rng.integers(0, 5000, rows),
+        'seller_id': rng.integers(5000, 6000, rows),
+        'category_id': rng.integers(100, 500, rows),
+    })
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk", type=int, default=500_000, help="rows per ingest batch")
+    parser.add_argument("--updates", type=int, default=20_000, help="single products added after the build")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    catalogue = products(args.rows)
+    path = tempfile.mkdtemp(prefix="daraz-search-index-")
+    try:
+        index = SearchIndex(path)
+        start = time.perf_counter()
+        for offset in range(0, args.rows, args.chunk):
+            index.add(catalogue.iloc[offset:offset + args.chunk])
+        build = time.perf_counter() - start
+        print(f"build {args.rows:,} products in {build:.1f} s ({args.rows / build:,.0f} rows/s), "
+              f"{directory_mb(path):,.0f} MB on disk")
+
+        updates = products(args.updates, seed=1).assign(product_id=lambda f: f['product_id'] * 7 % args.rows)
+        start = time.perf_counter()
+        for record in updates.to_dict('records'):
+            index.add(record)
+        elapsed = time.perf_counter() - start
+        print(f"incremental add {args.updates:,} single products: {elapsed / args.updates * 1e6:.0f} us each "
+              f"({len(index._buffer):,} buffered)")
+        index.flush()
+        index.close()
+
+        index = SearchIndex(path, read_only=True)  # cold open from disk, as DarazAPI does
+        for label, kwargs in (("page 1", {}), ("page 5", {'page': 5}), ("category filter", {'category_id': 250})):
+            latencies = []
+            for _ in range(args.repeat):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    index.search(query, **kwargs)
+                    latencies.append(time.perf_counter() - start)
+            common.report(f"query {label}", latencies, sum(latencies))
+        sample = pd.DataFrame(index.search("bluetooh headphones"))
+        print(sample[['name', 'sales', 'rating']].head(3).to_string(index=False))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Memory of N Streamlit sessions: a DataFrame per session versus shared catalogue views
+
+Run with:  python bench_shared_catalogue.py [--rows 200000] [--sessions 500]
+
+Each mode runs in a fresh interpreter. "per-session" builds its own frame for
+every session, as performance_optimized_app did; it is measured over
+--sample-sessions and projected to --sessions, since the real thing would not
+fit in memory. "shared" attaches every session to one published version and
+gives each a CatalogueDelta with a few edits. PSS splits the pages of the
+shared file between the processes mapping it.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+import catalogue
+
+
+def pss_mb():
+    """Proportional set size of this process in MB (RSS where smaps_rollup is unavailable)"""
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return common.current_rss_mb()
+
+
+def touch(frame, product_id):
+    """What a dashboard rerun reads: one row and a category's prices"""
+    row = frame[frame['product_id'] == product_id].iloc[0]
+    return frame.loc[frame['category_id'] == row['category_id'], 'price'].mean()
+
+
+def child(mode, rows, sessions, path):
+    from shared_catalogue import CatalogueDelta, SharedCatalogue
+    before_rss, before_pss = common.current_rss_mb(), pss_mb()
+    state = []
+    start = time.perf_counter()
+    if mode == "per-session":
+        for number in range(sessions):
+            frame = catalogue.frame(rows)
+            touch(frame, number + 1)
+            state.append({'df': frame})
+    else:
+        shared = SharedCatalogue(path=path)
+        for number in range(sessions):
+            frame = shared.view().frame
+            touch(frame, number + 1)
+            delta = CatalogueDelta()
+            for product_id in range(number + 1, number + 11):
+                delta.set(product_id, price=9.99)
+            state.append({'catalogue_delta': delta})
+    elapsed = time.perf_counter() - start
+    print(common.current_rss_mb() - before_rss, pss_mb() - before_pss, elapsed / sessions)
+
+
+def run(mode, rows, sessions, path):
+    out = subprocess.run([sys.executable, __file__, "--child", mode, "--rows", str(rows),
+                          "--sessions", str(sessions), "--path", path],
+                         capture_output=True, text=True, check=True)
+    return [float(value) for value in out.stdout.split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--sample-sessions", type=int, default=10, help="per-session frames actually built")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.rows, args.sessions, args.path)
+        return
+
+    from shared_catalogue import SharedCatalogue
+    path = tempfile.mkdtemp(prefix="daraz-catalogue-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    frame = catalogue.frame(args.rows)
+    _, publish_time = common.timed(SharedCatalogue(path=path).publish, frame)
+    print(f"published {args.rows:,} products in {publish_time * 1000:.0f} ms "
+          f"({sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20:.1f} MB file)")
+
+    sample = min(args.sample_sessions, args.sessions)
+    rss, pss, attach = run("per-session", args.rows, sample, path)
+    print(f"per-session {args.sessions:>5} sessions   RSS {rss / sample * args.sessions:9.1f} MB "
+          f"(projected from {sample}: {rss / sample:.1f} MB each)   {attach * 1000:7.1f} ms/session")
+    rss, pss, attach = run("shared", args.rows, args.sessions, path)
+    print(f"shared      {args.sessions:>5} sessions   RSS {rss:9.1f} MB   PSS {pss:.1f} MB   "
+          f"{attach * 1000:7.1f} ms/session")
+
+    # Two server processes mapping the same version split its pages
+    procs = [subprocess.Popen([sys.executable, __file__, "--child", "shared", "--rows", str(args.rows),
+                               "--sessions", str(args.sessions), "--path", path],
+                              stdout=subprocess.PIPE, text=True) for _ in range(2)]
+    results = [[float(value) for value in proc.communicate()[0].split()] for proc in procs]
+    print(f"shared x2 processes          RSS {' + '.join(f'{r[0]:.1f}' for r in results)} MB   "
+          f"PSS {' + '.join(f'{r[1]:.1f}' for r in results)} MB")
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+    os.rmdir(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Synthetic Daraz catalogue generator: sample_data.csv-shaped products at any scale
+
+Run with:  python catalogue.py catalogue.parquet --rows 5000000
+
+Rows come out in fixed-size chunks from a seeded generator, so millions of
+products can be produced (and written) offline with flat memory, and the
+same seed always yields the same catalogue.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+BRANDS = ["anker", "baseus", "xiaomi", "samsung", "realme", "oppo", "joyroom", "remax", "haylou",
+          "lenovo", "philips", "nike", "adidas", "puma", "bata", "walton", "vision", "singer"]
+ADJECTIVES = ["wireless", "bluetooth", "portable", "premium", "waterproof", "smart", "mini", "fast",
+              "magnetic", "leather", "cotton", "stainless", "ergonomic", "foldable", "rechargeable"]
+NOUNS = ["headphones", "earbuds", "speaker", "charger", "cable", "powerbank", "watch", "mat",
+         "bottle", "backpack", "sneakers", "tshirt", "lamp", "fan", "blender", "kettle", "mouse",
+         "keyboard", "stand", "case", "tripod", "lens", "trimmer", "iron", "sandals", "wallet"]
+CHUNK_SIZE = 500_000
+CATEGORIES = (100, 500)
+SELLERS = (5000, 6000)
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+def chunk(start, rows, rng, categories=CATEGORIES):
+    """Products start+1 .. start+rows; prices follow the category, sales are long-tailed"""
+    category = rng.integers(*categories, rows)
+    names = (pd.Series(np.array(BRANDS)[rng.integers(0, len(BRANDS), rows)]).str.capitalize() + " "
+             + np.array(ADJECTIVES)[rng.integers(0, len(ADJECTIVES), rows)] + " "
+             + np.array(NOUNS)[rng.integers(0, len(NOUNS), rows)] + " "
+             + pd.Series(rng.integers(1, 500, rows)).astype(str))
+    return pd.DataFrame({
+        'product_id': np.arange(start + 1, start + rows + 1),
+        'name': names,
+        'price': np.maximum(1.0, category / 5 + rng.normal(0, 8, rows)).round(2),
+        'rating': rng.uniform(3.0, 5.0, rows).round(1),
+        'sales': np.minimum(rng.pareto(1.2, rows) * 100, 100_000).astype(np.int64),
+        'seller_id': rng.integers(*SELLERS, rows),
+        'category_id': category,
+    })
+
+
+def chunks(rows, chunk_size=CHUNK_SIZE, seed=0, categories=CATEGORIES):
+    """Yield the catalogue as DataFrames of at most chunk_size rows"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_size):
+        yield chunk(start, min(chunk_size, rows - start), rng, categories)
+
+
+def frame(rows, seed=0, categories=CATEGORIES):
+    """The whole catalogue as one DataFrame (for scales that fit in memory)"""
+    parts = list(chunks(rows, seed=seed, categories=categories))
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def queries(count, seed=0):
+    """Search keywords shaped like real ones: brand, adjective + noun, or a bare noun"""
+    rng = np.random.default_rng(seed)
+    shapes = (lambda: f"{rng.choice(BRANDS)} {rng.choice(NOUNS)}",
+              lambda: f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+              lambda: str(rng.choice(NOUNS)))
+    return [shapes[i % len(shapes)]() for i in range(count)]
+
+
+def write(path, rows, fmt=None, chunk_size=CHUNK_SIZE, seed=0):
+    """Write the catalogue to CSV, Parquet or JSONL chunk by chunk; returns rows written"""
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    writer = None
+    with open(path, "wb" if fmt == "parquet" else "w") as out:
+        for index, part in enumerate(chunks(rows, chunk_size, seed)):
+            if fmt == "csv":
+                part.to_csv(out, header=index == 0, index=False)
+            elif fmt == "jsonl":
+                part.to_json(out, orient="records", lines=True)
+                out.write("\n")
+            elif fmt == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(part, preserve_index=False)
+                writer = writer or pq.ParquetWriter(out, table.schema)
+                writer.write_table(table)
+            else:
+                raise ValueError(f"Unsupported format: {fmt}")
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("csv", "parquet", "jsonl"))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write(args.path, args.rows, args.format, args.chunk_size, args.seed)
+    print(f"wrote {args.rows:,} products to {args.path} ({os.path.getsize(args.path) / 2**20:,.0f} MB)")
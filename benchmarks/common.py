@@ -0,0 +1,78 @@
+"""Helpers shared by the benchmark scripts"""
+import atexit
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Benchmarks never write into a deployment's search index: each process gets a scratch
+# path, created only if something opens an index there
+SEARCH_INDEX_PATH = os.path.join(tempfile.gettempdir(), f"daraz-bench-search-{os.getpid()}")
+os.environ["DARAZ_SEARCH_INDEX_PATH"] = SEARCH_INDEX_PATH
+shutil.rmtree(SEARCH_INDEX_PATH, ignore_errors=True)   # left behind by a killed process with this pid
+atexit.register(shutil.rmtree, SEARCH_INDEX_PATH, ignore_errors=True)
+
+
+def load_backend(base_url=None, name="daraz_backend", filename="app.py"):
+    """Import backend/app.py (or another backend module) as a module, optionally pointed at another upstream"""
+    if base_url:
+        os.environ["DARAZ_API_BASE_URL"] = base_url
+    backend_dir = os.path.join(ROOT, "backend")
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(backend_dir, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def report(name, latencies, elapsed, count=None):
+    """Print one result line and return it as a dict"""
+    count = len(latencies) if count is None else count
+    row = {
+        'name': name,
+        'count': count,
+        'rps': count / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+    print(f"{name:<36} {row['rps']:>10.1f} req/s   p50 {row['p50_ms']:7.2f} ms   p99 {row['p99_ms']:7.2f} ms")
+    return row
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,80 @@
+"""Local stand-in for the Daraz product API, used by the benchmarks"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def mock_product(product_id):
+    rng = random.Random(product_id)
+    return {
+        'product_id': product_id,
+        'name': f"Product {product_id}",
+        'price': round(rng.uniform(5.0, 100.0), 2),
+        'rating': round(rng.uniform(3.5, 5.0), 1),
+        'sales': rng.randint(100, 5000),
+        'seller_id': rng.randint(5000, 6000),
+        'category_id': rng.randint(100, 500)
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True
+    latency = 0.0
+    batch = True   # serve /product/get_many (multi-ID lookups)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if self.latency:
+            time.sleep(self.latency)
+        if url.path == "/product/get":
+            body = mock_product(int(query.get("product_id", 0)))
+        elif url.path == "/product/get_many" and self.batch:
+            product_ids = [int(pid) for pid in query.get("product_ids", "").split(",") if pid]
+            body = {'products': [mock_product(pid) for pid in product_ids]}
+        elif url.path == "/product/search":
+            page = int(query.get("page", 1))
+            page_size = int(query.get("page_size", 10))
+            start = 1000 + (page - 1) * page_size
+            body = {'products': [mock_product(i) for i in range(start, start + page_size)]}
+        else:
+            self.send_error(404)
+            return
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.0, batch=True):
+    """Start the stub in a daemon thread and return (server, base_url)"""
+    handler = type("Handler", (StubHandler,), {"latency": latency, "batch": batch})
+    server_class = type("StubServer", (ThreadingHTTPServer,), {"request_queue_size": 1024})
+    server = server_class(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added per request")
+    parser.add_argument("--no-batch", action="store_true", help="404 on /product/get_many, like an upstream without it")
+    args = parser.parse_args()
+    server, url = start_stub(args.port, args.latency, batch=not args.no_batch)
+    print(f"Stub Daraz API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,239 @@
+"""End-to-end benchmark suite for the seller workflows, with a stored baseline
+
+Run with:  python suite.py [--scale small|medium|large] [--rows N] [--only search ...]
+           python suite.py --save-baseline          # record this machine's numbers
+
+Every scenario drives the real code path (search, price model training and
+prediction, competitor tracking, portfolio writes/reads, and the Flask
+routes against the local stub upstream). Each one runs in its own child
+process with a fresh database, so peak RSS is per scenario, and is repeated
+--repeat times; every metric keeps its best run, which background noise can
+only make worse. Results go to a JSON file and
+are compared against baseline.json: a metric that got worse by more than
+--tolerance (twice that for p99, which is noisier) fails the run, except
+for latencies that moved by less than a millisecond.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+import catalogue
+
+SCALES = {   # catalogue rows, model training rows, single-call samples
+    'small': (20_000, 5_000, 300),
+    'medium': (200_000, 20_000, 1_000),
+    'large': (2_000_000, 100_000, 3_000),
+}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+HIGHER_IS_BETTER = ('rps',)
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'peak_rss_mb')
+NOISE_FLOOR_MS = 1.0   # latency changes smaller than this are scheduler noise, not regressions
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+def measure(name, fn, calls, count=None):
+    """Time each call of fn(item) over calls and report it"""
+    latencies = []
+    start = time.perf_counter()
+    for item in calls:
+        began = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - began)
+    return common.report(name, latencies, time.perf_counter() - start, count)
+
+
+@scenario("search")
+def search(rows, train_rows, samples):
+    from daraz_api import DarazAPI
+    from search_index import SearchIndex
+    index = SearchIndex(common.SEARCH_INDEX_PATH)   # what ingest.py --search-index builds
+    for part in catalogue.chunks(rows):
+        index.add(part)
+    index.flush()
+    index.close()
+    api = DarazAPI()
+    queries = catalogue.queries(samples)
+    return [measure("search_products", api.search_products, queries),
+            measure("search_products page 5", lambda query: api.search_products(query, page=5), queries)]
+
+
+@scenario("price_model")
+def price_model(rows, train_rows, samples):
+    from ai_models import AIModels
+    data = catalogue.frame(rows)
+    ai = AIModels()
+    results = [measure("train_price_model", ai.train_price_model, [data.iloc[:train_rows]], count=train_rows)]
+    products = [row for _, row in data.head(samples).iterrows()]
+    results.append(measure("predict_price", ai.predict_price, products))
+    results.append(measure("predict_prices", ai.predict_prices, [data], count=rows))
+    return results
+
+
+@scenario("competitor")
+def competitor(rows, train_rows, samples):
+    from competitor import CompetitorMonitor
+    monitor = CompetitorMonitor()
+    product_ids = [str(product_id) for product_id in range(1, samples + 1)]
+    results = [measure("track_product (first)", monitor.track_product, product_ids)]
+    for _ in range(20):   # build up some history per product
+        for product_id in product_ids:
+            monitor.poll(product_id)
+    results.append(measure("track_product", monitor.track_product, product_ids))
+    return results
+
+
+@scenario("portfolio")
+def portfolio(rows, train_rows, samples):
+    from database import get_user_products, save_user_product, save_user_products_bulk
+    users = [f"seller{number}@example.com" for number in range(100)]
+    results = [measure("save_user_products_bulk", lambda part: save_user_products_bulk(users[0], part),
+                       catalogue.chunks(rows, chunk_size=50_000), count=rows)]
+    results.append(measure("save_user_product", lambda number: save_user_product(users[number % 99 + 1], number + 1),
+                           range(samples)))
+    results.append(measure("get_user_products (small)", get_user_products, users[1:]))
+    results.append(measure("get_user_products (full catalogue)", get_user_products, [users[0]] * 3))
+    return results
+
+
+@scenario("flask")
+def flask_routes(rows, train_rows, samples):
+    from stub_daraz import start_stub
+    server, base_url = start_stub()
+    backend = common.load_backend(base_url)
+    client = backend.app.test_client()
+    queries = catalogue.queries(samples)
+    results = [
+        measure("GET /api/search (miss)",
+                lambda item: client.get("/api/search", query_string={'keyword': item[1], 'page': item[0]}),
+                list(enumerate(queries))),
+        measure("GET /api/search (hit)",
+                lambda item: client.get("/api/search", query_string={'keyword': item[1], 'page': item[0]}),
+                list(enumerate(queries))),
+        measure("GET /api/product/<id>", lambda product_id: client.get(f"/api/product/{product_id}"),
+                range(1, samples + 1)),
+        measure("GET /api/products?ids=50", lambda start: client.get(
+            "/api/products", query_string={'ids': ",".join(map(str, range(start, start + 50)))}),
+            range(0, samples * 5, 50), count=samples * 5),
+    ]
+    server.shutdown()
+    return results
+
+
+def run_child(name, rows, train_rows, samples):
+    """Run one scenario here and print its results (with this process's peak RSS) as JSON"""
+    results = SCENARIOS[name](rows, train_rows, samples)
+    peak = common.peak_rss_mb()
+    for row in results:
+        row['peak_rss_mb'] = peak
+    print(json.dumps(results))
+
+
+def run_scenario(name, rows, train_rows, samples):
+    tmp = tempfile.mkdtemp(prefix=f"daraz-suite-{name}-")
+    env = dict(os.environ, DARAZ_DB_PATH=os.path.join(tmp, "suite.db"), DARAZ_MODEL_DIR=os.path.join(tmp, "models"),
+               DARAZ_JOB_DIR=os.path.join(tmp, "jobs"), DARAZ_METRICS_PORT="0")
+    env.pop("DARAZ_HISTORY_PATH", None)
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, "--rows", str(rows),
+                            "--train-rows", str(train_rows), "--samples", str(samples)],
+                           env=env, stdout=subprocess.PIPE, text=True, cwd=tmp)
+    if child.returncode:
+        raise SystemExit(f"scenario {name} failed (exit {child.returncode})")
+    lines = child.stdout.strip().splitlines()
+    print("\n".join(lines[:-1]))
+    return json.loads(lines[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every metric that regressed past the tolerance"""
+    regressions = []
+    for name, row in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            old, new = before.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            allowed = 2 * tolerance if metric == 'p99_ms' else tolerance
+            worse = new < old / (1 + allowed) if metric in HIGHER_IS_BETTER else new > old * (1 + allowed)
+            if worse and not (metric.endswith('_ms') and new - old < NOISE_FLOOR_MS):
+                regressions.append(f"REGRESSION {name}: {metric} {old:,.2f} -> {new:,.2f} "
+                                   f"({(new - old) / old * 100:+.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--rows", type=int, help="override the scale's catalogue size")
+    parser.add_argument("--train-rows", type=int)
+    parser.add_argument("--samples", type=int, help="single calls timed per metric")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; metrics keep the best")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="run just these scenarios")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed fractional slowdown per metric")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    rows, train_rows, samples = SCALES[args.scale]
+    rows, train_rows, samples = args.rows or rows, args.train_rows or train_rows, args.samples or samples
+    if args.child:
+        run_child(args.child, rows, train_rows, samples)
+        return
+
+    results = {}
+    for name in args.only or SCENARIOS:
+        runs = {}
+        for attempt in range(args.repeat):
+            print(f"== {name} ({rows:,} rows, run {attempt + 1}/{args.repeat})")
+            for row in run_scenario(name, rows, train_rows, samples):
+                runs.setdefault(f"{name}/{row.pop('name')}", []).append(row)
+        for metric, measured in runs.items():
+            results[metric] = {field: (max if field in HIGHER_IS_BETTER else min)(row[field] for row in measured)
+                               for field in measured[0]}
+    # Baselines are per scale; custom sizes are recorded under their row count
+    key = args.scale if not (args.rows or args.train_rows or args.samples) else f"rows={rows}"
+    report = {'scale': key, 'rows': rows, 'train_rows': train_rows, 'samples': samples, 'repeat': args.repeat,
+              'python': platform.python_version(), 'machine': platform.machine(),
+              'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"), 'results': results}
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2)
+    print(f"results written to {args.output}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            baselines = json.load(handle)
+    if args.save_baseline:
+        baselines[key] = report
+        with open(args.baseline, "w") as out:
+            json.dump(baselines, out, indent=2, sort_keys=True)
+        print(f"baseline for {key} saved to {args.baseline}")
+        return
+    if key not in baselines:
+        print(f"no baseline for {key} yet; run with --save-baseline to record one")
+        return
+    regressions = compare(results, baselines[key]['results'], args.tolerance)
+    for line in regressions:
+        print(line, file=sys.stderr)
+    if regressions:
+        raise SystemExit(f"{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%} of the baseline")
+    print(f"no regressions against the {key} baseline ({args.tolerance:.0%} tolerance)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,51 @@
-import pandas as pd
+import os
 import random
 import time
+from history_store import HistoryStore
+
+HISTORY_PATH = os.getenv("DARAZ_HISTORY_PATH")  # unset keeps history in memory only
+HISTORY_CAPACITY = int(os.getenv("DARAZ_HISTORY_CAPACITY", "1024"))
+HISTORY_DOWNSAMPLE = int(os.getenv("DARAZ_HISTORY_DOWNSAMPLE", "4"))
+
+def mock_source(product_id, last):
+    """Return a (price, rating) observation; stands in for a Daraz listing fetch"""
+    if last is None:
+        # Initialize with mock data
+        return random.uniform(20, 30), random.uniform(4.0, 4.8)
+    # Simulate price changes
+    _, last_price, last_rating = last
+    return (last_price * random.uniform(0.95, 1.05),
+            max(3.0, min(5.0, last_rating + random.uniform(-0.1, 0.1))))
 
 class CompetitorMonitor:
-    def __init__(self):
-        self.competitor_data = {}
-    
+    def __init__(self, history=None, source=mock_source):
+        if history is None:
+            history = HistoryStore(capacity=HISTORY_CAPACITY, path=HISTORY_PATH,
+                                   downsample=HISTORY_DOWNSAMPLE or None)
+        self.history = history
+        self.source = source
+        self.listeners = []
+
+    def add_listener(self, callback):
+        """Call callback(product_id, update_time, price, rating) on every new point"""
+        self.listeners.append(callback)
+
+    def poll(self, product_id):
+        """Fetch one observation for a product and record it"""
+        price, rating = self.source(product_id, self.history.last(product_id))
+        update_time = time.time()
+        self.history.append(product_id, update_time, price, rating)
+        for callback in self.listeners:
+            callback(product_id, update_time, price, rating)
+
+    def latest(self, product_id):
+        """Latest (update_time, price, rating) without polling, or None"""
+        return self.history.last(product_id)
+
+    def history_frame(self, product_id):
+        """Recorded history without polling"""
+        return self.history.frame(product_id)
+
     def track_product(self, product_id):
-        if product_id not in self.competitor_data:
-            # Initialize with mock data
-            self.competitor_data[product_id] = {
-                'prices': [random.uniform(20, 30)],
-                'ratings': [random.uniform(4.0, 4.8)],
-                'update_times': [time.time()]
-            }
-        else:
-            # Simulate price changes
-            last_price = self.competitor_data[product_id]['prices'][-1]
-            new_price = last_price * random.uniform(0.95, 1.05)
-            self.competitor_data[product_id]['prices'].append(new_price)
-            self.competitor_data[product_id]['ratings'].append(
-                max(3.0, min(5.0, self.competitor_data[product_id]['ratings'][-1] + random.uniform(-0.1, 0.1)))
-            self.competitor_data[product_id]['update_times'].append(time.time())
-        
-        return pd.DataFrame(self.competitor_data[product_id])
\ No newline at end of file
+        self.poll(product_id)
+        return self.history_frame(product_id)
@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_WORKERS = int(os.getenv("DARAZ_POLL_WORKERS", "8"))
+POLL_INTERVAL = float(os.getenv("DARAZ_POLL_INTERVAL", "300"))
+
+
+class PollingScheduler:
+    """Keeps a watchlist of competitor listings fresh from a background thread
+
+    Products are polled on their own interval (with jitter) by a bounded
+    worker pool. Recently viewed products are polled more often and jump
+    the queue when there is a backlog. When the source slows down, at most
+    max_inflight polls are outstanding and every interval is stretched by
+    the ratio of observed to target latency.
+    """
+
+    def __init__(self, monitor, workers=POLL_WORKERS, interval=POLL_INTERVAL, jitter=0.1,
+                 max_inflight=None, recent_window=600, recent_speedup=4, target_latency=1.0):
+        self.monitor = monitor
+        self.interval = interval
+        self.jitter = jitter
+        self.max_inflight = max_inflight or 2 * workers
+        self.recent_window = recent_window
+        self.recent_speedup = recent_speedup
+        self.target_latency = target_latency
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="competitor-poll")
+        self._cond = threading.Condition()
+        self._timers = []   # (due, seq, product_id)
+        self._ready = []    # (priority, due, seq, product_id)
+        self._watch = {}    # product_id -> interval
+        self._viewed = {}   # product_id -> last view time
+        self._due = {}      # product_id -> due time of its live heap entry
+        self._polling = set()
+        self._last_poll = {}
+        self._inflight = 0
+        self._seq = itertools.count()
+        self._latency = None
+        self._thread = None
+        self._running = False
+        self.counters = dict.fromkeys(('polls', 'errors', 'late_seconds'), 0)
+
+    def watch(self, product_id, interval=None):
+        """Add a product to the watchlist; its first poll is due immediately"""
+        with self._cond:
+            new = product_id not in self._watch
+            self._watch[product_id] = interval or self.interval
+            if new:
+                self._schedule(product_id, time.monotonic())
+                # Wake the loop, which may be sleeping until a later poll is due
+                self._cond.notify()
+
+    def unwatch(self, product_id):
+        with self._cond:
+            self._watch.pop(product_id, None)
+            self._viewed.pop(product_id, None)
+            self._due.pop(product_id, None)
+            self._last_poll.pop(product_id, None)
+
+    def touch(self, product_id):
+        """Mark a product as recently viewed so it is refreshed sooner"""
+        with self._cond:
+            now = time.monotonic()
+            self._viewed[product_id] = now
+            if product_id in self._watch:
+                last = self._last_poll.get(product_id, float('-inf'))
+                self._schedule(product_id, max(now, last + self._watch[product_id] / self.recent_speedup))
+            self._cond.notify()
+
+    def watchlist(self):
+        with self._cond:
+            return list(self._watch)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="competitor-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.counters)
+            stats.update(watched=len(self._watch), queued=len(self._due),
+                         inflight=self._inflight, latency=self._latency or 0.0,
+                         slowdown=self._slowdown())
+        return stats
+
+    def _schedule(self, product_id, due):
+        """Queue a poll unless one is running or an earlier one is already queued"""
+        if product_id in self._polling or self._due.get(product_id, float('inf')) <= due:
+            return
+        # Any later entry for this product becomes stale and is skipped when popped
+        self._due[product_id] = due
+        heapq.heappush(self._timers, (due, next(self._seq), product_id))
+
+    def _recent(self, product_id, now):
+        viewed = self._viewed.get(product_id)
+        return viewed is not None and now - viewed < self.recent_window
+
+    def _slowdown(self):
+        if self._latency is None:
+            return 1.0
+        return max(1.0, self._latency / self.target_latency)
+
+    def _next_interval(self, product_id, now):
+        interval = self._watch[product_id] * self._slowdown()
+        if self._recent(product_id, now):
+            interval /= self.recent_speedup
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    due, seq, product_id = heapq.heappop(self._timers)
+                    if self._due.get(product_id) != due:
+                        continue
+                    priority = 0 if self._recent(product_id, now) else 1
+                    heapq.heappush(self._ready, (priority, due, seq, product_id))
+                while self._ready and self._inflight < self.max_inflight:
+                    _, due, _, product_id = heapq.heappop(self._ready)
+                    if self._due.get(product_id) != due:
+                        continue
+                    del self._due[product_id]
+                    self.counters['late_seconds'] += now - due
+                    self._polling.add(product_id)
+                    self._inflight += 1
+                    self._executor.submit(self._poll, product_id)
+                if self._ready:
+                    timeout = None  # saturated: wait for a poll to finish
+                elif self._timers:
+                    timeout = max(0.0, self._timers[0][0] - now)
+                else:
+                    timeout = None
+                self._cond.wait(timeout)
+
+    def _poll(self, product_id):
+        start = time.monotonic()
+        failed = False
+        try:
+            self.monitor.poll(product_id)
+        except Exception:
+            failed = True
+        end = time.monotonic()
+        with self._cond:
+            self._inflight -= 1
+            self._polling.discard(product_id)
+            self._last_poll[product_id] = end
+            elapsed = end - start
+            self._latency = elapsed if self._latency is None else 0.9 * self._latency + 0.1 * elapsed
+            self.counters['errors' if failed else 'polls'] += 1
+            if product_id in self._watch:
+                self._schedule(product_id, end + self._next_interval(product_id, end))
+            self._cond.notify()
@@ -1,20 +1,82 @@
 import pandas as pd
+import numpy as np
+import os
 import random
+import zlib
+from product_store import ProductStore
+from search_index import SearchIndex
+from metrics import instrument
+
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "200000"))
+PRODUCT_CACHE_MAX_BYTES = int(os.getenv("PRODUCT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "3600"))
+SEARCH_INDEX_PATH = os.getenv("DARAZ_SEARCH_INDEX_PATH", "search_index")  # built by `ingest.py --search-index`
+MOCK_QUERY_ID_SPAN = 10_000_000   # mock search results per query before IDs overlap the next range
+SEARCH_DTYPES = {
+    'product_id': np.int64,
+    'name': object,
+    'price': np.float64,
+    'rating': np.float64,
+    'sales': np.int64,
+    'seller_id': np.int64,
+    'category_id': np.int64,
+}
 
 class DarazAPI:
     def __init__(self):
-        self.product_cache = {}
+        # Bounded columnar store; lives as long as the st.cache_resource singleton
+        self.product_cache = ProductStore(max_entries=PRODUCT_CACHE_MAX_ENTRIES,
+                                          max_bytes=PRODUCT_CACHE_MAX_BYTES,
+                                          ttl=PRODUCT_CACHE_TTL)
+        # Local search reads the on-disk index the catalogue ingest writes; its segments are
+        # memory-mapped, so they stay off the heap however large the catalogue gets
+        self.search_index = SearchIndex(SEARCH_INDEX_PATH or None, read_only=True)
     
     def get_product_data(self, product_id):
         """Return cached or mock product data"""
-        if product_id not in self.product_cache:
-            self.product_cache[product_id] = self._generate_mock_product(product_id)
-        return self.product_cache[product_id]
+        product = self.product_cache.get(product_id)
+        if product is None:
+            product = self._generate_mock_product(product_id)
+            self.product_cache.put(product_id, product)
+        return product
     
+    @instrument("search_products")
     def search_products(self, keyword, category_id=None, page=1, page_size=10):
-        """Return mock search results - FAST version"""
-        num_results = page_size
-        return pd.DataFrame([self._generate_mock_product(i, keyword) for i in range(num_results)])
+        """Return one page of search results, from the local index when it can fill the page"""
+        local = self.search_index.search(keyword or "", category_id, page, page_size)
+        if len(local['product_id']) == page_size:
+            return page_frame(local)
+        return page_frame(self._generate_mock_page(keyword, category_id, page, page_size))
+    
+    def iter_search_pages(self, keyword, category_id=None, page_size=1000, max_pages=10, start_page=1):
+        """Lazily yield successive result pages as DataFrame chunks"""
+        for page in range(start_page, start_page + max_pages):
+            frame = self.search_products(keyword, category_id, page, page_size)
+            if frame.empty:
+                return
+            yield frame
+    
+    def _generate_mock_page(self, keyword, category_id=None, page=1, page_size=10, rng=None):
+        """Generate a page of mock products as a dict of NumPy columns"""
+        rng = rng or np.random.default_rng()
+        offsets = np.arange((page - 1) * page_size, page * page_size)
+        # Each query gets its own stable ID range, so indexing one keyword's results
+        # doesn't overwrite the same product_ids indexed under another keyword
+        query = f"{(keyword or '').lower()}|{category_id or ''}".encode()
+        first_id = MOCK_QUERY_ID_SPAN * (1 + zlib.crc32(query) % 1_000_000)
+        if category_id:
+            categories = np.full(page_size, int(category_id))
+        else:
+            categories = rng.integers(100, 501, page_size)
+        return {
+            'product_id': first_id + offsets,
+            'name': f"{(keyword or 'Product').capitalize()} " + (offsets + 1).astype(str).astype(object),
+            'price': rng.uniform(5.0, 100.0, page_size).round(2),
+            'rating': rng.uniform(3.5, 5.0, page_size).round(1),
+            'sales': rng.integers(100, 5001, page_size),
+            'seller_id': rng.integers(5000, 6001, page_size),
+            'category_id': categories
+        }
     
     def _generate_mock_product(self, idx, keyword="Product"):
         return {
@@ -25,4 +87,10 @@ class DarazAPI:
             'sales': random.randint(100, 5000),
             'seller_id': random.randint(5000, 6000),
             'category_id': random.randint(100, 500)
-        }
\ No newline at end of file
+        }
+
+def page_frame(columns):
+    """Build a search-result DataFrame from columnar arrays (mock or upstream)"""
+    return pd.DataFrame({
+        name: np.asarray(columns[name], dtype=dtype) for name, dtype in SEARCH_DTYPES.items()
+    })
@@ -1,44 +1,448 @@
+import atexit
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 import pandas as pd
-import streamlit as st
-
-def init_db():
-    conn = sqlite3.connect('daraz_data.db')
-    c = conn.cursor()
-    
-    # Create tables
-    c.execute('''CREATE TABLE IF NOT EXISTS products (
-                 id INTEGER PRIMARY KEY,
-                 name TEXT,
-                 price REAL,
-                 rating REAL,
-                 sales INTEGER,
-                 category_id INTEGER)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS user_products (
-                 id INTEGER PRIMARY KEY,
-                 user_email TEXT,
-                 product_id INTEGER)''')
-    
-    conn.commit()
-    return conn
-
-def save_user_product(user_email, product_id):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("INSERT INTO user_products (user_email, product_id) VALUES (?, ?)",
-              (user_email, product_id))
-    conn.commit()
-    conn.close()
+from metrics import instrument
 
-def get_user_products(user_email):
-    conn = init_db()
-    query = f'''
-    SELECT p.* 
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DARAZ_DB_PATH", "daraz_data.db")
+POOL_SIZE = int(os.getenv("DARAZ_DB_POOL_SIZE", "8"))
+IMPORT_CHUNK_SIZE = 50_000
+WRITE_BEHIND_ATTEMPTS = 5   # a row whose batch fails this many times is dropped
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # readers don't block the writer
+    "PRAGMA synchronous=NORMAL",    # safe with WAL, far fewer fsyncs
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # 16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",
+)
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+MIGRATIONS = [
+    (
+        '''CREATE TABLE IF NOT EXISTS products (
+             id INTEGER PRIMARY KEY,
+             name TEXT,
+             price REAL,
+             rating REAL,
+             sales INTEGER,
+             category_id INTEGER)''',
+        '''CREATE TABLE IF NOT EXISTS user_products (
+             id INTEGER PRIMARY KEY,
+             user_email TEXT,
+             product_id INTEGER)''',
+    ),
+    (
+        # Portfolio lookups and keyset pages walk (user_email, id) without touching the table
+        "CREATE INDEX IF NOT EXISTS idx_user_products_email_id ON user_products (user_email, id, product_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_products_product_id ON user_products (product_id)",
+    ),
+    (
+        # Background job queue (see jobs.py)
+        '''CREATE TABLE IF NOT EXISTS jobs (
+             id INTEGER PRIMARY KEY,
+             kind TEXT NOT NULL,
+             params TEXT NOT NULL,
+             user_email TEXT,
+             status TEXT NOT NULL DEFAULT 'queued',
+             progress REAL NOT NULL DEFAULT 0,
+             message TEXT,
+             result TEXT,
+             error TEXT,
+             worker TEXT,
+             created_at REAL,
+             started_at REAL,
+             finished_at REAL)''',
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_id ON jobs (status, id)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_user_email ON jobs (user_email, id)",
+    ),
+    (
+        # Catalogue ingest (see ingest.py): seller per product and resumable checkpoints
+        "ALTER TABLE products ADD COLUMN seller_id INTEGER",
+        '''CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+             source TEXT PRIMARY KEY,
+             fingerprint TEXT NOT NULL,
+             rows INTEGER NOT NULL,
+             rejected INTEGER NOT NULL DEFAULT 0,
+             updated_at REAL)''',
+    ),
+    (
+        # Products changed since the analytics layer last looked (see analytics.py)
+        '''CREATE TABLE IF NOT EXISTS product_changes (
+             product_id INTEGER PRIMARY KEY,
+             version INTEGER NOT NULL)''',
+        '''CREATE TRIGGER IF NOT EXISTS products_insert_logged AFTER INSERT ON products BEGIN
+             INSERT INTO product_changes (product_id, version) VALUES (new.id, 1)
+             ON CONFLICT(product_id) DO UPDATE SET version = version + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS products_update_logged AFTER UPDATE ON products BEGIN
+             INSERT INTO product_changes (product_id, version) VALUES (new.id, 1)
+             ON CONFLICT(product_id) DO UPDATE SET version = version + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS products_delete_logged AFTER DELETE ON products BEGIN
+             INSERT INTO product_changes (product_id, version) VALUES (old.id, 1)
+             ON CONFLICT(product_id) DO UPDATE SET version = version + 1;
+           END''',
+    ),
+    (
+        # Job heartbeats, so jobs of a dead worker can be requeued (see jobs.claim_next)
+        "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+        "ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+    ),
+]
+
+INSERT_USER_PRODUCT = "INSERT INTO user_products (user_email, product_id) VALUES (?, ?)"
+PRODUCT_FIELDS = ('name', 'price', 'rating', 'sales', 'category_id', 'seller_id')
+UPSERT_PRODUCT = '''
+    INSERT INTO products (id, name, price, rating, sales, category_id, seller_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name, price = excluded.price, rating = excluded.rating,
+        sales = excluded.sales, category_id = excluded.category_id, seller_id = excluded.seller_id
+'''
+INSERT_NEW_PRODUCT = '''
+    INSERT INTO products (name, price, rating, sales, category_id, seller_id) VALUES (?, ?, ?, ?, ?, ?)
+'''
+SELECT_USER_PRODUCTS = '''
+    SELECT p.*
     FROM products p
     JOIN user_products up ON p.id = up.product_id
-    WHERE up.user_email = '{user_email}'
-    '''
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
\ No newline at end of file
+    WHERE up.user_email = ?
+'''
+SELECT_USER_PRODUCTS_PAGE = '''
+    SELECT p.*, up.id AS portfolio_id
+    FROM user_products up
+    JOIN products p ON p.id = up.product_id
+    WHERE up.user_email = ? AND up.id > ?
+    ORDER BY up.id
+    LIMIT ?
+'''
+COUNT_USER_PRODUCTS = '''
+    SELECT COUNT(*)
+    FROM user_products up
+    JOIN products p ON p.id = up.product_id
+    WHERE up.user_email = ?
+'''
+PORTFOLIO_FINGERPRINT = '''
+    SELECT COUNT(*), TOTAL(p.price), MAX(p.id)
+    FROM user_products up
+    JOIN products p ON p.id = up.product_id
+    WHERE up.user_email = ?
+'''
+
+
+def migrate(conn):
+    """Bring the schema up to the latest version; a no-op once applied"""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+    conn.execute("BEGIN IMMEDIATE")  # serialize concurrent migrators
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+class ConnectionPool:
+    """Small thread-safe pool of SQLite connections sharing one database file"""
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               cached_statements=256)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            if not self._migrated:
+                migrate(conn)
+                self._migrated = True
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._connect()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; uncommitted work is rolled back on error"""
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    """Return the process-wide pool for a database file"""
+    path = path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+
+def init_db(path=None):
+    """Open the pool and apply schema migrations once"""
+    pool = get_pool(path)
+    with pool.connection():
+        pass
+    return pool
+
+
+def save_user_product(user_email, product_id, defer=False):
+    if defer:
+        get_write_behind().put(user_email, product_id)
+        return
+    with get_pool().connection() as conn:
+        with conn:
+            conn.execute(INSERT_USER_PRODUCT, (user_email, product_id))
+
+
+@instrument("get_user_products")
+def get_user_products(user_email):
+    with get_pool().connection() as conn:
+        return pd.read_sql_query(SELECT_USER_PRODUCTS, conn, params=(user_email,))
+
+
+@instrument("get_user_products_page")
+def get_user_products_page(user_email, after_id=0, limit=50):
+    """Return the next page of a portfolio after portfolio_id after_id (keyset pagination)"""
+    with get_pool().connection() as conn:
+        return pd.read_sql_query(SELECT_USER_PRODUCTS_PAGE, conn,
+                                 params=(user_email, after_id, limit))
+
+
+@instrument("count_user_products")
+def count_user_products(user_email):
+    with get_pool().connection() as conn:
+        return conn.execute(COUNT_USER_PRODUCTS, (user_email,)).fetchone()[0]
+
+
+@instrument("portfolio_fingerprint")
+def portfolio_fingerprint(user_email):
+    """(count, price total, newest id) of a portfolio: changes when products or prices do"""
+    with get_pool().connection() as conn:
+        return tuple(conn.execute(PORTFOLIO_FINGERPRINT, (user_email,)).fetchone())
+
+
+def iter_products(chunk_size=IMPORT_CHUNK_SIZE):
+    """Stream the products table as DataFrame chunks"""
+    with get_pool().connection() as conn:
+        yield from pd.read_sql_query("SELECT * FROM products", conn, chunksize=chunk_size)
+
+
+def _product_records(rows):
+    """Normalize a DataFrame, dicts or bare product IDs into (id, fields) pairs"""
+    if isinstance(rows, pd.DataFrame):
+        frame = rows.rename(columns={'id': 'product_id'})
+        if 'product_id' not in frame:
+            frame = frame.assign(product_id=None)
+        for field in PRODUCT_FIELDS:
+            if field not in frame:
+                frame = frame.assign(**{field: None})
+        frame = frame[['product_id', *PRODUCT_FIELDS]].astype(object)
+        frame = frame.where(frame.notna(), None)
+        for row in frame.itertuples(index=False, name=None):
+            yield row[0], row[1:]
+        return
+    for row in rows:
+        if isinstance(row, dict):
+            unknown = row.keys() - {'product_id', 'id', *PRODUCT_FIELDS}
+            if unknown:
+                # Silently dropping them would store the product without, say, its category
+                raise ValueError(f"unknown product fields: {', '.join(sorted(unknown))}")
+            product_id = row.get('product_id', row.get('id'))
+            yield product_id, tuple(row.get(field) for field in PRODUCT_FIELDS)
+        else:
+            yield row, None
+
+
+def save_user_products_bulk(user_email, rows):
+    """Upsert products and link them to a user in a single transaction"""
+    upserts, links, new_products = [], [], []
+    for product_id, fields in _product_records(rows):
+        if product_id is None:
+            new_products.append(fields)
+            continue
+        product_id = int(product_id)
+        if fields is not None:
+            upserts.append((product_id, *fields))
+        links.append((user_email, product_id))
+    with get_pool().connection() as conn:
+        with conn:
+            conn.executemany(UPSERT_PRODUCT, upserts)
+            for fields in new_products:
+                cursor = conn.execute(INSERT_NEW_PRODUCT, fields)
+                links.append((user_email, cursor.lastrowid))
+            conn.executemany(INSERT_USER_PRODUCT, links)
+    return len(links)
+
+
+def _read_chunks(source, fmt, chunk_size):
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+
+def import_user_products(user_email, source, fmt=None, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """Import a CSV/Parquet catalogue (sample_data.csv layout) into a user's portfolio"""
+    if fmt is None:
+        name = source if isinstance(source, str) else getattr(source, 'name', '')
+        fmt = 'parquet' if str(name).lower().endswith(('.parquet', '.pq')) else 'csv'
+    imported = 0
+    for chunk in _read_chunks(source, fmt, chunk_size):
+        imported += save_user_products_bulk(user_email, chunk)
+        if progress is not None:
+            progress(imported)
+    return imported
+
+
+class WriteBehindQueue:
+    """Buffers single portfolio inserts from many sessions into periodic batch commits
+
+    A batch that fails to commit is requeued and retried after a pause; rows
+    still failing after WRITE_BEHIND_ATTEMPTS tries are dropped and counted,
+    so one bad write never stops the queue or blocks flush() forever.
+    """
+
+    def __init__(self, flush_interval=0.5, max_batch=5000, attempts=WRITE_BEHIND_ATTEMPTS):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.attempts = attempts
+        self.counters = dict.fromkeys(('committed', 'errors', 'retried', 'dropped'), 0)
+        self.last_error = None
+        self._queue = queue.Queue()   # (row, failed attempts so far)
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+
+    def put(self, user_email, product_id):
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(((user_email, product_id), 0))
+
+    def _drain(self, first):
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """Commit one batch; returns how many of its rows are done (committed or dropped)"""
+        try:
+            with get_pool().connection() as conn:
+                with conn:
+                    conn.executemany(INSERT_USER_PRODUCT, [row for row, _ in batch])
+        except Exception as exc:  # keep the thread alive; the rows go back on the queue
+            retry = [(row, failed + 1) for row, failed in batch if failed + 1 < self.attempts]
+            self.counters['errors'] += 1
+            self.counters['retried'] += len(retry)
+            self.counters['dropped'] += len(batch) - len(retry)
+            self.last_error = repr(exc)
+            logger.warning("write-behind: batch of %d rows failed (%r); retrying %d, dropping %d",
+                           len(batch), exc, len(retry), len(batch) - len(retry))
+            for item in retry:
+                self._queue.put(item)
+            self._stopped.wait(self.flush_interval)
+            return len(batch) - len(retry)
+        self.counters['committed'] += len(batch)
+        return len(batch)
+
+    def _run(self):
+        while not (self._stopped.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Let more writes accumulate before committing
+            if self._queue.qsize() < self.max_batch and not self._stopped.is_set():
+                time.sleep(self.flush_interval)
+            batch = self._drain(first)
+            done = len(batch)
+            try:
+                done = self._write(batch)
+            finally:
+                with self._flushed:
+                    self._pending -= done
+                    self._flushed.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed"""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+_write_behind = None
+_write_behind_lock = threading.Lock()
+
+
+def get_write_behind():
+    """Return the process-wide write-behind queue, starting it on first use"""
+    global _write_behind
+    with _write_behind_lock:
+        if _write_behind is None:
+            _write_behind = WriteBehindQueue()
+            atexit.register(_write_behind.close)
+    return _write_behind
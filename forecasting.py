@@ -0,0 +1,242 @@
+"""Batched exponential-smoothing sales forecasts for whole catalogues
+
+Series are rows of a 2-D (SKUs x months) matrix. Fitting runs damped
+Holt-Winters (additive trend and season) for a small grid of smoothing
+parameters across every SKU at once and keeps each SKU's best combination,
+so the per-month loop is a handful of NumPy operations on whole columns.
+"""
+import itertools
+import warnings
+import numpy as np
+
+SEASON = 12
+DAMPING = 0.98
+ALPHAS = (0.1, 0.3, 0.5, 0.8)
+BETAS = (0.0, 0.05, 0.2)
+GAMMAS = (0.05, 0.3)
+FIT_CHUNK_SIZE = 20_000
+
+
+def _initial_state(y, season):
+    """Level, trend and seasonal offsets from the first observations of each series"""
+    n, months = y.shape
+    # Series with no data yet in a window are expected; they fall back to zero below
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if season:
+            first = np.nanmean(y[:, :season], axis=1)
+            if months >= 2 * season:
+                trend = (np.nanmean(y[:, season:2 * season], axis=1) - first) / season
+            else:
+                trend = np.zeros(n)
+            level = first - trend * (season - 1) / 2
+            seasonal = y[:, :season] - (level[:, None] + trend[:, None] * np.arange(season))
+            # Re-centre so the seasonal offsets sum to zero
+            seasonal -= np.nanmean(seasonal, axis=1, keepdims=True)
+        else:
+            # A slope from two noisy points does more harm than good; let beta find the trend
+            level = y[:, 0].copy()
+            trend = np.zeros(n)
+            seasonal = np.zeros((n, 1))
+        first_valid = y[np.arange(n), np.argmax(~np.isnan(y), axis=1)]
+    level = np.where(np.isnan(level), first_valid, level)
+    return (np.nan_to_num(level), np.nan_to_num(trend), np.nan_to_num(seasonal))
+
+
+def _step(y, level, trend, season, alpha, alpha_beta, gamma, phi):
+    """Advance the state by one month in place; NaN observations only carry it forward"""
+    trend *= phi
+    level += trend
+    error = y - level - season
+    observed = ~np.isnan(error)
+    error[~observed] = 0.0
+    level += alpha * error
+    trend += alpha_beta * error
+    season += gamma * error
+    return error, observed
+
+
+class SalesForecaster:
+    """Fitted smoothing parameters and state per SKU, updated one month at a time"""
+
+    def __init__(self, season=SEASON, damping=DAMPING, alphas=ALPHAS, betas=BETAS, gammas=GAMMAS):
+        self.season = season
+        self.damping = damping
+        self.grid = np.array(list(itertools.product(alphas, betas, gammas)))
+        self.index = {}
+        self.params = np.empty((0, 3))
+        self.level = np.empty(0)
+        self.trend = np.empty(0)
+        self.seasonal = np.empty((0, season or 1))
+        self.months = np.empty(0, np.int64)
+        self.rmse = np.empty(0)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _season_for(self, months):
+        # One full cycle seeds the offsets; shorter series are fitted without a season
+        return self.season if self.season and months > self.season else None
+
+    def fit(self, sku_ids, series, chunk_size=FIT_CHUNK_SIZE):
+        """Fit every SKU's series (rows of a 2-D matrix, oldest month first; NaN = no data)
+
+        Refitting a SKU replaces its parameters and state.
+        """
+        y = np.asarray(series, dtype=float)
+        if y.ndim == 1:
+            y = y[None, :]
+        sku_ids = list(sku_ids)
+        if len(sku_ids) != len(y):
+            raise ValueError("One series row is required per SKU")
+        fitted = [self._fit_chunk(y[start:start + chunk_size])
+                  for start in range(0, len(y), chunk_size)]
+        columns = [np.concatenate(parts) for parts in zip(*fitted)] if fitted else None
+        if columns is not None:
+            self._store(sku_ids, columns, len(y[0]))
+        return self
+
+    def _fit_chunk(self, y):
+        n, months = y.shape
+        season = self._season_for(months)
+        seasonal_grid = self.grid if season else self.grid[self.grid[:, 2] == self.grid[0, 2]]
+        g = len(seasonal_grid)
+        alpha, beta, gamma = (seasonal_grid[:, i][None, :] for i in range(3))
+        if not season:
+            gamma = np.zeros_like(gamma)
+        level0, trend0, seasonal0 = _initial_state(y, season)
+        level = np.repeat(level0[:, None], g, axis=1)
+        trend = np.repeat(trend0[:, None], g, axis=1)
+        # (slot, SKU, grid) so each month updates one contiguous plane
+        seasonal = np.repeat(seasonal0.T[:, :, None], g, axis=2)
+        width = len(seasonal)
+        alpha_beta, gamma = alpha * beta, gamma * (1 - alpha)
+        sse = np.zeros((n, g))
+        count = np.zeros(n)
+        for t in range(months):
+            error, observed = _step(y[:, t:t + 1], level, trend, seasonal[t % width],
+                                    alpha, alpha_beta, gamma, self.damping)
+            error *= error
+            sse += error
+            count += observed[:, 0]
+        best = np.argmin(sse, axis=1)
+        rows = np.arange(n)
+        params = np.column_stack([seasonal_grid[best, 0], seasonal_grid[best, 1],
+                                  seasonal_grid[best, 2] if season else np.zeros(n)])
+        seasonal = seasonal[:, rows, best].T if season else np.zeros((n, self.season or 1))
+        rmse = np.sqrt(sse[rows, best] / np.maximum(count, 1))
+        return params, level[rows, best], trend[rows, best], seasonal, rmse
+
+    def _store(self, sku_ids, columns, months):
+        params, level, trend, seasonal, rmse = columns
+        rows = np.array([self.index.get(sku, -1) for sku in sku_ids], dtype=np.int64)
+        new = rows < 0
+        if new.any():
+            start = len(self.index)
+            for offset, sku in enumerate(sku for sku, is_new in zip(sku_ids, new) if is_new):
+                self.index[sku] = start + offset
+            rows[new] = np.arange(start, start + new.sum())
+            grow = len(self.index) - len(self.level)
+            self.params = np.concatenate([self.params, np.zeros((grow, 3))])
+            self.level = np.concatenate([self.level, np.zeros(grow)])
+            self.trend = np.concatenate([self.trend, np.zeros(grow)])
+            self.seasonal = np.concatenate([self.seasonal, np.zeros((grow, self.seasonal.shape[1]))])
+            self.months = np.concatenate([self.months, np.zeros(grow, np.int64)])
+            self.rmse = np.concatenate([self.rmse, np.zeros(grow)])
+        self.params[rows] = params
+        self.level[rows] = level
+        self.trend[rows] = trend
+        self.seasonal[rows] = seasonal
+        self.months[rows] = months
+        self.rmse[rows] = rmse
+
+    def _rows(self, sku_ids):
+        if sku_ids is None:
+            return np.arange(len(self.index))
+        return np.array([self.index[sku] for sku in sku_ids], dtype=np.int64)
+
+    def update(self, sku_ids, values):
+        """Fold in one new month per SKU using the cached parameters (no refit)"""
+        rows = self._rows(sku_ids)
+        y = np.asarray(values, dtype=float)
+        level, trend, seasonal = self.level[rows], self.trend[rows], self.seasonal[rows]
+        slot = self.months[rows] % seasonal.shape[1]
+        s = seasonal[np.arange(len(rows)), slot]
+        alpha, beta, gamma = self.params[rows].T
+        damped = self.damping * trend
+        error = np.nan_to_num(y - (level + damped + s))
+        self.level[rows] = level + damped + alpha * error
+        self.trend[rows] = damped + alpha * beta * error
+        seasonal[np.arange(len(rows)), slot] = s + gamma * (1 - alpha) * error
+        self.seasonal[rows] = seasonal
+        self.months[rows] += 1
+
+    def forecast(self, sku_ids=None, horizon=3):
+        """(SKUs x horizon) matrix of forecasts, clipped at zero"""
+        rows = self._rows(sku_ids)
+        steps = np.arange(1, horizon + 1)
+        damped_steps = np.cumsum(self.damping ** steps)
+        width = self.seasonal.shape[1]
+        slots = (self.months[rows, None] + steps[None, :] - 1) % width
+        seasonal = np.take_along_axis(self.seasonal[rows], slots, axis=1)
+        forecast = self.level[rows, None] + damped_steps[None, :] * self.trend[rows, None] + seasonal
+        return np.maximum(forecast, 0.0)
+
+    def save(self, path):
+        np.savez(path, skus=np.array(list(self.index), dtype=object), params=self.params,
+                 level=self.level, trend=self.trend, seasonal=self.seasonal,
+                 months=self.months, rmse=self.rmse)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with np.load(path, allow_pickle=True) as saved:
+            forecaster = cls(**kwargs)
+            forecaster.index = {sku: row for row, sku in enumerate(saved['skus'].tolist())}
+            for name in ('params', 'level', 'trend', 'seasonal', 'months', 'rmse'):
+                setattr(forecaster, name, saved[name])
+        return forecaster
+
+
+def forecast_series(history, months=3, **kwargs):
+    """Forecast one sales series; returns a list of `months` values"""
+    if not len(history):
+        return [0.0] * months
+    forecaster = SalesForecaster(**kwargs).fit([0], np.asarray(history, dtype=float)[None, :])
+    return forecaster.forecast(horizon=months)[0].tolist()
+
+
+def seasonal_naive(series, horizon, season=SEASON):
+    """Baseline: repeat the last season (or the last value for short series)"""
+    y = np.asarray(series, dtype=float)
+    if season and y.shape[1] >= season:
+        last = y[:, -season:]
+        return last[:, np.arange(horizon) % season]
+    return np.repeat(y[:, -1:], horizon, axis=1)
+
+
+def backtest(series, horizon=3, origins=3, season=SEASON, **kwargs):
+    """Rolling-origin accuracy of SalesForecaster against the seasonal-naive baseline
+
+    Fits on everything before each origin, forecasts `horizon` months and
+    scores them against the held-out actuals. Returns mean sMAPE and MASE.
+    """
+    y = np.asarray(series, dtype=float)
+    months = y.shape[1]
+    scores = {'model': {'smape': [], 'mase': []}, 'seasonal_naive': {'smape': [], 'mase': []}}
+    for origin in range(months - horizon - origins + 1, months - horizon + 1):
+        train, actual = y[:, :origin], y[:, origin:origin + horizon]
+        lag = season if season and origin > season else 1
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            scale = np.nanmean(np.abs(train[:, lag:] - train[:, :-lag]), axis=1)[:, None]
+        scale = np.where(scale > 0, scale, 1.0)
+        model = SalesForecaster(season=season, **kwargs).fit(range(len(y)), train)
+        for name, predicted in (('model', model.forecast(horizon=horizon)),
+                                ('seasonal_naive', seasonal_naive(train, horizon, season))):
+            denominator = np.abs(actual) + np.abs(predicted)
+            smape = np.divide(2 * np.abs(actual - predicted), denominator,
+                              out=np.zeros_like(denominator), where=denominator > 0)
+            scores[name]['smape'].append(np.nanmean(smape))
+            scores[name]['mase'].append(np.nanmean(np.abs(actual - predicted) / scale))
+    return {name: {metric: float(np.mean(values)) for metric, values in metrics.items()}
+            for name, metrics in scores.items()}
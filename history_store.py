@@ -0,0 +1,197 @@
+import atexit
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+FIELDS = {
+    'update_times': np.float64,
+    'prices': np.float32,
+    'ratings': np.float32,
+}
+# index.json is rewritten after this many new products, or an eighth of all products once
+# there are more, so writing it stays O(1) amortized per product (flush() always writes it)
+INDEX_SAVE_EVERY = 1024
+
+
+class HistoryStore:
+    """Fixed-capacity NumPy ring buffers of (time, price, rating) per tracked product
+
+    Each product owns one row of 2 * capacity cells and every point is written
+    twice (at i and i + capacity), so the live window is always one contiguous
+    slice. Internal readers use zero-copy views of it; arrays(), frame() and
+    last() copy under the lock, since appends and downsampling rewrite those
+    rows while a page is still rendering them. With a path, the buffers are
+    memory-mapped .npy files and history survives restarts; the product index
+    is written in batches of new products and on flush() (and at exit).
+    """
+
+    def __init__(self, capacity=1024, path=None, initial_products=1024, downsample=None):
+        self.path = path
+        self.downsample = downsample
+        self._lock = threading.RLock()
+        self._slots = {}
+        self._unsaved = 0   # products added since index.json was last written
+        if path and os.path.exists(os.path.join(path, "index.json")):
+            self._open(path)
+        else:
+            self.capacity = capacity
+            self._allocate(initial_products)
+        if path:
+            atexit.register(self.flush)
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.npy")
+
+    def _new_array(self, name, array):
+        """A buffer holding array; on disk it is written to a temp file and swapped in, so the
+        file an older map still points at is replaced rather than truncated under it"""
+        if not self.path:
+            return array
+        tmp_path = self._file(name) + ".tmp"
+        mapped = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=array.dtype, shape=array.shape)
+        mapped[:] = array
+        mapped.flush()
+        os.replace(tmp_path, self._file(name))
+        return mapped
+
+    def _allocate(self, products, old=None):
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+        buffers = {}
+        for name, dtype in FIELDS.items():
+            array = np.zeros((products, 2 * self.capacity), dtype)
+            if old is not None:
+                array[:len(old[name])] = old[name]
+            buffers[name] = array
+        state = np.zeros((products, 2), np.int64)  # head, count
+        if old is not None:
+            state[:len(old['state'])] = old['state']
+        # Write the grown copies out only after reading everything from the old maps
+        self._buffers = {name: self._new_array(name, array) for name, array in buffers.items()}
+        self._state = self._new_array("state", state)
+        self._save_index()
+
+    def _open(self, path):
+        with open(os.path.join(path, "index.json")) as index:
+            meta = json.load(index)
+        self.capacity = meta['capacity']
+        self._slots = meta['slots']
+        self._buffers = {name: np.load(self._file(name), mmap_mode="r+") for name in FIELDS}
+        self._state = np.load(self._file("state"), mmap_mode="r+")
+
+    def _save_index(self):
+        self._unsaved = 0
+        if not self.path:
+            return
+        tmp_path = os.path.join(self.path, "index.json.tmp")
+        with open(tmp_path, "w") as index:
+            # dumps() encodes in C; dump() streams thousands of small writes
+            index.write(json.dumps({'capacity': self.capacity, 'slots': self._slots}))
+        os.replace(tmp_path, os.path.join(self.path, "index.json"))
+
+    def __contains__(self, product_id):
+        return str(product_id) in self._slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, product_id):
+        key = str(product_id)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._slots)
+            if slot >= len(self._state):
+                old = {name: np.array(array) for name, array in self._buffers.items()}
+                old['state'] = np.array(self._state)
+                self._allocate(2 * len(self._state), old)
+            self._slots[key] = slot
+            # A slot past the last saved index may hold points of a product lost in a crash
+            self._state[slot] = 0
+            self._unsaved += 1
+            if self._unsaved >= max(INDEX_SAVE_EVERY, len(self._slots) // 8):
+                self._save_index()
+        return slot
+
+    def append(self, product_id, update_time, price, rating):
+        """Record one point, overwriting (or downsampling) the oldest when full"""
+        with self._lock:
+            slot = self._slot(product_id)
+            head, count = self._state[slot]
+            if count == self.capacity and self.downsample:
+                head, count = self._compact(slot)
+            for name, value in (('update_times', update_time), ('prices', price), ('ratings', rating)):
+                row = self._buffers[name][slot]
+                row[head] = value
+                row[head + self.capacity] = value
+            self._state[slot] = ((head + 1) % self.capacity, min(count + 1, self.capacity))
+
+    def _compact(self, slot):
+        """Average the oldest half of a full buffer in groups of `downsample` points"""
+        half = self.capacity // 2
+        keep = half // self.downsample * self.downsample
+        views = self._views(slot)
+        compacted = {}
+        for name, window in views.items():
+            old = window[:keep].reshape(-1, self.downsample).mean(axis=1)
+            compacted[name] = np.concatenate([old, window[keep:]])
+        count = len(compacted['prices'])
+        for name, values in compacted.items():
+            row = self._buffers[name][slot]
+            row[:count] = values
+            row[self.capacity:self.capacity + count] = values
+        self._state[slot] = (count % self.capacity, count)
+        return count % self.capacity, count
+
+    def _views(self, slot):
+        """Zero-copy views of a slot's history, oldest first; callers hold the lock"""
+        head, count = self._state[slot]
+        start = (head - count) % self.capacity
+        return {name: self._buffers[name][slot, start:start + count] for name in FIELDS}
+
+    def arrays(self, product_id):
+        """A product's history as arrays, oldest first (copies, safe to keep)"""
+        with self._lock:
+            slot = self._slots.get(str(product_id))
+            if slot is None:
+                return {name: np.empty(0, dtype) for name, dtype in FIELDS.items()}
+            return {name: np.array(view) for name, view in self._views(slot).items()}
+
+    def last(self, product_id):
+        """Latest (update_time, price, rating), or None if never recorded"""
+        with self._lock:
+            slot = self._slots.get(str(product_id))
+            if slot is None or not self._state[slot, 1]:
+                return None
+            head = (self._state[slot, 0] - 1) % self.capacity
+            return tuple(float(self._buffers[name][slot, head]) for name in FIELDS)
+
+    def frame(self, product_id):
+        """History as a DataFrame with the columns track_product has always returned"""
+        arrays = self.arrays(product_id)
+        return pd.DataFrame({name: arrays[name] for name in ('prices', 'ratings', 'update_times')},
+                            copy=False)
+
+    def since(self, update_time):
+        """Points recorded after update_time across all products, as one long DataFrame"""
+        with self._lock:
+            parts = []
+            for key, slot in self._slots.items():
+                views = self._views(slot)
+                fresh = views['update_times'] > update_time
+                if fresh.any():
+                    parts.append(pd.DataFrame({'product_id': key,
+                                               **{name: views[name][fresh] for name in FIELDS}}))
+        if not parts:
+            return pd.DataFrame({'product_id': pd.Series(dtype=object),
+                                 **{name: np.empty(0, dtype) for name, dtype in FIELDS.items()}})
+        return pd.concat(parts, ignore_index=True)
+
+    def flush(self):
+        with self._lock:
+            if self._unsaved:
+                self._save_index()
+            for array in (*self._buffers.values(), self._state):
+                if isinstance(array, np.memmap):
+                    array.flush()
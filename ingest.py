@@ -0,0 +1,198 @@
+"""Stream catalogue dumps (CSV, Parquet, JSONL) into the products table
+
+Run with:  python ingest.py catalogue.csv [--chunk-size 100000] [--restart]
+
+Files are read chunk by chunk, so memory stays flat whatever the file size.
+Every chunk is upserted in one transaction together with its checkpoint, so
+an interrupted run resumes after the last committed chunk.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from database import UPSERT_PRODUCT, get_pool
+
+INGEST_CHUNK_SIZE = int(os.getenv("DARAZ_INGEST_CHUNK_SIZE", "100000"))
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+NUMERIC_LIMITS = {   # column -> (min, max); values outside become NULL
+    'price': (0, None),
+    'rating': (0, 5),
+    'sales': (0, None),
+    'category_id': (0, None),
+    'seller_id': (0, None),
+}
+SAVE_CHECKPOINT = '''
+    INSERT INTO ingest_checkpoints (source, fingerprint, rows, rejected, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(source) DO UPDATE SET
+        fingerprint = excluded.fingerprint, rows = excluded.rows,
+        rejected = excluded.rejected, updated_at = excluded.updated_at
+'''
+
+
+def detect_format(path):
+    fmt = FORMATS.get(os.path.splitext(str(path).lower())[1])
+    if fmt is None:
+        raise ValueError(f"Cannot tell the format of {path}; pass fmt='csv', 'parquet' or 'jsonl'")
+    return fmt
+
+
+def fingerprint(path):
+    """Identifies one version of a file; a changed file is ingested from the start"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def read_chunks(path, fmt, chunk_size=INGEST_CHUNK_SIZE):
+    """Yield DataFrame chunks of about chunk_size rows without loading the file"""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif fmt == 'csv':
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        with open(path, newline='') as header:
+            columns = next(csv.reader(header), [])
+        # Read every column as text and let validate() coerce it, so one bad cell never aborts the file
+        reader = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=1 << 20),
+                                convert_options=pacsv.ConvertOptions(
+                                    column_types={column: pa.string() for column in columns}))
+        pending, pending_rows = [], 0
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= chunk_size:
+                yield pa.Table.from_batches(pending).to_pandas()
+                pending, pending_rows = [], 0
+        if pending_rows:
+            yield pa.Table.from_batches(pending).to_pandas()
+    elif fmt == 'jsonl':
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def validate(chunk):
+    """Coerce a raw chunk to the products schema; returns (clean frame, rejected row count)"""
+    frame = chunk.rename(columns={'id': 'product_id'})
+    if 'product_id' not in frame:
+        raise ValueError("Catalogue has no product_id (or id) column")
+    clean = pd.DataFrame(index=frame.index)
+    clean['product_id'] = pd.to_numeric(frame['product_id'], errors='coerce')
+    names = frame['name'] if 'name' in frame else pd.Series(None, index=frame.index, dtype=object)
+    clean['name'] = names.astype(object).where(names.notna(), None)
+    for column, (low, high) in NUMERIC_LIMITS.items():
+        values = pd.to_numeric(frame[column], errors='coerce') if column in frame else np.nan
+        values = pd.Series(values, index=frame.index, dtype=float)
+        if low is not None:
+            values = values.where(values >= low)
+        if high is not None:
+            values = values.where(values <= high)
+        clean[column] = values
+    product_id = clean['product_id']
+    valid = product_id.notna() & (product_id == product_id.round()) & (product_id > 0)
+    clean = clean[valid.to_numpy()]
+    clean['product_id'] = clean['product_id'].astype(np.int64)
+    clean['name'] = clean['name'].map(lambda name: name.strip() if isinstance(name, str) else name)
+    # Later rows win within a chunk, as they would across chunks
+    clean = clean.drop_duplicates('product_id', keep='last')
+    return clean, int((~valid).sum())
+
+
+def _rows(clean):
+    # NaN binds as NULL; whole-number floats land as INTEGER in INTEGER columns
+    columns = ('product_id', 'name', 'price', 'rating', 'sales', 'category_id', 'seller_id')
+    return zip(*(clean[column].tolist() for column in columns))
+
+
+def get_checkpoint(source):
+    with get_pool().connection() as conn:
+        row = conn.execute("SELECT fingerprint, rows, rejected FROM ingest_checkpoints WHERE source = ?",
+                           (source,)).fetchone()
+    return row
+
+
+def ingest_catalogue(path, fmt=None, chunk_size=INGEST_CHUNK_SIZE, restart=False, progress=None,
+                     on_chunk=None):
+    """Upsert a catalogue file into products, resuming from its checkpoint
+
+    progress(rows, rejected, elapsed) is called after every committed chunk and
+    on_chunk(clean_frame) lets indexes and rollups follow the ingest. Returns
+    (rows read, rows rejected) for the whole file, including resumed work.
+    """
+    fmt = fmt or detect_format(path)
+    source = os.path.abspath(path)
+    version = fingerprint(path)
+    done, rejected = 0, 0
+    checkpoint = None if restart else get_checkpoint(source)
+    if checkpoint is not None and checkpoint[0] == version:
+        done, rejected = checkpoint[1], checkpoint[2]
+    skip = done
+    start = time.perf_counter()
+    for chunk in read_chunks(path, fmt, chunk_size):
+        if skip >= len(chunk):
+            skip -= len(chunk)
+            continue
+        chunk, skip = chunk.iloc[skip:], 0
+        clean, bad = validate(chunk)
+        done += len(chunk)
+        rejected += bad
+        with get_pool().connection() as conn:
+            with conn:
+                conn.executemany(UPSERT_PRODUCT, _rows(clean))
+                conn.execute(SAVE_CHECKPOINT, (source, version, done, rejected, time.time()))
+        if on_chunk is not None:
+            on_chunk(clean)
+        if progress is not None:
+            progress(done, rejected, time.perf_counter() - start)
+    return done, rejected
+
+
+def _print_progress(resumed_from):
+    state = {'last': 0.0}
+
+    def report(rows, rejected, elapsed):
+        if elapsed - state['last'] < 1.0:
+            return
+        state['last'] = elapsed
+        rate = (rows - resumed_from) / elapsed if elapsed else 0.0
+        print(f"{rows:>14,} rows  {rate:>10,.0f} rows/s  {rejected:,} rejected", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())))
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--search-index", metavar="PATH", nargs="?",
+                        const=os.getenv("DARAZ_SEARCH_INDEX_PATH") or "search_index",
+                        help="also index products for local search, on disk under PATH "
+                             "(default $DARAZ_SEARCH_INDEX_PATH or search_index)")
+    args = parser.parse_args()
+    index = None
+    if args.search_index:
+        from search_index import SearchIndex
+        index = SearchIndex(args.search_index)
+
+    def index_chunk(clean):
+        index.add(clean.fillna({'name': '', 'sales': 0, 'category_id': 0, 'seller_id': 0}))
+    checkpoint = None if args.restart else get_checkpoint(os.path.abspath(args.path))
+    resumed = checkpoint[1] if checkpoint and checkpoint[0] == fingerprint(args.path) else 0
+    if resumed:
+        print(f"resuming after {resumed:,} rows", file=sys.stderr)
+    start = time.perf_counter()
+    rows, rejected = ingest_catalogue(args.path, args.format, args.chunk_size, args.restart,
+                                      progress=_print_progress(resumed),
+                                      on_chunk=index_chunk if index is not None else None)
+    if index is not None:
+        index.flush()
+        index.close()
+    elapsed = time.perf_counter() - start
+    print(f"ingested {rows - resumed:,} rows in {elapsed:.1f} s "
+          f"({(rows - resumed) / elapsed if elapsed else 0:,.0f} rows/s); {rejected:,} rejected in total")
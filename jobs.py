@@ -0,0 +1,336 @@
+"""SQLite-backed job queue and process-pool worker for heavy work outside Streamlit
+
+Run workers with:  python jobs.py worker --processes 4
+"""
+import argparse
+import atexit
+import fcntl
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+import pandas as pd
+from database import get_pool
+
+JOB_DIR = os.getenv("DARAZ_JOB_DIR", "jobs")
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 10.0
+STALE_AFTER = float(os.getenv("DARAZ_JOB_STALE_AFTER", "120"))   # running jobs silent this long are requeued
+MAX_ATTEMPTS = 3
+FINISHED = ('done', 'failed')
+
+HANDLERS = {}
+
+
+def handler(kind):
+    """Register a function(params, progress) -> result dict for a job kind"""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def write_frame(frame, prefix):
+    """Persist a DataFrame for handoff between processes; returns its path"""
+    os.makedirs(JOB_DIR, exist_ok=True)
+    path = os.path.join(JOB_DIR, f"{prefix}-{uuid.uuid4().hex}.parquet")
+    frame.to_parquet(path, index=False)
+    return path
+
+
+def count_rows(path):
+    """Rows in a CSV or Parquet file, for progress reporting (CSV: lines after the header)"""
+    if path.lower().endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    lines, last = 0, b"\n"
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    return max(0, lines + (last != b"\n") - 1)
+
+
+def _remove_inputs(params):
+    """Delete a finished job's handed-off input and any upload it was given under JOB_DIR"""
+    job_dir = os.path.abspath(JOB_DIR)
+    for key in ('input_path', 'source_path'):
+        path = params.get(key)
+        if not path or (key == 'source_path' and os.path.dirname(os.path.abspath(path)) != job_dir):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def read_frame(path, columns=None):
+    """Read a handed-off frame; pyarrow memory-maps the file instead of unpickling"""
+    return pd.read_parquet(path, columns=columns, memory_map=True)
+
+
+def take_frame(path):
+    """Read a job's output into memory and delete the file; each output is read once"""
+    frame = pd.read_parquet(path)
+    os.remove(path)
+    return frame
+
+
+def submit(kind, params=None, data=None, user_email=None):
+    """Queue a job; a DataFrame passed as data is handed off as a Parquet file"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    params = dict(params or {})
+    if data is not None:
+        params['input_path'] = write_frame(data, f"{kind}-input")
+    with get_pool().connection() as conn:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, params, user_email, created_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(params), user_email, time.time()))
+    return cursor.lastrowid
+
+
+def _row_to_job(cursor, row):
+    job = dict(zip([column[0] for column in cursor.description], row))
+    job['params'] = json.loads(job['params'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def get_job(job_id):
+    with get_pool().connection() as conn:
+        cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return _row_to_job(cursor, row) if row else None
+
+
+def list_jobs(user_email=None, limit=20):
+    with get_pool().connection() as conn:
+        if user_email is None:
+            cursor = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            cursor = conn.execute("SELECT * FROM jobs WHERE user_email = ? ORDER BY id DESC LIMIT ?",
+                                  (user_email, limit))
+        return [_row_to_job(cursor, row) for row in cursor.fetchall()]
+
+
+def _requeue_stale(conn, now):
+    """Give running jobs whose worker stopped sending heartbeats back to the queue"""
+    stale = now - STALE_AFTER
+    conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                 "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+                 (f"worker stopped responding on each of {MAX_ATTEMPTS} attempts", now, stale, MAX_ATTEMPTS))
+    conn.execute("UPDATE jobs SET status = 'queued', worker = NULL, message = ? "
+                 "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?",
+                 ("Requeued: the worker stopped responding", stale))
+
+
+def claim_next(worker):
+    """Atomically move the oldest queued job to running and return it
+
+    Running jobs without a heartbeat for STALE_AFTER seconds are requeued
+    first (or failed after MAX_ATTEMPTS), so a killed worker's jobs still run.
+    """
+    with get_pool().connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            _requeue_stale(conn, now)
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.commit()
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, "
+                         "attempts = attempts + 1 WHERE id = ?", (worker, now, now, row[0]))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return get_job(row[0])
+
+
+def _update(job_id, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with get_pool().connection() as conn:
+        with conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+
+def report_progress(job_id, progress, message=None):
+    _update(job_id, progress=progress, message=message, heartbeat_at=time.time())
+
+
+def run_job(job):
+    """Execute one claimed job and record its outcome"""
+    def progress(fraction, message=None):
+        report_progress(job['id'], fraction, message)
+
+    # Heartbeats from a side thread, so long steps without progress reports don't look stale
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(HEARTBEAT_INTERVAL):
+            _update(job['id'], heartbeat_at=time.time())
+    beating = threading.Thread(target=heartbeat, name=f"job-{job['id']}-heartbeat", daemon=True)
+    beating.start()
+    try:
+        result = HANDLERS[job['kind']](job['params'], progress)
+    except Exception:
+        _update(job['id'], status='failed', error=traceback.format_exc(), finished_at=time.time())
+        return False
+    finally:
+        stopped.set()
+        beating.join()
+        _remove_inputs(job['params'])
+    _update(job['id'], status='done', progress=1.0, result=json.dumps(result), finished_at=time.time())
+    return True
+
+
+def worker_loop(max_jobs=None, poll_interval=POLL_INTERVAL):
+    """Claim and run jobs until max_jobs have run (forever when None)"""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = claim_next(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        done += 1
+
+
+def start_workers(processes=2):
+    """Spawn worker processes; returns them so callers can join or terminate"""
+    context = multiprocessing.get_context("spawn")  # never fork a threaded Streamlit process
+    workers = [context.Process(target=worker_loop, name=f"daraz-job-worker-{i}", daemon=True)
+               for i in range(processes)]
+    for process in workers:
+        process.start()
+    return workers
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def spawn_worker_pool(processes=2):
+    """Launch `python jobs.py worker` as a separate process (used by the Streamlit app)
+
+    Returns the pool this process already started while it is still running,
+    and the pool stops when this process exits. Across processes the worker
+    command itself exits at once if another pool already serves JOB_DIR.
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is not None and _worker_pool.poll() is None:
+            return _worker_pool
+        if _worker_pool is None:
+            atexit.register(stop_worker_pool)
+        _worker_pool = subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker",
+                                         "--processes", str(processes)])
+        return _worker_pool
+
+
+def stop_worker_pool(timeout=10):
+    """Terminate and reap the pool started by spawn_worker_pool"""
+    with _worker_pool_lock:
+        pool = _worker_pool
+    if pool is None or pool.poll() is not None:
+        return
+    pool.terminate()
+    try:
+        pool.wait(timeout)
+    except subprocess.TimeoutExpired:
+        pool.kill()
+        pool.wait()
+
+
+def _lock_worker_pool():
+    """Take JOB_DIR's pool lock (held while the returned file stays open); None if another pool has it"""
+    os.makedirs(JOB_DIR, exist_ok=True)
+    handle = open(os.path.join(JOB_DIR, "workers.lock"), "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    handle.truncate(0)
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+
+@handler('train_price_model')
+def _train_price_model(params, progress):
+    from ai_models import AIModels
+    progress(0.1, "Loading training data")
+    data = read_frame(params['input_path'])
+    progress(0.2, f"Training on {len(data)} rows")
+    ai = AIModels()
+    ai.train_price_model(data)
+    return {'model_version': ai.model_version}
+
+
+@handler('predict_prices')
+def _predict_prices(params, progress):
+    from ai_models import AIModels
+    data = read_frame(params['input_path'])
+    ai = AIModels()
+    if params.get('model_version'):
+        ai.price_model, ai.model_version = ai.registry.get(params['model_version']), params['model_version']
+    else:
+        ai.load_latest_model()
+    progress(0.2, f"Scoring {len(data)} products")
+    predictions = ai.predict_prices(data)
+    path = write_frame(predictions.rename_axis('product_id').reset_index(), "predict_prices-output")
+    return {'output_path': path, 'rows': len(predictions), 'model_version': ai.model_version}
+
+
+@handler('import_portfolio')
+def _import_portfolio(params, progress):
+    from database import import_user_products
+    source = params.get('source_path') or params['input_path']
+    total = count_rows(source)
+    imported = import_user_products(
+        params['user_email'], source,
+        progress=lambda rows: progress(min(0.99, rows / total) if total else 0.5, f"{rows} rows imported"))
+    return {'rows': imported}
+
+
+@handler('ingest_catalogue')
+def _ingest_catalogue(params, progress):
+    from ingest import ingest_catalogue
+    total = params.get('total_rows')
+    rows, rejected = ingest_catalogue(
+        params['source_path'], params.get('format'),
+        progress=lambda rows, rejected, elapsed: progress(
+            min(0.99, rows / total) if total else 0.5, f"{rows} rows ingested, {rejected} rejected"))
+    return {'rows': rows, 'rejected': rejected}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["worker"])
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+    pool_lock = _lock_worker_pool()
+    if pool_lock is None:
+        print(f"a worker pool is already running for {os.path.abspath(JOB_DIR)}", file=sys.stderr)
+        sys.exit(0)
+    processes = start_workers(args.processes)
+    # Take the workers down with us when the app (or an orchestrator) stops this process
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except (KeyboardInterrupt, SystemExit):
+        for process in processes:
+            process.terminate()
@@ -0,0 +1,197 @@
+"""Market gap analysis from per-category rollups of the product catalogue
+
+CategoryRollup keeps additive aggregates per category_id (listings, sales,
+ratings, distinct sellers, and prices in a CategoryPriceIndex it can share
+with the pricing views), so ingesting a batch costs one pass over that batch
+and a report only touches one row per category, never the raw product rows.
+It remembers which product_ids it has counted, so the same product arriving
+again (a repeated search, another session) is not counted twice.
+"""
+import threading
+import numpy as np
+import pandas as pd
+from database import IMPORT_CHUNK_SIZE, iter_products
+from price_stats import CategoryPriceIndex
+
+RATING_BAR = 4.0      # listings rated below this leave room for a better product
+MIN_LISTINGS = 5      # categories with fewer listings are too thin to score
+SUMS = ('listings', 'sales', 'rating', 'rated', 'low_rated')
+
+
+def _pct_rank(values):
+    return pd.Series(values).rank(pct=True).to_numpy()
+
+
+def _level(ranks):
+    return np.select([ranks > 2 / 3, ranks > 1 / 3], ['High', 'Medium'], 'Low')
+
+
+class CategoryRollup:
+    """Incrementally maintained per-category aggregates behind the gap report"""
+
+    def __init__(self, prices=None):
+        self._lock = threading.Lock()
+        self.prices = prices if prices is not None else CategoryPriceIndex()
+        self._rows = {}                    # category_id -> row in the arrays below
+        self._categories = np.empty(0, np.int64)
+        self._sums = np.empty((0, len(SUMS)))
+        self._sellers = np.empty(0, np.int64)
+        self._pairs = np.empty(0, np.int64)         # sorted category << 32 | seller_id
+        self._pair_counts = np.empty(0, np.int64)   # listings per (category, seller)
+        self._has_sellers = False
+        self._counted = np.empty(0, np.int64)       # sorted product_ids folded in
+        self._report = None
+        self.version = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _category_rows(self, categories):
+        unique, inverse = np.unique(categories, return_inverse=True)
+        new = [category for category in unique.tolist() if category not in self._rows]
+        if new:
+            start = len(self._rows)
+            self._rows.update((category, start + i) for i, category in enumerate(new))
+            self._categories = np.concatenate([self._categories, np.array(new, np.int64)])
+            self._sums = np.concatenate([self._sums, np.zeros((len(new), len(SUMS)))])
+            self._sellers = np.concatenate([self._sellers, np.zeros(len(new), np.int64)])
+        rows = np.array([self._rows[category] for category in unique.tolist()], np.int64)
+        return rows[inverse]
+
+    def _claim(self, product_ids, sign):
+        """Mark product_ids counted (sign=-1: uncounted); True for the rows that changed state"""
+        known = ~np.isnan(product_ids)
+        ids = product_ids[known].astype(np.int64)
+        unique, first = np.unique(ids, return_index=True)
+        with self._lock:
+            position = np.searchsorted(self._counted, unique)
+            found = position < len(self._counted)
+            found[found] = self._counted[position[found]] == unique[found]
+            if sign > 0:
+                claimed = ~found
+                self._counted = np.insert(self._counted, position[claimed], unique[claimed])
+            else:
+                claimed = found
+                self._counted = np.delete(self._counted, position[claimed])
+        # Rows without a product_id can't be matched up, so they are always folded
+        keep = ~known
+        keep[np.flatnonzero(known)[first[claimed]]] = True
+        return keep
+
+    def add(self, products, sign=1):
+        """Fold a batch of product rows (product_id, category_id, price, sales, rating[, seller_id]) in
+
+        Products already counted are skipped (remove() them first to replace them).
+        """
+        products = products.dropna(subset=['category_id'])
+        id_column = 'product_id' if 'product_id' in products else 'id' if 'id' in products else None
+        if id_column is not None and not products.empty:
+            products = products[self._claim(products[id_column].to_numpy(float, na_value=np.nan), sign)]
+        if products.empty:
+            return
+        categories = products['category_id'].to_numpy(np.int64)
+        price = products['price'].to_numpy(float, na_value=np.nan)
+        rating = products['rating'].to_numpy(float, na_value=np.nan)
+        rated = ~np.isnan(rating)
+        columns = (
+            np.ones(len(products)),
+            products['sales'].to_numpy(float, na_value=np.nan),
+            np.where(rated, rating, 0.0),
+            rated,
+            rated & (rating < RATING_BAR),
+        )
+        with self._lock:
+            rows = self._category_rows(categories)
+            size = len(self._rows)
+            for i, values in enumerate(columns):
+                self._sums[:, i] += sign * np.bincount(rows, weights=np.nan_to_num(values), minlength=size)
+            if 'seller_id' in products:
+                self._add_sellers(categories, products['seller_id'].to_numpy(), sign)
+            self.prices.add_prices(categories, price, sign)
+            self.version += 1
+            self._report = None
+
+    def remove(self, products):
+        """Undo add() for rows that were replaced or delisted (products never counted are skipped)"""
+        self.add(products, sign=-1)
+
+    def _add_sellers(self, categories, sellers, sign):
+        known = ~pd.isna(sellers)
+        keys = (categories[known] << 32) | sellers[known].astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        if not len(keys):
+            return
+        self._has_sellers = True
+        position = np.searchsorted(self._pairs, keys)
+        found = position < len(self._pairs)
+        found[found] = self._pairs[position[found]] == keys[found]
+        before = np.zeros(len(keys), np.int64)
+        before[found] = self._pair_counts[position[found]]
+        after = before + sign * counts
+        # A seller enters a category with its first listing and leaves with its last
+        change = (after > 0).astype(np.int64) - (before > 0)
+        categories, inverse = np.unique(keys >> 32, return_inverse=True)
+        rows = np.array([self._rows[category] for category in categories.tolist()], np.int64)
+        np.add.at(self._sellers, rows[inverse], change)
+        self._pair_counts[position[found]] = after[found]
+        if sign < 0:
+            keep = self._pair_counts > 0
+            self._pairs, self._pair_counts = self._pairs[keep], self._pair_counts[keep]
+            return
+        new = ~found
+        if new.any():
+            # Positions came from searchsorted, so inserting keeps the pairs sorted
+            self._pairs = np.insert(self._pairs, position[new], keys[new])
+            self._pair_counts = np.insert(self._pair_counts, position[new], after[new])
+
+    def stats(self):
+        """One row per category: demand, competition, price dispersion and rating gap"""
+        with self._lock:
+            sums = dict(zip(SUMS, self._sums.T))
+            categories = self._categories.copy()
+            sellers = self._sellers.copy() if self._has_sellers else None
+        listings = sums['listings']
+        live = listings > 0
+        prices = self.prices.stats(categories)
+        with np.errstate(all='ignore'):
+            frame = pd.DataFrame({
+                'category_id': categories,
+                'listings': listings.astype(np.int64),
+                'sellers': sellers if sellers is not None else listings.astype(np.int64),
+                'avg_sales': sums['sales'] / listings,
+                'total_sales': sums['sales'],
+                'avg_price': prices['mean_price'].to_numpy(),
+                'median_price': prices['median_price'].to_numpy(),
+                'price_cv': (prices['std_price'] / prices['mean_price']).to_numpy(),
+                'avg_rating': sums['rating'] / sums['rated'],
+                'low_rated_share': sums['low_rated'] / sums['rated'],
+            })
+        return frame[live].reset_index(drop=True)
+
+    def report(self, top=10, min_listings=MIN_LISTINGS):
+        """Categories ranked by opportunity: high demand, few sellers, room on price and quality"""
+        with self._lock:
+            cached, version = self._report, self.version
+        if cached is None or cached[0] != (top, min_listings):
+            stats = self.stats()
+            stats = stats[stats['listings'] >= min_listings].reset_index(drop=True)
+            demand = _pct_rank(stats['avg_sales'])
+            competition = _pct_rank(stats['sellers'])
+            score = (demand + (1 - competition)
+                     + 0.5 * _pct_rank(stats['price_cv'].fillna(0))
+                     + 0.5 * _pct_rank(stats['low_rated_share'].fillna(0))) / 3
+            stats = stats.assign(opportunity=score.round(3), demand=_level(demand),
+                                 competition=_level(competition))
+            cached = ((top, min_listings), stats.nlargest(top, 'opportunity').reset_index(drop=True))
+            with self._lock:
+                if self.version == version:
+                    self._report = cached
+        return cached[1]
+
+
+def load_catalogue_rollup(chunk_size=IMPORT_CHUNK_SIZE):
+    """Build a rollup from the products table, streaming it in chunks"""
+    rollup = CategoryRollup()
+    for chunk in iter_products(chunk_size):
+        rollup.add(chunk)
+    return rollup
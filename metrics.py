@@ -0,0 +1,241 @@
+"""Lightweight latency instrumentation for the hot paths of both Streamlit apps
+
+Spans (the `span` context manager and the `instrument` decorator) feed
+Prometheus-style histograms, labelled by span name. A `Rerun` collects the
+spans of one Streamlit script run and records the page's render time, and
+can capture a cProfile (or pyinstrument, when installed) profile of it.
+`serve()` exports everything in the Prometheus text format on /metrics.
+"""
+import bisect
+import contextvars
+import functools
+import io
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.getenv("DARAZ_METRICS", "1") != "0"
+METRICS_HOST = os.getenv("DARAZ_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("DARAZ_METRICS_PORT", "9464"))   # 0 disables the endpoint
+PROFILE_RERUNS = os.getenv("DARAZ_PROFILE", "0") == "1"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_perf_counter = time.perf_counter
+_current_rerun = contextvars.ContextVar("daraz_rerun", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, safe to observe from many threads"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)   # last bucket is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+        """(cumulative counts per bound incl. +Inf, sum, count)"""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+class Registry:
+    """Histogram families keyed by metric name, each with one histogram per label value"""
+
+    def __init__(self):
+        self._families = {}   # name -> (help, label, {label value: Histogram})
+        self._lock = threading.Lock()
+
+    def histogram(self, name, label, value, help=""):
+        family = self._families.get(name)
+        if family is None or value not in family[2]:
+            with self._lock:
+                family = self._families.setdefault(name, (help, label, {}))
+                family[2].setdefault(value, Histogram())
+        return family[2][value]
+
+    def render(self):
+        """All families in the Prometheus text exposition format (version 0.0.4)"""
+        out = io.StringIO()
+        with self._lock:
+            families = [(name, help, label, dict(histograms))
+                        for name, (help, label, histograms) in sorted(self._families.items())]
+        for name, help, label, histograms in families:
+            if help:
+                out.write(f"# HELP {name} {help}\n")
+            out.write(f"# TYPE {name} histogram\n")
+            for value, histogram in sorted(histograms.items()):
+                cumulative, total, count = histogram.snapshot()
+                escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                for bound, running in zip((*histogram.bounds, "+Inf"), cumulative):
+                    out.write(f'{name}_bucket{{{label}="{escaped}",le="{bound}"}} {running}\n')
+                out.write(f'{name}_sum{{{label}="{escaped}"}} {total!r}\n')
+                out.write(f'{name}_count{{{label}="{escaped}"}} {count}\n')
+        return out.getvalue()
+
+
+REGISTRY = Registry()
+SPAN_METRIC = "daraz_span_seconds"
+PAGE_METRIC = "daraz_page_render_seconds"
+
+
+def _span_histogram(name):
+    return REGISTRY.histogram(SPAN_METRIC, "span", name, "Time spent in instrumented functions")
+
+
+def _record(histogram, name, elapsed):
+    histogram.observe(elapsed)
+    rerun = _current_rerun.get()
+    if rerun is not None:
+        rerun.add(name, elapsed)
+
+
+class span:
+    """Time a block: `with span("search_products"): ...`"""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = _perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if METRICS_ENABLED:
+            _record(_span_histogram(self.name), self.name, _perf_counter() - self.start)
+        return False
+
+
+def instrument(name=None):
+    """Decorator recording every call of a function as a span (named after it by default)"""
+    def decorate(fn):
+        label = name or fn.__qualname__
+        histogram = _span_histogram(label)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(*args, **kwargs)
+            start = _perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(histogram, label, _perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class Rerun:
+    """One Streamlit script run: page render time plus the spans it triggered
+
+    Use as `with Rerun("Dashboard") as rerun:` around the page; afterwards
+    rerun.elapsed and rerun.spans ({name: [calls, seconds]}) describe it and,
+    with profile=True, rerun.profile holds the captured profile as text.
+    """
+
+    def __init__(self, page, profile=PROFILE_RERUNS):
+        self.page = page
+        self.spans = {}
+        self.elapsed = None
+        self.profile = None
+        self._profiler = self._new_profiler() if profile else None
+
+    @staticmethod
+    def _new_profiler():
+        try:
+            from pyinstrument import Profiler
+            return Profiler()
+        except ImportError:
+            import cProfile
+            return cProfile.Profile()
+
+    def add(self, name, elapsed):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def start(self):
+        self._token = _current_rerun.set(self)
+        if self._profiler is not None:
+            (self._profiler.start if hasattr(self._profiler, 'output_text') else self._profiler.enable)()
+        self._start = _perf_counter()
+        return self
+
+    def finish(self):
+        """Stop timing; a script that ends without a with-block calls this at the bottom"""
+        self.elapsed = _perf_counter() - self._start
+        _current_rerun.reset(self._token)
+        if self._profiler is not None:
+            self.profile = self._stop_profiler()
+        if METRICS_ENABLED:
+            REGISTRY.histogram(PAGE_METRIC, "page", self.page,
+                               "Streamlit script run time per page").observe(self.elapsed)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.finish()
+        return False
+
+    def _stop_profiler(self, limit=25):
+        if hasattr(self._profiler, 'output_text'):   # pyinstrument
+            self._profiler.stop()
+            return self._profiler.output_text()
+        import pstats
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def summary(self, top=4):
+        """One line for the page footer: total time and the slowest spans"""
+        slowest = sorted(self.spans.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        parts = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, (_, seconds) in slowest)
+        return f"Rendered in {self.elapsed * 1000:.0f} ms" + (f" ({parts})" if parts else "")
+
+
+def serve(port=METRICS_PORT, host=METRICS_HOST, registry=REGISTRY):
+    """Serve /metrics from a daemon thread; returns the server, or None if disabled or the port is taken"""
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError:
+        return None   # another app process already exports on this port
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,154 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = os.getenv("DARAZ_MODEL_DIR", "models")
+PRICE_FEATURES = ['rating', 'sales', 'category_id']
+PRICE_TARGET = 'price'
+
+
+def row_hashes(data, columns):
+    """Per-row uint64 hashes; their wrapping sum is the content checksum"""
+    return pd.util.hash_pandas_object(data[columns], index=False).to_numpy()
+
+
+def data_fingerprint(data, columns=None, hashes=None):
+    """Cheap fingerprint of a frame: row count plus a content checksum"""
+    if hashes is None:
+        hashes = row_hashes(data, columns or list(data.columns))
+    return f"{len(hashes)}-{int(hashes.sum(dtype=np.uint64)):016x}"
+
+
+class ModelRegistry:
+    """Fitted price models persisted to disk, keyed by training-data fingerprint"""
+
+    def __init__(self, root=MODEL_DIR, base_trees=50, trees_per_refit=10,
+                 max_trees=200, keep=5):
+        self.root = root
+        self.base_trees = base_trees
+        self.trees_per_refit = trees_per_refit
+        self.max_trees = max_trees
+        self.keep = keep
+        self._models = {}
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(root, "manifest.json")
+        # Only the manifest is read up front; model files load on first use
+        self._manifest = {}
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the manifest to pick up models saved by other processes"""
+        try:
+            with open(self._manifest_path) as manifest:
+                self._manifest = json.load(manifest)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, fingerprint):
+        """Return a fitted model by fingerprint, loading it from disk if needed"""
+        model = self._models.get(fingerprint)
+        if model is None and fingerprint not in self._manifest:
+            self.refresh()
+        if model is None and fingerprint in self._manifest:
+            path = os.path.join(self.root, self._manifest[fingerprint]['file'])
+            try:
+                import joblib
+                model = self._models[fingerprint] = joblib.load(path)
+            except (OSError, EOFError):
+                self._manifest.pop(fingerprint, None)
+        return model
+
+    def latest(self):
+        """Return (model, fingerprint) for the most recently saved model, or (None, None)"""
+        if not self._manifest:
+            return None, None
+        fingerprint = max(self._manifest, key=lambda fp: self._manifest[fp]['saved_at'])
+        return self.get(fingerprint), fingerprint
+
+    def lookup_price_model(self, data):
+        """Return (model, fingerprint) if this data was already fitted, else (None, fingerprint)"""
+        fingerprint = data_fingerprint(data, PRICE_FEATURES + [PRICE_TARGET])
+        return self.get(fingerprint), fingerprint
+
+    def fit_price_model(self, data):
+        """Return (model, fingerprint), reusing or warm-starting earlier fits where possible"""
+        hashes = row_hashes(data, PRICE_FEATURES + [PRICE_TARGET])
+        fingerprint = data_fingerprint(data, hashes=hashes)
+        with self._lock:
+            model = self.get(fingerprint)
+            if model is not None:
+                return model, fingerprint
+            X = data[PRICE_FEATURES]
+            y = data[PRICE_TARGET]
+            base = self._prefix_model(hashes)
+            if base is not None and base.n_estimators + self.trees_per_refit <= self.max_trees:
+                # Only rows were appended: grow the forest instead of refitting it
+                base.set_params(warm_start=True,
+                                n_estimators=base.n_estimators + self.trees_per_refit)
+                model = base.fit(X, y)
+            else:
+                from sklearn.ensemble import RandomForestRegressor
+                model = RandomForestRegressor(n_estimators=self.base_trees, n_jobs=-1)
+                model.fit(X, y)
+            self._save(fingerprint, model, len(data))
+        return model, fingerprint
+
+    def _prefix_model(self, hashes):
+        """Find the largest saved model trained on a prefix of these rows; returns a copy"""
+        if not len(hashes):
+            return None
+        prefix_sums = np.cumsum(hashes, dtype=np.uint64)
+        candidates = sorted((entry['rows'], fp) for fp, entry in self._manifest.items()
+                            if 0 < entry['rows'] < len(hashes))
+        for rows, fingerprint in reversed(candidates):
+            if fingerprint == f"{rows}-{int(prefix_sums[rows - 1]):016x}":
+                # Load a fresh copy: warm start mutates the estimator it is given
+                try:
+                    import joblib
+                    return joblib.load(os.path.join(self.root, self._manifest[fingerprint]['file']))
+                except (OSError, EOFError):
+                    continue
+        return None
+
+    def _save(self, fingerprint, model, rows):
+        import joblib
+        os.makedirs(self.root, exist_ok=True)
+        filename = f"price-{fingerprint}.joblib"
+        self._write_atomic(filename, lambda path: joblib.dump(model, path))
+        self._models[fingerprint] = model
+        # Other processes save models too: merge with the manifest on disk under its lock,
+        # so their entries survive and pruning sees everyone's models
+        with open(self._manifest_path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.refresh()
+            self._manifest[fingerprint] = {'file': filename, 'rows': rows, 'saved_at': time.time()}
+            for old in sorted(self._manifest, key=lambda fp: self._manifest[fp]['saved_at'])[:-self.keep]:
+                entry = self._manifest.pop(old)
+                self._models.pop(old, None)
+                try:
+                    os.remove(os.path.join(self.root, entry['file']))
+                except OSError:
+                    pass
+            manifest = dict(self._manifest)
+            self._write_atomic("manifest.json", lambda path: _dump_json(manifest, path))
+
+    def _write_atomic(self, filename, write):
+        """Write a file under root via a uniquely named temp file, then move it into place"""
+        handle, tmp_path = tempfile.mkstemp(prefix=f".{filename}.", suffix=".tmp", dir=self.root)
+        os.close(handle)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, os.path.join(self.root, filename))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def _dump_json(data, path):
+    with open(path, "w") as out:
+        json.dump(data, out, indent=2)
@@ -1,60 +1,113 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import time
-from datetime import datetime
+from metrics import PROFILE_RERUNS, Rerun, instrument, serve, span
+from price_stats import CategoryPriceIndex
 
-# Performance tracking
-start_time = datetime.now()
+from shared_catalogue import CatalogueDelta, SharedCatalogue
+
+MOCK_PRODUCTS = {
+    'product_id': [1001, 1002, 1003, 1004, 1005],
+    'name': ['Wireless Headphones', 'Bluetooth Speaker', 'Phone Charger', 'Yoga Mat', 'Water Bottle'],
+    'price': [25.99, 18.50, 8.99, 15.75, 12.49],
+    'rating': [4.5, 4.2, 4.0, 4.7, 4.3],
+    'sales': [1500, 980, 3200, 2100, 4500],
+    'category_id': [301, 302, 303, 304, 305]
+}
 
 # Initialize session state
 def init_session_state():
-    if 'resources_initialized' not in st.session_state:
-        st.session_state.resources_initialized = False
     if 'user_authenticated' not in st.session_state:
         st.session_state.user_authenticated = False
     if 'current_page' not in st.session_state:
         st.session_state.current_page = "Dashboard"
+    if 'catalogue_delta' not in st.session_state:
+        # The only per-session catalogue state: this seller's edits
+        st.session_state.catalogue_delta = CatalogueDelta()
 
-# Initialize resources only when needed
-def init_resources():
-    if not st.session_state.resources_initialized:
-        # Simulate resource initialization
-        time.sleep(0.5)
-        
-        # Create mock data
-        st.session_state.df = pd.DataFrame({
-            'product_id': [1001, 1002, 1003, 1004, 1005],
-            'name': ['Wireless Headphones', 'Bluetooth Speaker', 'Phone Charger', 'Yoga Mat', 'Water Bottle'],
-            'price': [25.99, 18.50, 8.99, 15.75, 12.49],
-            'rating': [4.5, 4.2, 4.0, 4.7, 4.3],
-            'sales': [1500, 980, 3200, 2100, 4500],
-            'category_id': [301, 302, 303, 304, 305]
-        })
-        
-        # Simple AI model
-        class SimpleAI:
-            def predict_price(self, product_data):
-                # Simple price prediction: average of similar products
-                similar = st.session_state.df[
-                    (st.session_state.df['category_id'] == product_data['category_id']) &
-                    (st.session_state.df['product_id'] != product_data['product_id'])
-                ]
-                if not similar.empty:
-                    return similar['price'].mean() * 0.95
-                return product_data['price'] * 1.1
-            
-            def generate_ad_copy(self, product_name, keywords):
-                # Simple ad generation without heavy AI
-                templates = [
-                    f"🔥 HOT DEAL! {product_name} - Best {keywords} on Daraz!",
-                    f"Amazing {product_name} - Perfect for {keywords}. Buy now!",
-                    f"Special offer: {product_name} - Top quality {keywords}!"
-                ]
-                return np.random.choice(templates)
-        
-        st.session_state.ai = SimpleAI()
-        st.session_state.resources_initialized = True
+# Simple AI model, reading a per-category price index of the shared catalogue
+class SimpleAI:
+    def __init__(self):
+        self.prices = CategoryPriceIndex()
+        self._listed = pd.DataFrame(columns=['category_id', 'price'])   # rows as indexed, by product_id
+    
+    def fold_catalogue(self, old, new):
+        # Catalogue listener: the index follows each newly published version
+        if old is not None:
+            self.prices.remove(old.frame)
+        self.prices.add(new.frame)
+        self._listed = new.frame.set_index('product_id')[['category_id', 'price']]
+    
+    def similar(self, product_data):
+        # Price stats of the other catalogue listings in the product's category; the product's
+        # own row is found by id, so only it is left out
+        listed = self._listed
+        if product_data['product_id'] in listed.index:
+            row = listed.loc[product_data['product_id']]
+            return self.prices.summary(row['category_id'], exclude=row['price'])
+        return self.prices.summary(product_data['category_id'])
+    
+    @instrument("predict_price")
+    def predict_price(self, product_data):
+        # Simple price prediction: average of similar products
+        similar = self.similar(product_data)
+        if similar['count']:
+            return similar['mean'] * 0.95
+        return product_data['price'] * 1.1
+    
+    def generate_ad_copy(self, product_name, keywords):
+        # Simple ad generation without heavy AI
+        templates = [
+            f"🔥 HOT DEAL! {product_name} - Best {keywords} on Daraz!",
+            f"Amazing {product_name} - Perfect for {keywords}. Buy now!",
+            f"Special offer: {product_name} - Top quality {keywords}!"
+        ]
+        return np.random.choice(templates)
+
+# The catalogue is published once into shared memory; sessions get zero-copy views of
+# its newest version (seeded with the mock products if nothing was published yet)
+@st.cache_resource
+def get_catalogue():
+    catalogue = SharedCatalogue()
+    if catalogue.version() is None:
+        catalogue.publish(pd.DataFrame(MOCK_PRODUCTS))
+    return catalogue
+
+# One API client (product cache, search index) per server process
+@st.cache_resource
+def get_api():
+    from daraz_api import DarazAPI
+    return DarazAPI()
+
+# Market rollups are shared by every session and seeded once from a mock catalogue sample
+@st.cache_resource
+def get_market_rollup():
+    from market_gaps import CategoryRollup
+    rollup = CategoryRollup()
+    for page in get_api().iter_search_pages("", page_size=1000, max_pages=10):
+        rollup.add(page)
+    
+    # The shared catalogue is part of the market; each newly published version replaces the last
+    def fold_catalogue(old, new):
+        if old is not None:
+            rollup.remove(old.frame)
+        rollup.add(new.frame)
+    get_catalogue().add_listener(fold_catalogue)
+    get_catalogue().view()
+    return rollup
+
+# Price recommendations compare against the catalogue only, not the sampled market
+@st.cache_resource
+def get_ai():
+    ai = SimpleAI()
+    get_catalogue().add_listener(ai.fold_catalogue)
+    get_catalogue().view()
+    return ai
+
+# One /metrics endpoint per server process, not per session
+@st.cache_resource
+def start_metrics_endpoint():
+    return serve()
 
 # Simplified authentication
 def authenticate():
@@ -78,14 +131,27 @@ def show_dashboard():
     
     st.header("📊 Product Performance Dashboard")
     
+    df = get_catalogue().view().frame
+    delta = st.session_state.catalogue_delta
+    
     # Product selector
     if not st.session_state.dashboard_loaded:
-        selected_product = st.selectbox("Select Product", st.session_state.df['name'])
+        selected_product = st.selectbox("Select Product", df['name'])
         st.session_state.selected_product = selected_product
     else:
         selected_product = st.session_state.selected_product
     
-    product_data = st.session_state.df[st.session_state.df['name'] == selected_product].iloc[0]
+    listing = df[df['name'] == selected_product].iloc[0]
+    
+    # Price edits stay in this session, as a delta over the shared row
+    your_price = st.number_input("Your Price ($)", min_value=0.0, step=0.5,
+                                 value=float(delta.apply(listing)['price']),
+                                 key=f"price_{listing['product_id']}")
+    if your_price != listing['price']:
+        delta.set(listing['product_id'], price=your_price)
+    else:
+        delta.discard(listing['product_id'])
+    product_data = delta.apply(listing)
     
     # Metrics
     col1, col2, col3 = st.columns(3)
@@ -95,8 +161,13 @@ def show_dashboard():
     
     # Price prediction
     if st.button("Get Price Recommendation", key="price_rec"):
-        predicted_price = st.session_state.ai.predict_price(product_data)
+        ai = get_ai()
+        predicted_price = ai.predict_price(listing)
         st.subheader(f"💡 AI Price Recommendation: ${predicted_price:.2f}")
+        similar = ai.similar(listing)
+        if similar['count']:
+            st.caption(f"From {similar['count']:,} similar listings: mean ${similar['mean']:.2f}, "
+                       f"median ${similar['median']:.2f}")
     
     # Sales trend - load only when requested
     if st.checkbox("Show Sales Trend", key="show_trend"):
@@ -116,26 +187,18 @@ def show_research():
     keyword = st.text_input("Search Products", key="search_input")
     
     if keyword:
-        # Simulate fast search
-        time.sleep(0.2)
-        
-        # Generate mock results
-        num_results = 10
-        products = []
-        for i in range(num_results):
-            products.append({
-                'product_id': 1000 + i,
-                'name': f"{keyword} Product {i+1}",
-                'price': round(np.random.uniform(5.0, 100.0), 2),
-                'rating': round(np.random.uniform(3.5, 5.0), 1),
-                'sales': np.random.randint(100, 5000),
-                'category_id': np.random.randint(100, 500)
-            })
-            
-        results = pd.DataFrame(products)
+        # Search results carry per-query product ids, so each keyword adds its own listings to
+        # the shared rollup and none collide with the catalogue's
+        with span("search_products"):
+            results = get_api().search_products(keyword, page_size=10)
         
         st.dataframe(results.head(5), height=200)
         
+        searched = st.session_state.setdefault('gap_keywords', set())
+        if keyword not in searched:
+            searched.add(keyword)
+            get_market_rollup().add(results)
+        
         # Show top products
         st.subheader("🏆 Top Products")
         top_products = results.nlargest(2, 'sales')
@@ -145,11 +208,11 @@ def show_research():
     # Gap analysis - load only when requested
     if st.button("Run Market Gap Analysis", key="gap_analysis"):
         st.subheader("💎 Market Opportunities")
-        opportunities = [
-            {"Category": "Wireless Earbuds", "Demand": "High", "Competition": "Low"},
-            {"Category": "Yoga Mats", "Demand": "Medium", "Competition": "Low"},
-        ]
-        st.table(pd.DataFrame(opportunities))
+        opportunities = get_market_rollup().report(top=5)
+        st.table(opportunities[['category_id', 'demand', 'competition', 'avg_price', 'median_price',
+                                'opportunity']].rename(
+            columns={'category_id': "Category", 'demand': "Demand", 'competition': "Competition",
+                     'avg_price': "Avg Price", 'median_price': "Median Price", 'opportunity': "Score"}))
 
 # Advertising Tools - Optimized
 def show_ads():
@@ -160,7 +223,7 @@ def show_ads():
     
     if st.button("Generate Ad Copy", key="generate_ad"):
         if product_name and keywords:
-            ad_copy = st.session_state.ai.generate_ad_copy(product_name, keywords)
+            ad_copy = get_ai().generate_ad_copy(product_name, keywords)
             st.subheader("✨ Generated Ad Copy")
             st.success(ad_copy)
         else:
@@ -191,28 +254,38 @@ def main():
     )
     
     init_session_state()
-    authenticate()
-    init_resources()
-    
-    # Sidebar Navigation
-    st.sidebar.title("Navigation")
-    pages = {
-        "Dashboard": show_dashboard,
-        "Product Research": show_research,
-        "Advertising Tools": show_ads
-    }
-    
-    for page_name in pages:
-        if st.sidebar.button(page_name, key=f"btn_{page_name}"):
-            st.session_state.current_page = page_name
-    
-    st.sidebar.markdown("---")
-    st.sidebar.info(f"⚡ Performance optimized")
-    st.sidebar.caption(f"Loaded in {(datetime.now() - start_time).total_seconds():.2f}s")
+    start_metrics_endpoint()
+    with Rerun(st.session_state.current_page, profile=st.session_state.get("profile_reruns", PROFILE_RERUNS)) as rerun:
+        authenticate()
+        with span("init_resources"):
+            get_catalogue().view()
+        
+        # Sidebar Navigation
+        st.sidebar.title("Navigation")
+        pages = {
+            "Dashboard": show_dashboard,
+            "Product Research": show_research,
+            "Advertising Tools": show_ads
+        }
+        
+        for page_name in pages:
+            if st.sidebar.button(page_name, key=f"btn_{page_name}"):
+                st.session_state.current_page = page_name
+        
+        st.sidebar.markdown("---")
+        st.sidebar.info(f"⚡ Performance optimized")
+        st.sidebar.checkbox("Profile reruns", key="profile_reruns", value=PROFILE_RERUNS)
+        
+        # Show current page
+        rerun.page = st.session_state.current_page
+        st.title(f"🚀 Daraz Seller Pro - {st.session_state.current_page}")
+        pages[st.session_state.current_page]()
     
-    # Show current page
-    st.title(f"🚀 Daraz Seller Pro - {st.session_state.current_page}")
-    pages[st.session_state.current_page]()
+    # Per-rerun timing breakdown (also exported as histograms on /metrics)
+    st.sidebar.caption(rerun.summary())
+    if rerun.profile:
+        with st.sidebar.expander("Profile of this run"):
+            st.code(rerun.profile)
     
     # Add minimal footer
     st.markdown("---")
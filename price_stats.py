@@ -0,0 +1,192 @@
+"""Per-category price statistics maintained incrementally for the pricing views
+
+CategoryPriceIndex keeps, per category_id, the listing count, price sum and
+sum of squares plus a log-bucketed quantile sketch (relative accuracy
+SKETCH_ACCURACY, like DDSketch). Every statistic is additive, so products
+can be added, removed or repriced in batches, and "mean/median price of
+the other products in this category" is answered from one category's row
+without touching the raw products.
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+SKETCH_ACCURACY = 0.01   # quantiles are within 1% of the true price
+MIN_PRICE = 0.01         # prices are clamped to [MIN_PRICE, MAX_PRICE] for bucketing only
+MAX_PRICE = 1e7
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_LOG_GAMMA = np.log(_GAMMA)
+BUCKETS = int(np.ceil(np.log(MAX_PRICE / MIN_PRICE) / _LOG_GAMMA)) + 1
+
+
+def _buckets(prices):
+    """Bucket i holds prices in (MIN_PRICE * gamma**(i-1), MIN_PRICE * gamma**i]"""
+    index = np.ceil(np.log(np.maximum(prices, MIN_PRICE) / MIN_PRICE) / _LOG_GAMMA)
+    return np.clip(index, 0, BUCKETS - 1).astype(np.intp)
+
+
+def _bucket_values(index):
+    """The price each bucket stands for: within SKETCH_ACCURACY of anything in it"""
+    return MIN_PRICE * 2 * _GAMMA ** np.asarray(index, float) / (_GAMMA + 1)
+
+
+def _quantiles(sketch, counts, q, first=0):
+    """q-quantile per sketch row, whose columns start at bucket `first` (no listings give NaN)"""
+    cumulative = np.cumsum(sketch, axis=-1, dtype=np.int32)
+    rank = np.floor(q * (np.asarray(counts) - 1))
+    index = (cumulative <= rank[..., None]).sum(axis=-1)
+    return np.where(np.asarray(counts) > 0, _bucket_values(np.minimum(first + index, BUCKETS - 1)), np.nan)
+
+
+def _excluded_column(sketch, exclude, first):
+    """Sketch column of the listing priced `exclude`, or None when no listing in the row can have that price"""
+    if exclude is None or np.isnan(exclude):
+        return None
+    column = int(_buckets(np.array([exclude]))[0]) - first
+    return column if 0 <= column < len(sketch) and sketch[column] > 0 else None
+
+
+class CategoryPriceIndex:
+    """Incrementally maintained per-category price aggregates and quantile sketches"""
+
+    def __init__(self, capacity=64):
+        self._lock = threading.Lock()
+        self._rows = {}                                 # category_id -> row in the arrays below
+        self._categories = np.zeros(capacity, np.int64)
+        self._counts = np.zeros(capacity, np.int64)
+        self._sums = np.zeros((capacity, 2))            # price, price squared
+        self._sketch = np.zeros((capacity, BUCKETS), np.int32)
+        self._used = (BUCKETS, 0)   # [first, last) bucket ever filled; queries only scan this span
+        self.version = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _category_rows(self, categories):
+        unique, inverse = np.unique(categories, return_inverse=True)
+        new = [category for category in unique.tolist() if category not in self._rows]
+        if new:
+            start = len(self._rows)
+            if start + len(new) > len(self._counts):
+                # Grow by doubling so categories arriving one at a time don't copy the sketch each time
+                capacity = max(2 * len(self._counts), start + len(new))
+                grow = capacity - len(self._counts)
+                self._categories = np.concatenate([self._categories, np.zeros(grow, np.int64)])
+                self._counts = np.concatenate([self._counts, np.zeros(grow, np.int64)])
+                self._sums = np.concatenate([self._sums, np.zeros((grow, 2))])
+                self._sketch = np.concatenate([self._sketch, np.zeros((grow, BUCKETS), np.int32)])
+            self._rows.update((category, start + i) for i, category in enumerate(new))
+            self._categories[start:start + len(new)] = new
+        rows = np.array([self._rows[category] for category in unique.tolist()], np.int64)
+        return rows[inverse]
+
+    def add_prices(self, categories, prices, sign=1):
+        """Fold in (sign=-1: take out) one price per listing; NaN prices are skipped"""
+        prices = np.asarray(prices, float)
+        known = ~np.isnan(prices)
+        categories, prices = np.asarray(categories, np.int64)[known], prices[known]
+        if not len(prices):
+            return
+        buckets = _buckets(prices)
+        with self._lock:
+            rows = self._category_rows(categories)
+            self._used = (min(self._used[0], int(buckets.min())), max(self._used[1], int(buckets.max()) + 1))
+            if len(rows) > len(self._rows) * 16:
+                size = len(self._rows)
+                self._counts[:size] += sign * np.bincount(rows, minlength=size)
+                self._sums[:size, 0] += sign * np.bincount(rows, weights=prices, minlength=size)
+                self._sums[:size, 1] += sign * np.bincount(rows, weights=prices * prices, minlength=size)
+                cells = np.bincount(rows * BUCKETS + buckets, minlength=size * BUCKETS)
+                self._sketch[:size] += (sign * cells).reshape(size, BUCKETS).astype(np.int32)
+            else:
+                np.add.at(self._counts, rows, sign)
+                np.add.at(self._sums, (rows, 0), sign * prices)
+                np.add.at(self._sums, (rows, 1), sign * prices * prices)
+                np.add.at(self._sketch, (rows, buckets), sign)
+            self.version += 1
+
+    def add(self, products, sign=1):
+        """Fold in a batch of product rows (category_id, price)"""
+        products = products.dropna(subset=['category_id'])
+        self.add_prices(products['category_id'].to_numpy(np.int64),
+                        products['price'].to_numpy(float, na_value=np.nan), sign)
+
+    def remove(self, products):
+        """Undo add() for rows that were delisted"""
+        self.add(products, sign=-1)
+
+    def update(self, old, new):
+        """Reprice: take the old rows out and fold their new versions in"""
+        self.remove(old)
+        self.add(new)
+
+    def summary(self, category_id, exclude=None):
+        """count, mean, std and median price of a category, leaving out one listing priced `exclude`
+
+        exclude is ignored when the category has no listing at that price.
+        """
+        with self._lock:
+            row = self._rows.get(int(category_id))
+            if row is None:
+                return {'count': 0, 'mean': None, 'std': None, 'median': None}
+            count = int(self._counts[row])
+            total, total_sq = self._sums[row]
+            first, last = self._used
+            sketch = self._sketch[row, first:last].copy()
+        column = _excluded_column(sketch, exclude, first)
+        if column is not None:
+            count -= 1
+            total, total_sq = total - exclude, total_sq - exclude * exclude
+            sketch[column] -= 1
+        if count <= 0:
+            return {'count': 0, 'mean': None, 'std': None, 'median': None}
+        mean = float(total / count)
+        return {'count': count, 'mean': mean, 'std': float(np.sqrt(max(total_sq / count - mean * mean, 0.0))),
+                'median': float(_quantiles(sketch, count, 0.5, first))}
+
+    def mean(self, category_id, exclude=None):
+        return self.summary(category_id, exclude)['mean']
+
+    def median(self, category_id, exclude=None):
+        return self.summary(category_id, exclude)['median']
+
+    def quantile(self, category_id, q, exclude=None):
+        """Any quantile of a category's prices (None for an empty category)"""
+        with self._lock:
+            row = self._rows.get(int(category_id))
+            first, last = self._used
+            sketch = None if row is None else self._sketch[row, first:last].copy()
+        if sketch is None:
+            return None
+        column = _excluded_column(sketch, exclude, first)
+        if column is not None:
+            sketch[column] -= 1
+        count = int(sketch.sum())
+        return float(_quantiles(sketch, count, q, first)) if count > 0 else None
+
+    def stats(self, categories=None):
+        """One row per category (or per requested category_id, in order): listings and price stats"""
+        with self._lock:
+            if categories is None:
+                rows = np.arange(len(self._rows))
+            else:
+                rows = np.array([self._rows.get(int(category), -1) for category in categories], np.int64)
+            known = rows >= 0
+            picked = rows[known]
+            counts = np.zeros(len(rows), np.int64)
+            sums = np.zeros((len(rows), 2))
+            first, last = self._used
+            sketch = np.zeros((len(rows), max(last - first, 0)), np.int32)
+            counts[known], sums[known] = self._counts[picked], self._sums[picked]
+            sketch[known] = self._sketch[picked, first:last]
+            category_ids = self._categories[rows] if categories is None else np.asarray(categories, np.int64)
+        with np.errstate(all='ignore'):
+            mean = sums[:, 0] / counts
+            std = np.sqrt(np.maximum(sums[:, 1] / counts - mean ** 2, 0.0))
+        return pd.DataFrame({
+            'category_id': category_ids,
+            'listings': counts,
+            'mean_price': mean,
+            'std_price': std,
+            'median_price': _quantiles(sketch, counts, 0.5, first),
+        })
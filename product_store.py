@@ -0,0 +1,230 @@
+import threading
+import time
+import numpy as np
+
+# Fixed-width columns; no Python object is kept per cached product
+COLUMNS = {
+    'product_id': np.int64,
+    'price': np.float64,
+    'rating': np.float64,
+    'sales': np.int32,
+    'seller_id': np.int32,
+    'category_id': np.int32,
+}
+NAME_WIDTH = 32  # UTF-8 bytes stored inline; longer names go to a small overflow dict
+_EMPTY = -1
+_DELETED = -2
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class _IdIndex:
+    """Open-addressing int64 -> slot hash table backed by two NumPy arrays"""
+
+    def __init__(self, capacity):
+        self._resize(max(1024, capacity))
+
+    def _resize(self, capacity):
+        bits = max(10, int(2 * capacity - 1).bit_length())
+        self._shift = 64 - bits
+        self._mask = (1 << bits) - 1
+        self._keys = np.zeros(1 << bits, np.int64)
+        self._slots = np.full(1 << bits, _EMPTY, np.int32)
+        self._used = 0
+        self._deleted = 0
+
+    def _home(self, key):
+        return ((key * _HASH_MULTIPLIER) & _MASK64) >> self._shift
+
+    def _find(self, key):
+        """Return (position, found); position is the insert point when not found"""
+        position = self._home(key)
+        insert_at = None
+        while True:
+            slot = self._slots[position]
+            if slot == _EMPTY:
+                return (position if insert_at is None else insert_at), False
+            if slot == _DELETED:
+                if insert_at is None:
+                    insert_at = position
+            elif self._keys[position] == key:
+                return position, True
+            position = (position + 1) & self._mask
+
+    def get(self, key):
+        position, found = self._find(key)
+        return int(self._slots[position]) if found else None
+
+    def set(self, key, slot):
+        if (self._used + self._deleted + 1) * 10 > len(self._slots) * 7:
+            self.rehash(max(self._used + 1, len(self._slots) // 2))
+        position, found = self._find(key)
+        if not found:
+            if self._slots[position] == _DELETED:
+                self._deleted -= 1
+            self._used += 1
+        self._keys[position] = key
+        self._slots[position] = slot
+
+    def delete(self, key):
+        position, found = self._find(key)
+        if found:
+            self._slots[position] = _DELETED
+            self._used -= 1
+            self._deleted += 1
+
+    def rehash(self, capacity):
+        """Rebuild the table for capacity entries, inserting live keys in vectorized rounds"""
+        live = self._slots >= 0
+        keys, slots = self._keys[live], self._slots[live]
+        self._resize(capacity)
+        positions = ((keys.astype(np.uint64) * np.uint64(_HASH_MULTIPLIER))
+                     >> np.uint64(self._shift)).astype(np.int64)
+        pending = np.arange(len(keys))
+        while len(pending):
+            candidates = positions[pending]
+            free = self._slots[candidates] == _EMPTY
+            # Among keys probing the same free position, the first one claims it
+            _, first = np.unique(candidates, return_index=True)
+            claim = np.zeros(len(pending), bool)
+            claim[first] = True
+            claim &= free
+            placed = pending[claim]
+            self._keys[positions[placed]] = keys[placed]
+            self._slots[positions[placed]] = slots[placed]
+            pending = pending[~claim]
+            positions[pending] = (positions[pending] + 1) & self._mask
+        self._used = len(keys)
+
+
+class ProductStore:
+    """Bounded columnar product cache with LRU and optional TTL eviction, safe to share between threads"""
+
+    def __init__(self, max_entries=100_000, max_bytes=None, ttl=None, evict_fraction=1 / 16):
+        if max_bytes is not None:
+            max_entries = min(max_entries, max(1, max_bytes // self.row_bytes()))
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_fraction = evict_fraction
+        self.evict_batch = max(1, int(max_entries * evict_fraction))
+        # The hash index, free list and columns change together; the lock keeps two puts
+        # from claiming one slot or writing into arrays that _grow is replacing
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.evictions = 0
+        self._index = _IdIndex(min(self.max_entries, 1024))
+        self._free = []
+        self._size = 0
+        self._high_water = 0
+        self._capacity = 0
+        self._tick = 0
+        self._created = time.time()
+        self._columns = {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+        self._keys = np.empty(0, np.int64)
+        self._names = np.empty(0, f'S{NAME_WIDTH}')
+        self._long_names = {}
+        self._last_used = np.empty(0, np.int64)
+        self._stored_at = np.empty(0, np.float32)
+
+    @staticmethod
+    def row_bytes():
+        """Bytes held per cached product, including its share of the hash index"""
+        fixed = sum(np.dtype(dtype).itemsize for dtype in COLUMNS.values())
+        # key + name + LRU tick + timestamp, plus ~2 hash buckets of key and slot
+        return fixed + 8 + NAME_WIDTH + 8 + 4 + 2 * 12
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, product_id):
+        return self.get(product_id, touch=False) is not None
+
+    @property
+    def nbytes(self):
+        return self._size * self.row_bytes()
+
+    def get(self, product_id, touch=True):
+        """Return the product as a dict, or None if absent or expired"""
+        product_id = int(product_id)
+        with self._lock:
+            slot = self._index.get(product_id)
+            if slot is None:
+                return None
+            if self.ttl is not None and time.time() - self._created - self._stored_at[slot] > self.ttl:
+                self._release(slot)
+                return None
+            if touch:
+                self._tick += 1
+                self._last_used[slot] = self._tick
+            product = {'product_id': self._columns['product_id'][slot].item(), 'name': self._name(slot)}
+            for name, column in self._columns.items():
+                product[name] = column[slot].item()
+            return product
+
+    def put(self, product_id, product):
+        """Store a product dict, evicting least recently used entries when full"""
+        product_id = int(product_id)
+        encoded = product['name'].encode()
+        with self._lock:
+            slot = self._index.get(product_id)
+            if slot is None:
+                slot = self._allocate()
+                self._index.set(product_id, slot)
+                self._keys[slot] = product_id
+                self._size += 1
+            for name, column in self._columns.items():
+                column[slot] = product[name]
+            self._names[slot] = encoded
+            if len(encoded) > NAME_WIDTH or encoded.endswith(b'\0'):
+                self._long_names[slot] = product['name']
+            else:
+                self._long_names.pop(slot, None)
+            self._tick += 1
+            self._last_used[slot] = self._tick
+            self._stored_at[slot] = time.time() - self._created
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def _name(self, slot):
+        name = self._long_names.get(slot)
+        return name if name is not None else self._names[slot].decode()
+
+    def _allocate(self):
+        if self._free:
+            return self._free.pop()
+        if self._size >= self.max_entries:
+            self._evict()
+            return self._free.pop()
+        if self._high_water >= self._capacity:
+            self._grow()
+        self._high_water += 1
+        return self._high_water - 1
+
+    def _grow(self):
+        capacity = min(self.max_entries, max(1024, self._capacity * 2))
+        for name, column in self._columns.items():
+            self._columns[name] = np.resize(column, capacity)
+        self._keys = np.resize(self._keys, capacity)
+        self._names = np.resize(self._names, capacity)
+        self._last_used = np.resize(self._last_used, capacity)
+        self._stored_at = np.resize(self._stored_at, capacity)
+        self._index.rehash(capacity)
+        self._capacity = capacity
+
+    def _evict(self):
+        """Free a batch of the oldest slots so eviction cost is amortized"""
+        count = min(self.evict_batch, self._size)
+        for slot in np.argpartition(self._last_used, count - 1)[:count].tolist():
+            self._release(slot)
+            self.evictions += 1
+
+    def _release(self, slot):
+        self._index.delete(self._keys[slot].item())
+        self._long_names.pop(slot, None)
+        self._last_used[slot] = np.iinfo(np.int64).max
+        self._free.append(slot)
+        self._size -= 1
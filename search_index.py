@@ -0,0 +1,468 @@
+"""On-disk inverted keyword index over product names and categories
+
+New products go to an in-memory buffer that is flushed into immutable
+segments (NumPy arrays, memory-mapped when the index has a path). Inside a
+segment documents are numbered by descending rank (sales x rating), so a
+posting list sorted by document number is already in rank order and a query
+can stop as soon as it has filled the requested page.
+
+An on-disk index has a single writer: the process that opens it holds an
+exclusive lock on its directory until close() or exit, and any other process
+opening the same path for writing gets IndexLockedError. Any number of
+processes can open it with read_only=True; they map the segments the writer
+publishes and pick up new ones when its manifest changes.
+"""
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+COLUMNS = {
+    'product_id': np.int64,
+    'price': np.float64,
+    'rating': np.float64,
+    'sales': np.int64,
+    'seller_id': np.int64,
+    'category_id': np.int64,
+}
+BUFFER_SIZE = 50_000
+MAX_SEGMENTS = 8
+MAX_EXPANSIONS = 50      # prefix/typo variants considered per query token
+MIN_TYPO_LENGTH = 4      # shorter tokens must match exactly or by prefix
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+def category_term(category_id):
+    # '#' never appears in a query token, so prefix expansion cannot reach these
+    return f"#{int(category_id)}"
+
+
+def _rank(sales, rating):
+    return np.asarray(sales, float) * np.nan_to_num(np.asarray(rating, float))
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class IndexLockedError(RuntimeError):
+    """The index directory is already open in another process"""
+
+
+class _Segment:
+    """Immutable postings plus the document columns needed to render results"""
+
+    def __init__(self, arrays, path=None):
+        self.path = path
+        self.terms = arrays['terms']
+        self.offsets = arrays['offsets']
+        self.postings = arrays['postings']
+        self.columns = {name: arrays[name] for name in COLUMNS}
+        self.score = arrays['score']
+        self.name_blob = arrays['name_blob']
+        self.name_offsets = arrays['name_offsets']
+        self.deleted = arrays['deleted']
+
+    def __len__(self):
+        return len(self.score)
+
+    @classmethod
+    def build(cls, frame, path=None):
+        """Index a frame of products (COLUMNS plus name); one document per row"""
+        score = _rank(frame['sales'], frame['rating'])
+        order = np.lexsort((frame['product_id'].to_numpy(), -score))
+        frame = frame.iloc[order].reset_index(drop=True)
+        arrays = {name: frame[name].to_numpy(dtype) for name, dtype in COLUMNS.items()}
+        arrays['score'] = score[order]
+        names = frame['name'].astype(str).tolist()
+        encoded = [name.encode() for name in names]
+        arrays['name_blob'] = np.frombuffer(b"".join(encoded), np.uint8)
+        arrays['name_offsets'] = np.concatenate([[0], np.cumsum([len(e) for e in encoded])]).astype(np.int64)
+        arrays['deleted'] = np.zeros(len(frame), bool)
+
+        tokens = pd.Series([tokenize(name) for name in names], dtype=object)
+        tokens = tokens + pd.Series([[category_term(c)] for c in arrays['category_id'].tolist()],
+                                    dtype=object)
+        exploded = tokens.explode().dropna()
+        docs = exploded.index.to_numpy(np.int64)
+        codes, terms = pd.factorize(exploded.to_numpy())
+        terms = np.asarray(terms, dtype=str)
+        term_order = np.argsort(terms)
+        remap = np.empty_like(term_order)
+        remap[term_order] = np.arange(len(term_order))
+        codes = remap[codes]
+        pairs = np.unique(codes.astype(np.int64) << 32 | docs)
+        arrays['terms'] = terms[term_order]
+        arrays['postings'] = (pairs & 0xFFFFFFFF).astype(np.int32)
+        counts = np.bincount(pairs >> 32, minlength=len(terms))
+        arrays['offsets'] = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(os.path.join(path, f"{name}.npy"), array)
+            return cls.open(path)
+        return cls(arrays)
+
+    @classmethod
+    def open(cls, path, read_only=False):
+        names = ('terms', 'offsets', 'postings', 'score', 'name_blob', 'name_offsets', *COLUMNS)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in names}
+        # A shared mapping: readers see the writer's tombstones as they are flushed
+        arrays['deleted'] = np.load(os.path.join(path, "deleted.npy"), mmap_mode='r' if read_only else 'r+')
+        return cls(arrays, path)
+
+    def document_frequencies(self):
+        return dict(zip(self.terms.tolist(), np.diff(self.offsets).tolist()))
+
+    def postings_for(self, term):
+        position = np.searchsorted(self.terms, term)
+        if position < len(self.terms) and self.terms[position] == term:
+            return self.postings[self.offsets[position]:self.offsets[position + 1]]
+        return None
+
+    def delete_products(self, product_ids):
+        """Tombstone documents superseded by newer copies; returns how many"""
+        hit = np.isin(self.columns['product_id'], product_ids) & ~self.deleted
+        if hit.any():
+            self.deleted[hit] = True
+            if isinstance(self.deleted, np.memmap):
+                self.deleted.flush()
+        return int(hit.sum())
+
+    def names(self, docs):
+        return [bytes(self.name_blob[self.name_offsets[d]:self.name_offsets[d + 1]]).decode()
+                for d in docs.tolist()]
+
+    def live_frame(self):
+        live = np.flatnonzero(~self.deleted)
+        frame = pd.DataFrame({name: np.asarray(column)[live] for name, column in self.columns.items()})
+        frame['name'] = self.names(live)
+        return frame
+
+    def top(self, expansions, need):
+        """First `need` live documents matching every token, in rank order
+
+        expansions holds one list of posting arrays per query token (a document
+        matches a token when it appears in any of them); None means no filter.
+        """
+        if expansions is None:
+            return np.flatnonzero(~self.deleted)[:need]
+        lists = [[p for p in (self.postings_for(term) for term in terms) if p is not None]
+                 for terms in expansions]
+        if not all(lists):
+            return np.empty(0, np.int32)
+        # Drive from the rarest token and probe the others with binary search
+        lists.sort(key=lambda postings: sum(len(p) for p in postings))
+        driver, others = lists[0], lists[1:]
+        found, total = [], 0
+        low, window = 0, max(1024, need * 4)
+        while low < len(self) and total < need:
+            high = low + window
+            candidates = [p[np.searchsorted(p, low):np.searchsorted(p, high)] for p in driver]
+            candidates = np.unique(np.concatenate(candidates)) if len(candidates) > 1 else candidates[0]
+            for postings in others:
+                match = np.zeros(len(candidates), bool)
+                for p in postings:
+                    position = np.minimum(np.searchsorted(p, candidates), len(p) - 1)
+                    match |= p[position] == candidates
+                candidates = candidates[match]
+            candidates = candidates[~self.deleted[candidates]]
+            found.append(candidates)
+            total += len(candidates)
+            low, window = high, window * 4
+        return np.concatenate(found)[:need] if found else np.empty(0, np.int32)
+
+
+class SearchIndex:
+    """Keyword search over products with prefix and typo-tolerant matching
+
+    Documents are ranked by sales x rating. The last query token also matches
+    as a prefix (search-as-you-type), and tokens missing from the vocabulary
+    match terms one deletion away.
+    """
+
+    def __init__(self, path=None, buffer_size=BUFFER_SIZE, max_segments=MAX_SEGMENTS,
+                 max_expansions=MAX_EXPANSIONS, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.buffer_size = buffer_size
+        self.max_segments = max_segments
+        self.max_expansions = max_expansions
+        self._lock = threading.RLock()
+        self._segments = []
+        self._next_segment = 0
+        self._buffer = {}            # product_id -> row dict, newest copy wins
+        self._buffer_postings = {}   # term -> product_ids in the buffer
+        self._vocabulary = {}        # term -> document frequency (approximate once deleted)
+        self._sorted_terms = None
+        self._deletes = None
+        self._writer_lock = None
+        self._manifest_mtime = None
+        if path:
+            if not read_only:
+                self._lock_path()
+            if os.path.exists(os.path.join(path, "index.json")):
+                self._open()
+
+    def _lock_path(self):
+        # Segment numbers and the manifest are only consistent with one writer per directory
+        os.makedirs(self.path, exist_ok=True)
+        handle = open(os.path.join(self.path, "index.lock"), "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            raise IndexLockedError(f"search index {self.path} is open in another process") from None
+        self._writer_lock = handle
+
+    def close(self):
+        """Release the directory lock; the index must not be written afterwards"""
+        with self._lock:
+            if self._writer_lock is not None:
+                self._writer_lock.close()
+                self._writer_lock = None
+
+    def _open(self):
+        self._manifest_mtime = os.stat(os.path.join(self.path, "index.json")).st_mtime_ns
+        with open(os.path.join(self.path, "index.json")) as manifest:
+            meta = json.load(manifest)
+        self._next_segment = meta['next_segment']
+        for name in meta['segments']:
+            segment = _Segment.open(os.path.join(self.path, name), self.read_only)
+            self._segments.append(segment)
+            self._add_terms(segment.document_frequencies())
+
+    def refresh(self):
+        """Read-only indexes: switch to the segments the writer has published since the last look"""
+        if not (self.read_only and self.path):
+            return
+        manifest_path = os.path.join(self.path, "index.json")
+        try:
+            mtime = os.stat(manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+        with self._lock:
+            with open(manifest_path) as manifest:
+                meta = json.load(manifest)
+            current = {os.path.basename(s.path): s for s in self._segments}
+            try:
+                segments = [current.get(name) or _Segment.open(os.path.join(self.path, name), True)
+                            for name in meta['segments']]
+            except FileNotFoundError:
+                return   # merged away while we read the manifest; the next search retries
+            self._segments = segments
+            self._vocabulary, self._sorted_terms, self._deletes = {}, None, None
+            for segment in segments:
+                self._add_terms(segment.document_frequencies())
+            self._manifest_mtime = mtime
+
+    def _save_manifest(self):
+        if not self.path:
+            return
+        tmp_path = os.path.join(self.path, "index.json.tmp")
+        with open(tmp_path, "w") as manifest:
+            json.dump({'next_segment': self._next_segment,
+                       'segments': [os.path.basename(s.path) for s in self._segments]}, manifest)
+        os.replace(tmp_path, os.path.join(self.path, "index.json"))
+
+    def __len__(self):
+        # Buffered replacements are counted twice until the next flush
+        with self._lock:
+            return sum(int((~s.deleted).sum()) for s in self._segments) + len(self._buffer)
+
+    def _add_terms(self, frequencies):
+        new = [term for term in frequencies if term not in self._vocabulary]
+        for term, count in frequencies.items():
+            self._vocabulary[term] = self._vocabulary.get(term, 0) + count
+        if new:
+            self._sorted_terms = None
+            if self._deletes is not None:
+                for term in new:
+                    self._index_deletes(term)
+
+    def _index_deletes(self, term):
+        if len(term) >= MIN_TYPO_LENGTH and not term.startswith('#'):
+            for variant in _deletes(term):
+                self._deletes.setdefault(variant, []).append(term)
+
+    def add(self, products):
+        """Index products (a DataFrame or one product dict); re-adding a product replaces it"""
+        if self.read_only:
+            raise ValueError(f"search index {self.path} is open read-only")
+        if isinstance(products, dict):
+            records = [{name: products[name] for name in ('name', *COLUMNS)}]
+        elif len(products) >= self.buffer_size:
+            # Bulk loads skip the buffer and become a segment of their own
+            products = products.drop_duplicates('product_id', keep='last')
+            with self._lock:
+                self.flush()
+                self._add_segment(products[['name', *COLUMNS]].reset_index(drop=True), count_terms=True)
+            return
+        else:
+            records = products[['name', *COLUMNS]].to_dict('records')
+        with self._lock:
+            frequencies = {}
+            for record in records:
+                product_id = int(record['product_id'])
+                old = self._buffer.get(product_id)
+                if old is not None:
+                    for term in self._terms(old):
+                        self._buffer_postings[term].discard(product_id)
+                self._buffer[product_id] = record
+                for term in self._terms(record):
+                    self._buffer_postings.setdefault(term, set()).add(product_id)
+                    frequencies[term] = frequencies.get(term, 0) + 1
+            self._add_terms(frequencies)
+            if len(self._buffer) >= self.buffer_size:
+                self.flush()
+
+    @staticmethod
+    def _terms(record):
+        return {*tokenize(record['name']), category_term(record['category_id'])}
+
+    def flush(self):
+        """Turn buffered products into a segment"""
+        with self._lock:
+            if not self._buffer:
+                return
+            frame = pd.DataFrame(list(self._buffer.values()))
+            self._buffer = {}
+            self._buffer_postings = {}
+            self._add_segment(frame)
+
+    def _add_segment(self, frame, count_terms=False):
+        product_ids = frame['product_id'].to_numpy(np.int64)
+        for segment in self._segments:
+            segment.delete_products(product_ids)
+        segment = self._new_segment(frame)
+        self._segments.append(segment)
+        if count_terms:
+            # Buffered products were counted as they arrived
+            self._add_terms(segment.document_frequencies())
+        if len(self._segments) > self.max_segments:
+            self._merge(self._segments[-(self.max_segments // 2 + 1):])
+        self._save_manifest()
+
+    def _new_segment(self, frame):
+        path = None
+        if self.path:
+            path = os.path.join(self.path, f"segment-{self._next_segment:06d}")
+            self._next_segment += 1
+        return _Segment.build(frame, path)
+
+    def _merge(self, segments):
+        """Rewrite several segments as one without their deleted documents"""
+        merged = self._new_segment(pd.concat([s.live_frame() for s in segments], ignore_index=True))
+        self._segments = [s for s in self._segments if s not in segments] + [merged]
+        self._save_manifest()
+        for segment in segments:
+            if segment.path:
+                shutil.rmtree(segment.path, ignore_errors=True)
+
+    def compact(self):
+        if self.read_only:
+            raise ValueError(f"search index {self.path} is open read-only")
+        with self._lock:
+            self.flush()
+            if len(self._segments) > 1 or any(s.deleted.any() for s in self._segments):
+                self._merge(list(self._segments))
+
+    def _prefix_terms(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = np.array(sorted(self._vocabulary), dtype=str)
+        terms = self._sorted_terms
+        start = np.searchsorted(terms, prefix)
+        stop = np.searchsorted(terms, prefix + "\U0010ffff")
+        return terms[start:stop].tolist()
+
+    def _typo_terms(self, token):
+        if len(token) < MIN_TYPO_LENGTH:
+            return []
+        if self._deletes is None:
+            self._deletes = {}
+            for term in self._vocabulary:
+                self._index_deletes(term)
+        variants = _deletes(token)
+        found = set(self._deletes.get(token, ()))
+        for variant in variants:
+            found.update(self._deletes.get(variant, ()))
+            if variant in self._vocabulary:
+                found.add(variant)
+        return list(found)
+
+    def expand(self, token, prefix=False):
+        """Vocabulary terms a query token matches, most frequent first"""
+        terms = {token} if token in self._vocabulary else set()
+        if prefix:
+            terms.update(self._prefix_terms(token))
+        if not terms:
+            terms.update(self._typo_terms(token))
+        return sorted(terms, key=lambda term: (term != token, -self._vocabulary[term]))[:self.max_expansions]
+
+    def search(self, query, category_id=None, page=1, page_size=10):
+        """One page of matching products as a dict of columns (name plus COLUMNS)"""
+        tokens = tokenize(query)
+        self.refresh()
+        with self._lock:
+            expansions = [self.expand(token, prefix=(i == len(tokens) - 1))
+                          for i, token in enumerate(tokens)]
+            if category_id is not None:
+                expansions.append([category_term(category_id)])
+            if not all(expansions):
+                return self._columns([])
+            need = page * page_size
+            rows = []
+            for segment in self._segments:
+                rows.extend(self._segment_hits(segment, expansions or None, need))
+            rows.extend(self._buffer_hits(expansions))
+            rows.sort(key=lambda row: (-row[0], row[1]))
+            return self._columns([row[2] for row in rows[need - page_size:need]])
+
+    def _segment_hits(self, segment, expansions, need):
+        """(score, product_id, hit) for a segment's top matches not shadowed by the buffer"""
+        fetch = need
+        while True:
+            docs = segment.top(expansions, fetch)
+            product_ids = segment.columns['product_id'][docs]
+            keep = np.array([pid not in self._buffer for pid in product_ids.tolist()], bool)
+            # Newer buffered copies hide some hits; fetch deeper until the page is full
+            if keep.sum() >= need or len(docs) < fetch:
+                break
+            fetch *= 2
+        docs = docs[keep] if len(docs) else docs
+        return zip(segment.score[docs].tolist(), product_ids[keep].tolist() if len(docs) else [],
+                   [(segment, doc) for doc in docs.tolist()])
+
+    def _buffer_hits(self, expansions):
+        matched = None
+        for terms in expansions:
+            ids = set().union(*(self._buffer_postings.get(term, ()) for term in terms))
+            matched = ids if matched is None else matched & ids
+        if matched is None:
+            matched = self._buffer.keys()
+        records = [self._buffer[product_id] for product_id in matched]
+        return [(float(_rank(record['sales'], record['rating'])), int(record['product_id']), record)
+                for record in records]
+
+    def _columns(self, hits):
+        columns = {name: [] for name in ('name', *COLUMNS)}
+        for hit in hits:
+            if isinstance(hit, dict):
+                for name in columns:
+                    columns[name].append(hit[name])
+            else:
+                segment, doc = hit
+                columns['name'].extend(segment.names(np.array([doc])))
+                for name in COLUMNS:
+                    columns[name].append(segment.columns[name][doc])
+        return columns
@@ -0,0 +1,185 @@
+"""Versioned catalogue frames shared by every Streamlit session (and process) on a host
+
+Run with:  python shared_catalogue.py catalogue.parquet    # publish a new version
+
+publish() writes a frame once as an Arrow IPC file under CATALOGUE_PATH
+(/dev/shm when it exists, so the file lives in shared memory; one directory
+per deployment) and moves the version pointer to it, holding a file lock so
+concurrent publishers get distinct versions. view() memory-maps the current version and wraps it in
+an Arrow-backed DataFrame without copying, so sessions and server processes
+all read the same pages. A session keeps only its own edits, as a
+CatalogueDelta in session state.
+"""
+import argparse
+import fcntl
+import getpass
+import os
+import tempfile
+import threading
+import pandas as pd
+
+
+def _deployment():
+    """DARAZ_DEPLOYMENT, or the user running the app, so deployments on one host don't share files"""
+    deployment = os.getenv("DARAZ_DEPLOYMENT")
+    if deployment:
+        return deployment
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):   # no passwd entry, as in some containers
+        return str(os.getuid())
+
+
+CATALOGUE_PATH = os.getenv("DARAZ_CATALOGUE_PATH", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), f"daraz-catalogue-{_deployment()}"))
+KEEP_VERSIONS = 2   # older files are unlinked; sessions still mapping them keep working
+
+
+class CatalogueView:
+    """One immutable catalogue version over memory-mapped Arrow buffers"""
+
+    def __init__(self, version, table):
+        self.version = version
+        self.table = table
+        # ArrowDtype columns wrap the mapped buffers instead of copying them into NumPy
+        self.frame = table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def column(self, name):
+        """A column as a NumPy array (zero-copy for numeric columns without nulls)"""
+        return self.table.column(name).to_numpy()
+
+    def __len__(self):
+        return self.table.num_rows
+
+
+class CatalogueDelta:
+    """One session's edits on top of the shared catalogue: {product_id: {column: value}}"""
+
+    def __init__(self):
+        self.changes = {}
+
+    def set(self, product_id, **values):
+        self.changes.setdefault(product_id, {}).update(values)
+
+    def discard(self, product_id):
+        self.changes.pop(product_id, None)
+
+    def apply(self, row):
+        """A catalogue row with this session's edits applied (the row itself if there are none)"""
+        changes = self.changes.get(row['product_id'])
+        if not changes:
+            return row
+        row = row.copy()
+        for column, value in changes.items():
+            row[column] = value
+        return row
+
+    def __len__(self):
+        return len(self.changes)
+
+
+class SharedCatalogue:
+    """Publishes catalogue versions and hands out the current one as a shared view"""
+
+    def __init__(self, name="products", path=CATALOGUE_PATH):
+        self.name = name
+        self.path = path
+        self._view = None
+        self._pointer = None   # (mtime_ns, version) of the pointer file last read
+        self._listeners = []   # [callback, view it has seen]
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """Call callback(old_view, new_view) whenever this process moves to a newer version
+
+        Called at once with (None, current view) if a version is already mapped, so
+        derived indexes can fold in the whole catalogue and then only the switches.
+        Listeners run before the new version is handed out; if one raises, view()
+        raises too and the next view() retries only the listeners still behind.
+        """
+        with self._lock:
+            if self._view is not None:
+                callback(None, self._view)
+            self._listeners.append([callback, self._view])
+
+    def _pointer_path(self):
+        return os.path.join(self.path, f"{self.name}.version")
+
+    def _version_path(self, version):
+        return os.path.join(self.path, f"{self.name}-{version:06d}.arrow")
+
+    def version(self):
+        """The current published version, or None before the first publish"""
+        try:
+            mtime = os.stat(self._pointer_path()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        pointer = self._pointer
+        if pointer is None or pointer[0] != mtime:
+            with open(self._pointer_path()) as handle:
+                pointer = self._pointer = (mtime, int(handle.read()))
+        return pointer[1]
+
+    def publish(self, frame):
+        """Write frame (a DataFrame or Arrow table) as the next version; returns it"""
+        import pyarrow as pa
+        table = frame if isinstance(frame, pa.Table) else pa.Table.from_pandas(frame, preserve_index=False)
+        os.makedirs(self.path, exist_ok=True)
+        # Publishers in other processes take the same lock, so each gets its own version
+        with open(os.path.join(self.path, f"{self.name}.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            version = (self.version() or 0) + 1
+            path = self._version_path(version)
+            # One record batch, so every column maps as a single contiguous buffer
+            with pa.OSFile(path + ".tmp", "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table.combine_chunks(), max_chunksize=max(1, table.num_rows))
+            os.replace(path + ".tmp", path)
+            with open(self._pointer_path() + ".tmp", "w") as handle:
+                handle.write(str(version))
+            os.replace(self._pointer_path() + ".tmp", self._pointer_path())
+            for old in range(version - KEEP_VERSIONS, 0, -1):
+                try:
+                    os.remove(self._version_path(old))
+                except FileNotFoundError:
+                    break
+        return version
+
+    def view(self):
+        """The newest published version as a CatalogueView (None if nothing is published)"""
+        import pyarrow as pa
+        for _ in range(3):
+            version = self.version()
+            if version is None:
+                return None
+            view = self._view
+            if view is not None and view.version == version:
+                return view
+            with self._lock:
+                if self._view is not None and self._view.version == version:
+                    return self._view
+                try:
+                    source = pa.memory_map(self._version_path(version))
+                except FileNotFoundError:
+                    continue   # pruned by a newer publish between reading the pointer and mapping
+                view = CatalogueView(version, pa.ipc.open_file(source).read_all())
+                # Derived indexes catch up first; a listener that raises is retried next time
+                for listener in self._listeners:
+                    callback, seen = listener
+                    if seen is None or seen.version != version:
+                        callback(seen, view)
+                        listener[1] = view
+                self._view = view
+                return view
+        raise RuntimeError(f"catalogue {self.name} kept changing while it was being mapped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="CSV or Parquet file with the catalogue")
+    parser.add_argument("--name", default="products")
+    parser.add_argument("--path", default=CATALOGUE_PATH)
+    args = parser.parse_args()
+    frame = pd.read_parquet(args.source) if args.source.endswith((".parquet", ".pq")) else pd.read_csv(args.source)
+    catalogue = SharedCatalogue(args.name, args.path)
+    print(f"published {len(frame):,} products as {args.name} version {catalogue.publish(frame)} in {args.path}")
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_stats import SKETCH_ACCURACY, CategoryPriceIndex
+
+
+def products(prices, category_id=1):
+    return pd.DataFrame({'category_id': category_id, 'price': prices})
+
+
+@pytest.fixture
+def index():
+    index = CategoryPriceIndex()
+    index.add(products([10.0, 20.0, 30.0]))
+    return index
+
+
+def test_summary_of_a_category(index):
+    summary = index.summary(1)
+    assert summary['count'] == 3
+    assert summary['mean'] == pytest.approx(20.0)
+    assert summary['std'] == pytest.approx(np.std([10.0, 20.0, 30.0]))
+    assert summary['median'] == pytest.approx(20.0, rel=SKETCH_ACCURACY)
+
+
+def test_exclude_leaves_out_one_listing(index):
+    summary = index.summary(1, exclude=30.0)
+    assert summary['count'] == 2
+    assert summary['mean'] == pytest.approx(15.0)
+    assert summary['std'] == pytest.approx(5.0)
+    assert index.quantile(1, 1.0, exclude=30.0) == pytest.approx(20.0, rel=SKETCH_ACCURACY)
+
+
+@pytest.mark.parametrize("exclude", [7.0, 1e6, 1e9, 0.0, float('nan'), None])
+def test_exclude_without_a_listing_at_that_price_is_ignored(index, exclude):
+    assert index.summary(1, exclude=exclude) == index.summary(1)
+    assert index.quantile(1, 0.5, exclude=exclude) == index.quantile(1, 0.5)
+
+
+def test_excluding_the_only_listing_leaves_an_empty_category():
+    index = CategoryPriceIndex()
+    index.add(products([10.0]))
+    assert index.summary(1, exclude=10.0) == {'count': 0, 'mean': None, 'std': None, 'median': None}
+    assert index.quantile(1, 0.5, exclude=10.0) is None
+
+
+def test_unknown_category(index):
+    assert index.summary(2, exclude=10.0)['count'] == 0
+    assert index.quantile(2, 0.5) is None
+
+
+def test_add_then_remove_round_trips(index):
+    before = index.summary(1)
+    extra = products([40.0, 55.5, 99.0])
+    index.add(extra)
+    assert index.summary(1)['count'] == 6
+    index.remove(extra)
+    after = index.summary(1)
+    assert after['count'] == before['count']
+    assert after['mean'] == pytest.approx(before['mean'])
+    assert after['std'] == pytest.approx(before['std'])
+    assert after['median'] == before['median']
+
+
+def test_update_reprices_a_listing(index):
+    index.update(products([30.0]), products([60.0]))
+    summary = index.summary(1)
+    assert summary['count'] == 3
+    assert summary['mean'] == pytest.approx(30.0)
+    assert index.quantile(1, 1.0) == pytest.approx(60.0, rel=SKETCH_ACCURACY)
+    assert index.summary(1, exclude=30.0) == summary
+
+
+def test_bulk_and_incremental_adds_agree():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'category_id': rng.integers(0, 5, 1000), 'price': rng.gamma(2.0, 10.0, 1000)})
+    bulk, incremental = CategoryPriceIndex(), CategoryPriceIndex()
+    bulk.add(frame)
+    for start in range(0, len(frame), 7):
+        incremental.add(frame.iloc[start:start + 7])
+    pd.testing.assert_frame_equal(bulk.stats().sort_values('category_id', ignore_index=True),
+                                  incremental.stats().sort_values('category_id', ignore_index=True))
+    for category_id, prices in frame.groupby('category_id')['price']:
+        assert bulk.mean(category_id) == pytest.approx(prices.mean())
+        assert bulk.median(category_id) == pytest.approx(prices.median(), rel=0.05)
@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+import pytest
+
+import product_store
+from product_store import ProductStore, _IdIndex
+
+
+def product(product_id, name=None):
+    return {'product_id': product_id, 'name': name or f"Product {product_id}", 'price': 10.0 + product_id,
+            'rating': 4.5, 'sales': product_id, 'seller_id': 7, 'category_id': 3}
+
+
+def test_id_index_survives_rehash():
+    index = _IdIndex(1024)
+    keys = np.random.default_rng(0).integers(-2**62, 2**62, 5_000)
+    for slot, key in enumerate(keys.tolist()):
+        index.set(key, slot)
+    assert len(index._slots) > 2048   # grew past its first table
+    assert all(index.get(key) == slot for slot, key in enumerate(keys.tolist()))
+    assert index.get(12345) is None
+
+
+def test_id_index_delete_and_tombstone_reuse():
+    index = _IdIndex(1024)
+    index.set(1, 10)
+    index.set(2, 20)
+    index.delete(1)
+    assert index.get(1) is None
+    assert index.get(2) == 20
+    assert (index._used, index._deleted) == (1, 1)
+    index.set(3, 30)
+    index.set(1, 11)
+    assert index.get(1) == 11
+    assert index._deleted == 0   # a later insert took over the tombstone
+    index.delete(99)             # absent keys are a no-op
+    assert index._used == 3
+
+
+def test_id_index_rehash_drops_tombstones():
+    index = _IdIndex(1024)
+    for key in range(600):
+        index.set(key, key)
+    for key in range(0, 600, 2):
+        index.delete(key)
+    index.rehash(1024)
+    assert (index._used, index._deleted) == (300, 0)
+    assert all(index.get(key) == (key if key % 2 else None) for key in range(600))
+
+
+def test_round_trip_and_long_names():
+    store = ProductStore(max_entries=10)
+    long_name = "A very long product name that does not fit inline"
+    store.put(1, product(1))
+    store.put(2, product(2, long_name))
+    assert store.get(1) == product(1)
+    assert store.get(2)['name'] == long_name
+    assert 3 not in store
+
+
+def test_lru_eviction_keeps_recently_used():
+    store = ProductStore(max_entries=4, evict_fraction=1 / 4)
+    for product_id in range(4):
+        store.put(product_id, product(product_id))
+    store.get(0)                 # 1 is now the least recently used
+    store.put(4, product(4))
+    assert len(store) == 4
+    assert store.evictions == 1
+    assert 1 not in store
+    assert all(product_id in store for product_id in (0, 2, 3, 4))
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(product_store.time, 'time', lambda: now[0])
+    store = ProductStore(max_entries=10, ttl=60)
+    store.put(1, product(1))
+    now[0] += 30
+    assert store.get(1) is not None
+    now[0] += 31
+    assert store.get(1) is None
+    assert len(store) == 0
+
+
+def test_concurrent_puts_claim_distinct_slots():
+    store = ProductStore(max_entries=50_000)
+    barrier = threading.Barrier(8)
+
+    def fill(start):
+        barrier.wait()
+        for product_id in range(start, start + 2_000):
+            store.put(product_id, product(product_id))
+
+    threads = [threading.Thread(target=fill, args=(n * 2_000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store) == 16_000
+    assert all(store.get(product_id, touch=False)['price'] == pytest.approx(10.0 + product_id)
+               for product_id in range(16_000))
@@ -0,0 +1,63 @@
+import threading
+
+import database
+
+
+class FlakyPool:
+    """A pool whose first `failures` connections raise, then behaves like the real one"""
+
+    def __init__(self, pool, failures):
+        self.pool = pool
+        self.failures = failures
+        self.lock = threading.Lock()
+
+    def connection(self):
+        with self.lock:
+            failing = self.failures > 0
+            self.failures -= failing
+        if failing:
+            raise OSError("injected: disk I/O error")
+        return self.pool.connection()
+
+
+def saved(pool, user_email):
+    with pool.connection() as conn:
+        return sorted(product_id for product_id, in conn.execute(
+            "SELECT product_id FROM user_products WHERE user_email = ?", (user_email,)))
+
+
+def test_failed_batch_is_retried_and_later_writes_land(tmp_path, monkeypatch):
+    pool = database.init_db(str(tmp_path / "daraz.db"))
+    flaky = FlakyPool(pool, failures=1)
+    monkeypatch.setattr(database, "get_pool", lambda path=None: flaky)
+    queue = database.WriteBehindQueue(flush_interval=0.01)
+    try:
+        queue.put("a@example.com", 1)
+        assert queue.flush(timeout=5)
+        queue.put("a@example.com", 2)
+        queue.put("b@example.com", 3)
+        assert queue.flush(timeout=5)
+    finally:
+        queue.close()
+    assert queue.counters['errors'] == 1
+    assert queue.counters['dropped'] == 0
+    assert "injected" in queue.last_error
+    assert saved(pool, "a@example.com") == [1, 2]
+    assert saved(pool, "b@example.com") == [3]
+
+
+def test_rows_failing_every_attempt_are_dropped_and_flush_returns(tmp_path, monkeypatch):
+    pool = database.init_db(str(tmp_path / "daraz.db"))
+    flaky = FlakyPool(pool, failures=3)
+    monkeypatch.setattr(database, "get_pool", lambda path=None: flaky)
+    queue = database.WriteBehindQueue(flush_interval=0.01, attempts=3)
+    try:
+        queue.put("a@example.com", 1)
+        assert queue.flush(timeout=5)
+        queue.put("a@example.com", 2)
+        assert queue.flush(timeout=5)
+    finally:
+        queue.close()
+    assert queue.counters['dropped'] == 1
+    assert queue.counters['committed'] == 1
+    assert saved(pool, "a@example.com") == [2]